@@ -0,0 +1,135 @@
+import json
+import tracemalloc
+
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+
+class Measurement(NamedTuple):
+    """The outcome of running a Benchmark"""
+
+    name: str
+    calls: int
+    ops_per_sec: float
+    p50_us: float
+    p99_us: float
+    bytes_per_call: float  # peak traced memory while making a single call
+
+    def asdict(self) -> dict:
+        return self._asdict()
+
+
+class Regression(NamedTuple):
+    name: str
+    metric: str
+    baseline: float
+    measured: float
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.metric} regressed from {self.baseline:.2f} to {self.measured:.2f}'
+
+
+class Benchmark:
+    """A callable measured for throughput, latency, and memory allocated per call
+
+    After `warmup` untimed calls, `subject` is timed over `calls` calls; memory is
+    then traced separately over `allocation_samples` calls so tracing does not
+    skew the timings.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        subject: Callable[[], object],
+        calls: int = 2000,
+        warmup: int = 50,
+        allocation_samples: int = 20
+    ):
+        self.name = name
+        self.subject = subject
+        self.calls = calls
+        self.warmup = warmup
+        self.allocation_samples = allocation_samples
+
+    def latencies(self) -> List[float]:
+        subject, timings = self.subject, []
+        for _ in range(self.warmup):
+            subject()
+        for _ in range(self.calls):
+            start = perf_counter()
+            subject()
+            timings.append(perf_counter() - start)
+        return timings
+
+    def allocations(self) -> float:
+        peaks = []
+        for _ in range(self.allocation_samples):
+            tracemalloc.start()
+            self.subject()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks.append(peak)
+        return sum(peaks) / len(peaks)
+
+    def run(self) -> Measurement:
+        timings = self.latencies()
+        percentiles = quantiles(timings, n=100)
+        return Measurement(
+            name=self.name,
+            calls=self.calls,
+            ops_per_sec=len(timings) / sum(timings),
+            p50_us=percentiles[49] * 1e6,
+            p99_us=percentiles[98] * 1e6,
+            bytes_per_call=self.allocations(),
+        )
+
+
+def load(path: Path) -> Dict[str, dict]:
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def save(path: Path, measurements: List[Measurement]):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({m.name: m.asdict() for m in measurements}, indent=2, sort_keys=True) + '\n')
+
+
+def compare(
+    measurements: List[Measurement],
+    baselines: Dict[str, dict],
+    threshold: float = 0.25
+) -> List[Regression]:
+    """Finds measurements worse than their baseline by more than `threshold` (a fraction)"""
+    regressions = []
+    for measurement in measurements:
+        baseline: Optional[dict] = baselines.get(measurement.name)
+        if not baseline:
+            continue
+        if measurement.ops_per_sec < baseline['ops_per_sec'] * (1 - threshold):
+            regressions.append(Regression(measurement.name, 'ops_per_sec', baseline['ops_per_sec'], measurement.ops_per_sec))
+        for metric in ('p99_us', 'bytes_per_call'):
+            if getattr(measurement, metric) > baseline[metric] * (1 + threshold):
+                regressions.append(Regression(measurement.name, metric, baseline[metric], getattr(measurement, metric)))
+    return regressions
+
+
+def report(measurements: List[Measurement], baselines: Optional[Dict[str, dict]] = None) -> str:
+    baselines = baselines or {}
+    header = f'{"benchmark":<32}{"ops/sec":>12}{"p50 (us)":>12}{"p99 (us)":>12}{"bytes/call":>12}{"vs baseline":>14}'
+    lines = [header, '-' * len(header)]
+    for m in measurements:
+        baseline = baselines.get(m.name)
+        change = f'{(m.ops_per_sec / baseline["ops_per_sec"] - 1) * 100:+.1f}%' if baseline else ''
+        lines.append(
+            f'{m.name:<32}{m.ops_per_sec:>12.0f}{m.p50_us:>12.1f}{m.p99_us:>12.1f}{m.bytes_per_call:>12.0f}{change:>14}'
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,42 @@
+import sys
+
+from argparse import ArgumentParser
+from pathlib import Path
+
+from benchmarks import compare
+from benchmarks import load
+from benchmarks import report
+from benchmarks import save
+from benchmarks.suite import stubbed
+from benchmarks.suite import suite
+
+
+def main(argv=None) -> int:
+    parser = ArgumentParser(prog='python -m benchmarks', description='Measures the overhead recruitment adds per call.')
+    parser.add_argument('--baseline', type=Path, default=Path('.benchmarks/baseline.json'))
+    parser.add_argument('--save', action='store_true', help='record these measurements as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='tolerated regression as a fraction of baseline')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies the number of calls made')
+    args = parser.parse_args(argv)
+
+    with stubbed():
+        benchmarks = [benchmark for benchmark in suite(args.scale) if args.filter in benchmark.name]
+        measurements = [benchmark.run() for benchmark in benchmarks]
+
+    baselines = load(args.baseline)
+    print(report(measurements, baselines))
+
+    if args.save:
+        save(args.baseline, measurements)
+        print(f'\nBaseline saved to {args.baseline}')
+        return 0
+
+    regressions = compare(measurements, baselines, args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION -- {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
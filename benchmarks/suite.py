@@ -0,0 +1,101 @@
+from actionpack.actions import Call
+from actionpack.utils import Closure
+from contextlib import contextmanager
+from os import environ as envvars
+from subprocess import run
+from sys import executable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from unittest.mock import patch
+
+from benchmarks import Benchmark
+from recruitment.agency import Agent
+from recruitment.agency import Commlink
+from recruitment.agency import Config
+from recruitment.agency import Consumer
+from recruitment.agency import Contingency
+from recruitment.agency import Coordinator
+from recruitment.agency import Publisher
+from recruitment.agency.resources import Broker
+
+
+credentials = {
+    'region_name': 'us-east-1',
+    'access_key_id': 's3curityBadge!',
+    'secret_access_key': 'p@ssw0rd!',
+}
+
+environment = {
+    'AWS_SERVICE_NAME': 'sns',
+    'AWS_REGION_NAME': credentials['region_name'],
+    'AWS_ACCESS_KEY_ID': credentials['access_key_id'],
+    'AWS_SECRET_ACCESS_KEY': credentials['secret_access_key'],
+}
+
+responses: Dict[str, dict] = {
+    'Publish': {'MessageId': '00000000-0000-0000-0000-000000000000'},
+    'SendMessageBatch': {'Successful': [], 'Failed': []},
+    'GetLogEvents': {
+        'events': [{'timestamp': 1663600455651, 'message': 'some log line', 'ingestionTime': 1663600458020}],
+        'nextForwardToken': 'f/1',
+        'nextBackwardToken': 'b/1',
+    },
+}
+
+
+@contextmanager
+def stubbed() -> Iterator[None]:
+    """Answers every botocore API call with a canned response, never touching the network
+
+    (see `recruitment.agency.temp.Commlink` for the same approach used in tests)
+    """
+    def make_api_call(client, operation_name: str, api_params: dict) -> dict:
+        return responses.get(operation_name, {})
+
+    with patch('botocore.client.BaseClient._make_api_call', new=make_api_call), \
+         patch.dict(envvars, environment):
+        yield
+
+
+def cold_import():
+    """Imports the package in a fresh interpreter, as a Lambda cold start or short-lived CLI would"""
+    run([executable, '-c', 'import recruitment.agency'], check=True)
+
+
+def suite(scale: float = 1.0) -> List[Benchmark]:
+    def calls(n: int) -> int:
+        return max(10, int(n * scale))
+
+    sns, sqs, logs = (Config(broker, **credentials) for broker in (Broker.sns, Broker.sqs, Broker.logs))
+    publisher = Publisher(Coordinator(Commlink(sns)))
+    resilient_publisher = Publisher(Coordinator(Commlink(sns), Contingency))
+    compact_publisher = Publisher(Coordinator(Commlink(sns), Contingency, compact=True))
+    batch_publisher = Publisher(Coordinator(Commlink(sqs), Contingency))
+    consumer = Consumer(Coordinator(Commlink(logs), Contingency))
+    agent = Agent(consumer=consumer, publisher=resilient_publisher)
+    bare = Coordinator(Commlink(sns), Contingency)
+    entries = [{'Id': str(i), 'MessageBody': f'message {i}'} for i in range(10)]
+
+    return [
+        Benchmark('import recruitment.agency', cold_import, calls=calls(20), warmup=2, allocation_samples=2),
+        Benchmark('Config.fromenv', Config.fromenv, calls=calls(20000)),
+        Benchmark('Commlink(cached)', lambda: Commlink(sns), calls=calls(20000)),
+        Benchmark('Commlink(uncached)', lambda: Commlink(sns, cache=None), calls=calls(100), warmup=5, allocation_samples=5),
+        Benchmark('Coordinator.do(noop)', lambda: bare.do(Call(Closure(dict))), calls=calls(20000)),
+        Benchmark('Publisher.publish', lambda: publisher.publish(TopicArn='arn', Message='hi'), calls=calls(5000)),
+        Benchmark(
+            'Publisher.publish(contingency)',
+            lambda: resilient_publisher.publish(TopicArn='arn', Message='hi'),
+            calls=calls(5000)
+        ),
+        Benchmark(
+            'Publisher.publish(compact)',
+            lambda: compact_publisher.publish(TopicArn='arn', Message='hi'),
+            calls=calls(5000)
+        ),
+        Benchmark('Publisher.publish_batch(10)', lambda: batch_publisher.publish_batch(entries, QueueUrl='q'), calls=calls(2000)),
+        Benchmark('Consumer.consume', lambda: consumer.consume(logGroupName='g', logStreamName='s'), calls=calls(5000)),
+        Benchmark('Agent.publish', lambda: agent.publish(TopicArn='arn', Message='hi'), calls=calls(5000)),
+        Benchmark('Agent.consume', lambda: agent.consume(logGroupName='g', logStreamName='s'), calls=calls(5000)),
+    ]
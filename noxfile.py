@@ -103,6 +103,14 @@ def test(session):
         )
 
 
+@nox.session(name=session_name('benchmark'), python=supported_python_versions)
+def benchmark(session):
+    if USEVENV:
+        install(session)
+
+    session.run('python', '-m', 'benchmarks', *session.posargs, external=external)
+
+
 @nox.session(name=session_name('build'), python=supported_python_versions)
 def build(session):
     session.run('python', 'setup.py', 'sdist')
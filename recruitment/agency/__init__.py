@@ -1,28 +1,80 @@
-import boto3
+import heapq
 
 from actionpack import Action
 from actionpack.actions import Call
 from actionpack.utils import Closure
-from botocore.exceptions import NoRegionError
+from actionpack.utils import key_for
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from functools import reduce
+from functools import wraps
+from itertools import count
+from itertools import islice
+from operator import itemgetter
+from mmap import mmap
 from os import environ as envvars
 from pathlib import Path
+from queue import Empty
+from queue import Full
+from queue import Queue
+from threading import Event
+from threading import RLock
+from threading import Semaphore
+from threading import Thread
+from threading import Timer
+from threading import current_thread
+from time import monotonic
+from time import time
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
 from typing import Optional
 from typing import TypeVar
 from typing import Union
 
+from recruitment.agency.aggregation import aggregate
+from recruitment.agency.aggregation import deaggregate
+from recruitment.agency.aggregation import max_record_bytes
+from recruitment.agency.encoding import Codec
+from recruitment.agency.encoding import Compression
+from recruitment.agency.encoding import Serialization
+from recruitment.agency.metrics import Metrics
+from recruitment.agency.resources import AdaptiveConcurrency
+from recruitment.agency.resources import Backoff
+from recruitment.agency.resources import Batching
 from recruitment.agency.resources import Broker
+from recruitment.agency.resources import Circuit
+from recruitment.agency.resources import CircuitBreaker
 from recruitment.agency.resources import CloudProvider
+from recruitment.agency.resources import CompactEffort
 from recruitment.agency.resources import Effort
 from recruitment.agency.resources import From
+from recruitment.agency.resources import MultipartEffort
+from recruitment.agency.resources import Quota
+from recruitment.agency.resources import RateLimiter
 from recruitment.agency.resources import RecordedRetryPolicy
+from recruitment.agency.resources import RetryBudget
+from recruitment.agency.resources import cause
+from recruitment.agency.resources import perform
+from recruitment.agency.resources import sizeof
+from recruitment.agency.resources import throttled
+from recruitment.agency.storage import Checkpoint
+from recruitment.agency.storage import DeadletterStore
+from recruitment.agency.storage import deadletters
+from recruitment.agency.storage import local_storage_dir
 
 
 T = TypeVar('T')
 Reaction = Action
 
-local_storage_dir = Path.home() / '.recruitment/agency/'
-deadletters = local_storage_dir / 'deadletters'  # failures
 session_token_param_name = 'session_token'
 
 
@@ -77,6 +129,17 @@ class Config:
     def asfile(self, profile: str = 'default'):
         return f'[{profile}]\n{str(self)}'
 
+    def asclientkwargs(self) -> Dict[str, Optional[str]]:
+        """Produces the kwargs expected by `boto3.client`"""
+        return {
+            'service_name': self.service_name,
+            'region_name': self.region_name,
+            'aws_access_key_id': self.access_key_id,
+            'aws_secret_access_key': self.secret_access_key,
+            'aws_session_token': self.session_token if hasattr(self, session_token_param_name) else None,
+            'endpoint_url': self.endpoint_url
+        }
+
     def __post_init__(self):
         if self.service_name is None:
             raise Config.AttributeDeclaredIncorrectly('Missing service_name.')
@@ -119,25 +182,97 @@ class Config:
         pass
 
 
+class ClientCache:
+    """A process-wide store of boto3 clients keyed by resolved Config
+
+    Clients are evicted once `maxsize` is exceeded (least recently used first)
+    or once older than `ttl` seconds. Call `.invalidate` when credentials rotate.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 32,
+        ttl: Optional[float] = 3600,
+        clock: Callable[[], float] = monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._clients: OrderedDict = OrderedDict()
+        self._lock = RLock()
+
+    @staticmethod
+    def key(config: Config) -> tuple:
+        return tuple(config.asclientkwargs().items())
+
+    def get(self, config: Config) -> Any:
+        key, now = self.key(config), self.clock()
+        with self._lock:
+            if key in self._clients:
+                client, created_at = self._clients[key]
+                if self.ttl is None or now - created_at < self.ttl:
+                    self._clients.move_to_end(key)
+                    return client
+                del self._clients[key]
+
+            client = client_for(config)
+            self._clients[key] = (client, now)
+            while len(self._clients) > self.maxsize:
+                self._clients.popitem(last=False)
+            return client
+
+    def invalidate(self, config: Optional[Config] = None):
+        """Drops the client for the given Config or, if none is given, all clients"""
+        with self._lock:
+            if config is None:
+                self._clients.clear()
+            else:
+                self._clients.pop(self.key(config), None)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __contains__(self, config: Config) -> bool:
+        return self.key(config) in self._clients
+
+
+clients = ClientCache()
+
+
+def client_for(config: Config) -> Any:
+    """Creates a boto3 client for the given Config
+
+    The SDK is imported here, on first use, rather than with this module since
+    importing it takes longer than importing everything else combined.
+    """
+    import boto3
+
+    return boto3.client(**config.asclientkwargs())
+
+
 class Commlink:
     """An object that hosts the Broker.interface"""
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        cache: Optional[ClientCache] = clients,
+        budget: Optional[RetryBudget] = None,
+        limiter: Optional[RateLimiter] = None
+    ):
         self.broker = Broker(config.service_name)  # maybe redundant
-        kwargs = {
-            'service_name': config.service_name,
-            'region_name': config.region_name,
-            'aws_access_key_id': config.access_key_id,
-            'aws_secret_access_key': config.secret_access_key,
-            'aws_session_token': config.session_token if hasattr(config, session_token_param_name) else None,
-            'endpoint_url': config.endpoint_url
-        }
+        self.endpoint = config.endpoint_url or config.region_name
+        self.budget = budget
+        self.limiter = limiter
+        from botocore.exceptions import NoRegionError
+
+        try:
+            client = cache.get(config) if cache is not None else client_for(config)
+        except (ValueError, NoRegionError) as e:
+            raise Commlink.FailedToInstantiate(given=config) from e
         for alias, method in self.broker.interface.items():
-            try:
-                client = boto3.client(**kwargs)
-            except (ValueError, NoRegionError) as e:
-                raise Commlink.FailedToInstantiate(given=config) from e
-            setattr(self, alias, getattr(client, method))
+            method = getattr(client, method)
+            setattr(self, alias, paced(method, alias, limiter) if limiter else method)
 
     class FailedToInstantiate(Exception):
         def __init__(self, given: Config):
@@ -152,11 +287,22 @@ class Commlink:
             super().__init__(str(redacted_config))
 
 
+def paced(method: Callable[..., T], alias: str, limiter: RateLimiter) -> Callable[..., T]:
+    """Makes calls to the method wait their turn per the limiter's Quota for the alias"""
+    @wraps(method)
+    def pace(*args, **kwargs) -> T:
+        limiter.acquire(alias, sizeof(args) + sizeof(kwargs))
+        return method(*args, **kwargs)
+
+    return pace
+
+
 class Contingency:
 
     def __new__(cls, *args, **kwargs) -> T:
         instance = super().__new__(cls)
-        param_names, assigned_param_names = ['reaction', 'max_retries'], []
+        param_names = ['reaction', 'max_retries', 'backoff', 'breaker', 'deadletters']
+        assigned_param_names = []
         for param_name in param_names:
             param_value = kwargs.get(param_name)
             if param_value or param_value == 0:
@@ -171,21 +317,43 @@ class Contingency:
     def __call__(
         self,
         action: Action,
+        budget: Optional[RetryBudget] = None,
+        circuit: Optional[Circuit] = None,
+        record: bool = True
     ) -> RecordedRetryPolicy:
         if isinstance(self, type):
             return RecordedRetryPolicy(
                 action=action,
-                max_retries=2  # retries
+                max_retries=2,  # retries
+                should_record=record,
+                budget=budget,
+                circuit=circuit
             )
 
         if hasattr(self, 'reaction') and not isinstance(self.reaction, Action):
             msg = f'reaction param must be of type `Action` not `{type(self.reaction).__name__}`.'
             raise TypeError(msg)
 
+        if hasattr(self, 'backoff') and not isinstance(self.backoff, Backoff):
+            msg = f'backoff param must be of type `Backoff` not `{type(self.backoff).__name__}`.'
+            raise TypeError(msg)
+
+        if hasattr(self, 'breaker') and not isinstance(self.breaker, CircuitBreaker):
+            msg = f'breaker param must be of type `CircuitBreaker` not `{type(self.breaker).__name__}`.'
+            raise TypeError(msg)
+
+        if hasattr(self, 'deadletters') and not isinstance(self.deadletters, DeadletterStore):
+            msg = f'deadletters param must be of type `DeadletterStore` not `{type(self.deadletters).__name__}`.'
+            raise TypeError(msg)
+
         return RecordedRetryPolicy(
             action=action,
             reaction=self.reaction if hasattr(self, 'reaction') else None,
-            max_retries=self.max_retries if hasattr(self, 'max_retries') else 2  # retries
+            max_retries=self.max_retries if hasattr(self, 'max_retries') else 2,  # retries
+            should_record=record,
+            backoff=self.backoff if hasattr(self, 'backoff') else None,
+            budget=budget,
+            circuit=circuit
         )
 
 
@@ -194,28 +362,165 @@ class Coordinator:
     def __init__(
         self,
         commlink: Commlink,
-        contingency: Optional[Contingency] = None
+        contingency: Optional[Contingency] = None,
+        max_workers: Optional[int] = None,
+        compact: bool = False,
+        metrics: Optional[Metrics] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None
     ):
         self.commlink = commlink
         self.contingency = contingency
+        self.max_workers = max_workers
+        self.compact = compact
+        self.metrics = metrics
+        self.concurrency = concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = RLock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """A bounded pool, created on first use, for doing work off the calling thread"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.__class__.__name__
+                )
+            return self._executor
+
+    @property
+    def circuit(self) -> Optional[Circuit]:
+        """The Commlink's circuit if the Contingency includes a CircuitBreaker"""
+        breaker = getattr(self.contingency, 'breaker', None)
+        if breaker:
+            return breaker.circuit((self.commlink.broker, self.commlink.endpoint))
+
+    def alias_for(self, action: Action) -> str:
+        """Names the Broker.interface alias (or, failing that, the function) an action calls
+
+        Work delivered by a Batch is named after the alias the Batch delivers through.
+        """
+        func = getattr(getattr(action, 'closure', None), 'func', None)
+        owner = getattr(func, '__self__', None)
+        if isinstance(owner, Batch):
+            return owner.alias
+        name = getattr(func, '__name__', type(action).__name__)
+        return key_for(name, self.commlink.broker.interface) or name
+
+    def do(self, action: Action) -> Union[Effort, CompactEffort]:
+        """Performs the action, retrying per the Contingency
+
+        A compact Coordinator neither records attempts nor keeps them beyond a tally.
+        Given AdaptiveConcurrency, the action waits for room under its limit first.
+        """
+        if self.concurrency is None:
+            return self._measured(action)
+
+        self.concurrency.acquire()
+        effort = None
+        try:
+            effort = self._measured(action)
+            return effort
+        finally:
+            self.concurrency.release(effort)
 
-    def do(self, action: Action) -> Effort:
+    def _measured(self, action: Action) -> Union[Effort, CompactEffort]:
+        if self.metrics is None:
+            return self._do(action)
+
+        start = monotonic()
+        effort = self._do(action)
+        self.metrics.record(self.commlink.broker.name, self.alias_for(action), effort, monotonic() - start)
+        return effort
+
+    def _do(self, action: Action) -> Union[Effort, CompactEffort]:
         if self.contingency:
-            retry_policy = self.contingency(action=action)
-            return Effort(retry_policy.perform(), *retry_policy.attempts)
+            retry_policy = self.contingency(
+                action=action,
+                budget=self.commlink.budget,
+                circuit=self.circuit,
+                record=not self.compact
+            )
+            culmination = perform(retry_policy)
+            if self.compact:
+                return CompactEffort(culmination, retry_policy.retries + 1, retry_policy.throttled)
+            return Effort(culmination, *retry_policy.attempts)
         else:
-            return Effort(action.perform())
+            culmination = perform(action)
+            if self.compact:
+                return CompactEffort(culmination, throttled=not culmination.successful and throttled(culmination.value))
+            return Effort(culmination)
+
+    def do_many(
+        self,
+        actions: Iterable[Action],
+        max_workers: int = 5,
+        ordered: bool = False,
+        max_pending: Optional[int] = None
+    ) -> Iterator[Effort]:
+        """Does the given actions concurrently, yielding an Effort for each
+
+        Efforts are yielded as they complete unless `ordered`, in which case they're
+        yielded in the order the actions were given. Actions are drawn lazily such that
+        no more than `max_pending` (twice `max_workers` by default) are in flight.
+        With AdaptiveConcurrency, `max_workers` is a ceiling the limit works beneath.
+        """
+        actions = iter(actions)
+        max_pending = max_pending or 2 * max_workers
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=self.__class__.__name__) as executor:
+            pending = deque()
+            while True:
+                for action in islice(actions, max_pending - len(pending)):
+                    pending.append(executor.submit(self.do, action))
+                if not pending:
+                    break
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    pending = deque(future for future in pending if future in not_done)
+                    for future in done:
+                        yield future.result()
+
+    async def ado(self, action: Action) -> Effort:
+        """Awaitable counterpart to `.do` performed on the Coordinator's executor"""
+        from asyncio import get_running_loop  # only once awaited, since asyncio is slow to import
+
+        loop = get_running_loop()
+        return await loop.run_in_executor(self.executor, self.do, action)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
 
 
 class Job:
 
-    def __init__(self, coordinator: Coordinator):
+    def __init__(self, coordinator: Coordinator, codec: Optional[Codec] = None):
         self.coordinator = coordinator
+        self.codec = codec
+        if codec is not None:
+            coordinator.commlink.broker.payload  # raises NotImplementedError for Brokers without payloads
+
+    def encoded(self, params: dict) -> dict:
+        """Encodes the payload among the given params (e.g. a MessageBody) using the Codec, if any"""
+        if self.codec is None:
+            return params
+        payload = self.coordinator.commlink.broker.payload
+        if payload.param not in params:
+            return params
+        return {**params, payload.param: self.codec.encode(params[payload.param], text=payload.text)}
 
     def create_target(self, *args, **kwargs):
         create_target = Call(Closure(self.coordinator.commlink.create_target, *args, **kwargs))
         return self.coordinator.do(create_target)
 
+    async def acreate_target(self, *args, **kwargs) -> Effort:
+        create_target = Call(Closure(self.coordinator.commlink.create_target, *args, **kwargs))
+        return await self.coordinator.ado(create_target)
+
     def __repr__(self) -> str:
         name = self.__class__.__name__
         broker = self.coordinator.commlink.broker.name
@@ -224,20 +529,1157 @@ class Job:
         return f'<{name}:{broker}{has_contingency}>'
 
 
+class Batch:
+    """A collection of entries delivered in chunks sized to the Broker's limits
+
+    Entries are delivered via the `alias` given (`send_batch`, by default).
+    Upon redelivery, only entries reported as failed are sent again.
+    """
+
+    def __init__(self, commlink: Commlink, entries: Iterable[dict], alias: str = 'send_batch', **kwargs):
+        self.commlink = commlink
+        self.alias = alias
+        self.batching = commlink.broker.batching
+        self.kwargs = kwargs
+        self.pending: List[dict] = list(entries)
+        self.responses: List[dict] = []
+
+    def chunks(self, entries: List[dict]) -> Iterator[List[dict]]:
+        chunk, chunk_size = [], 0
+        for entry in entries:
+            entry_size = sizeof(entry)
+            if chunk and (
+                len(chunk) == self.batching.max_entries
+                or chunk_size + entry_size > self.batching.max_bytes
+            ):
+                yield chunk
+                chunk, chunk_size = [], 0
+            chunk.append(entry)
+            chunk_size += entry_size
+        if chunk:
+            yield chunk
+
+    def failures(self, chunk: List[dict], response: dict) -> List[tuple]:
+        """Pairs each entry reported as failed with the error code reported for it"""
+        if self.commlink.broker == Broker.kinesis:
+            return [
+                (entry, record['ErrorCode'])
+                for entry, record in zip(chunk, response.get('Records', [])) if 'ErrorCode' in record
+            ]
+        codes = {failure['Id']: failure.get('Code') for failure in response.get('Failed', [])}
+        return [(entry, codes[entry['Id']]) for entry in chunk if entry['Id'] in codes]
+
+    def deliver(self) -> List[dict]:
+        failed, errors, codes = [], [], []
+        for chunk in self.chunks(self.pending):
+            try:
+                response = getattr(self.commlink, self.alias)(**{self.batching.param: chunk}, **self.kwargs)
+            except Exception as e:
+                failed.extend(chunk)
+                errors.append(e)
+                continue
+            self.responses.append(response)
+            for entry, code in self.failures(chunk, response):
+                failed.append(entry)
+                codes.append(code)
+
+        self.pending = failed
+        if failed:
+            raise Batch.Incomplete(failed, errors, codes)
+        return self.responses
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    class Incomplete(Exception):
+        def __init__(self, entries: List[dict], errors: List[Exception], codes: Optional[List[str]] = None):
+            self.entries = entries
+            self.errors = errors
+            self.codes = codes or []  # reported for entries that failed within a delivered chunk
+            super().__init__(f'{len(entries)} entries failed to deliver.')
+
+
+class Accumulator:
+    """Gathers items into groups handed to `send` when full or `linger` seconds after a group's first item
+
+    A group is full at `max_items` or when the next item would push it past
+    `max_bytes` (as measured by `sizeof`). Subclasses may refuse an item a place
+    in the current group via `.admits`. Groups are sent one at a time, in order,
+    on whichever thread fills them (or a timer thread, once lingering ends).
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Any]], T],
+        max_items: int,
+        max_bytes: Optional[int] = None,
+        linger: float = 1.0,
+        sizeof: Callable[[Any], int] = sizeof
+    ):
+        if max_items < 1:
+            raise ValueError(f'Groups must hold at least 1 item. Given max_items={max_items}.')
+        self.send = send
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.linger = linger
+        self.sizeof = sizeof
+        self.items: List[Any] = []
+        self.futures: List[Future] = []
+        self.size = 0
+        self._timer: Optional[Timer] = None
+        self._lock = RLock()
+        self._sending = RLock()
+
+    def admits(self, item: Any) -> bool:
+        return True
+
+    def fits(self, item: Any, size: int) -> bool:
+        return (
+            len(self.items) < self.max_items
+            and (self.max_bytes is None or self.size + size <= self.max_bytes)
+            and self.admits(item)
+        )
+
+    def append(self, item: Any, size: int):
+        self.items.append(item)
+        self.size += size
+
+    def add(self, item: Any) -> Future:
+        """Adds an item, returning a Future for what `send` returns for the group it ends up in"""
+        future, size = Future(), self.sizeof(item)
+        if self.max_bytes is not None and size > self.max_bytes:
+            raise ValueError(f'Item of {size} bytes exceeds max_bytes={self.max_bytes}.')
+        while True:
+            with self._lock:
+                if not self.items or self.fits(item, size):
+                    self.append(item, size)
+                    self.futures.append(future)
+                    full = len(self.items) >= self.max_items
+                    if not full and self._timer is None:
+                        self._timer = Timer(self.linger, self.flush)
+                        self._timer.daemon = True
+                        self._timer.start()
+                    break
+            self.flush()
+        if full:
+            self.flush()
+        return future
+
+    def take(self) -> tuple:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            items, futures = self.items, self.futures
+            self.items, self.futures, self.size = [], [], 0
+            return items, futures
+
+    def flush(self):
+        """Sends whatever has been gathered"""
+        with self._sending:
+            items, futures = self.take()
+            if not items:
+                return
+            try:
+                result = self.send(items)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future in futures:
+                future.set_result(result)
+
+    def close(self):
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __enter__(self) -> 'Accumulator':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{len(self)}/{self.max_items}>'
+
+
+class LogBuffer(Accumulator):
+    """Gathers log events into groups `put_log_events` accepts
+
+    Each group holds up to 10,000 events totalling no more than 1MB (counting
+    26 bytes of overhead per event) spanning no more than 24 hours. Events are
+    sent in chronological order.
+    """
+
+    max_span = 24 * 60 * 60 * 1000  # milliseconds
+    event_overhead = 26  # bytes
+
+    def __init__(
+        self,
+        send: Callable[[List[dict]], T],
+        max_items: int = 10000,
+        max_bytes: int = 1024 * 1024,
+        linger: float = 1.0
+    ):
+        super().__init__(send, max_items, max_bytes, linger, sizeof=self.event_size)
+        self.earliest = self.latest = None
+
+    @classmethod
+    def event_size(cls, event: dict) -> int:
+        return len(event['message'].encode()) + cls.event_overhead
+
+    def admits(self, event: dict) -> bool:
+        timestamp = event['timestamp']
+        return max(self.latest, timestamp) - min(self.earliest, timestamp) <= self.max_span
+
+    def append(self, event: dict, size: int):
+        super().append(event, size)
+        timestamp = event['timestamp']
+        self.earliest = timestamp if self.earliest is None else min(self.earliest, timestamp)
+        self.latest = timestamp if self.latest is None else max(self.latest, timestamp)
+
+    def take(self) -> tuple:
+        with self._lock:
+            items, futures = super().take()
+            self.earliest = self.latest = None
+        order = sorted(range(len(items)), key=lambda i: items[i]['timestamp'])
+        return [items[i] for i in order], [futures[i] for i in order]
+
+    def log(self, message: str, timestamp: Optional[int] = None) -> Future:
+        """Adds an event, timestamped now (in milliseconds since the epoch) unless given a timestamp"""
+        return self.add({'timestamp': int(time() * 1000) if timestamp is None else timestamp, 'message': message})
+
+
+class Upload:
+    """A large object sent to S3 in parts of `chunk_size` bytes
+
+    Parts are read from `fileobj` only as they're about to be sent so no more
+    of the object than is in flight is ever held in memory. Should the object
+    (when its size can be told) need more than `max_parts` parts, the chunk size
+    is raised to fit; otherwise, sending a part beyond `max_parts` fails.
+    """
+
+    min_chunk_size = 5 * 1024 * 1024  # S3 rejects smaller parts (save for the last)
+    max_parts = 10000  # S3 rejects more
+
+    def __init__(self, commlink: Commlink, fileobj: BinaryIO, Bucket: str, Key: str, chunk_size: int):
+        if chunk_size < self.min_chunk_size:
+            raise ValueError(f'Parts must be at least {self.min_chunk_size} bytes. Given chunk_size={chunk_size}.')
+        size = remaining(fileobj)
+        if size is not None and size > chunk_size * self.max_parts:
+            chunk_size = -(-size // self.max_parts)
+        self.commlink = commlink
+        self.fileobj = fileobj
+        self.bucket = Bucket
+        self.key = Key
+        self.chunk_size = chunk_size
+        self.upload_id: Optional[str] = None
+        self.completed_parts: Dict[int, str] = {}
+
+    def begin(self, **kwargs) -> str:
+        response = self.commlink.begin_upload(Bucket=self.bucket, Key=self.key, **kwargs)
+        self.upload_id = response['UploadId']
+        return self.upload_id
+
+    def chunks(self) -> Iterator[tuple]:
+        """Yields (part number, body) pairs; an empty object is sent as a single empty part"""
+        number, body = 1, self.fileobj.read(self.chunk_size)
+        while True:
+            yield number, body
+            body = self.fileobj.read(self.chunk_size)
+            if not body:
+                return
+            number += 1
+
+    def send_part(self, number: int, body: bytes) -> str:
+        if number > self.max_parts:
+            raise Upload.TooManyParts(f'{self} needs more than {self.max_parts} parts of {self.chunk_size} bytes.')
+        response = self.commlink.send_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=body
+        )
+        self.completed_parts[number] = response['ETag']
+        return response['ETag']
+
+    def complete(self) -> dict:
+        parts = [{'ETag': etag, 'PartNumber': number} for number, etag in sorted(self.completed_parts.items())]
+        return self.commlink.complete_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={'Parts': parts}
+        )
+
+    def abort(self) -> dict:
+        return self.commlink.abort_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.bucket}/{self.key}>'
+
+    class TooManyParts(Exception):
+        pass
+
+
+def remaining(fileobj: BinaryIO) -> Optional[int]:
+    """Tells how many bytes are left to read from a seekable file object"""
+    try:
+        if not fileobj.seekable():
+            return None
+        position = fileobj.tell()
+        end = fileobj.seek(0, 2)
+        fileobj.seek(position)
+        return end - position
+    except (AttributeError, OSError):
+        return None
+
+
+class Download:
+    """An S3 object fetched as ranges of `chunk_size` bytes written into a memory-mapped file
+
+    The destination is sized up front so each range is written in place rather
+    than gathered in memory first. Note that botocore's StreamingBody (and the
+    urllib3 response beneath it) only reads into new bytes, so each range still
+    passes through blocks of `readinto`'s `block_size` on its way to the file.
+    Ranges are requested only for the version of the object first described
+    (i.e. its ETag) lest a concurrent overwrite tear it.
+    """
+
+    def __init__(self, commlink: Commlink, path: Path, Bucket: str, Key: str, chunk_size: int):
+        if chunk_size < 1:
+            raise ValueError(f'Ranges must be at least 1 byte. Given chunk_size={chunk_size}.')
+        self.commlink = commlink
+        self.path = Path(path)
+        self.bucket = Bucket
+        self.key = Key
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.etag: Optional[str] = None
+        self._file: Optional[BinaryIO] = None
+        self._mmap: Optional[mmap] = None
+
+    def begin(self, **kwargs) -> int:
+        """Describes the object then opens the destination, sized to fit it"""
+        response = self.commlink.describe(Bucket=self.bucket, Key=self.key, **kwargs)
+        self.size, self.etag = response['ContentLength'], response.get('ETag')
+        self.close()  # lest a retried beginning leak what an earlier attempt opened
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open('w+b')
+        self._file.truncate(self.size)
+        if self.size:
+            self._mmap = mmap(self._file.fileno(), self.size)
+        return self.size
+
+    def ranges(self) -> Iterator[tuple]:
+        """Yields (part number, first byte, last byte) for each range"""
+        for number, start in enumerate(range(0, self.size, self.chunk_size), 1):
+            yield number, start, min(start + self.chunk_size, self.size) - 1
+
+    def receive_range(self, start: int, end: int) -> int:
+        kwargs = {'IfMatch': self.etag} if self.etag else {}
+        response = self.commlink.receive(Bucket=self.bucket, Key=self.key, Range=f'bytes={start}-{end}', **kwargs)
+        expected = end + 1 - start
+        with memoryview(self._mmap)[start:end + 1] as view:
+            received = readinto(response['Body'], view)
+        if received != expected:
+            raise Download.IncompleteRange(f'Received {received} of {expected} bytes for bytes={start}-{end}.')
+        return received
+
+    def complete(self) -> Path:
+        self.close()
+        return self.path
+
+    def abort(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.bucket}/{self.key}>'
+
+    class IncompleteRange(Exception):
+        pass
+
+
+def readinto(body: Any, view: memoryview, block_size: int = 1024 * 1024) -> int:
+    """Fills the view from a streaming body, returning the number of bytes received
+
+    Bytes are read directly into the view where the body supports `readinto`.
+    Otherwise (e.g. for botocore's StreamingBody), they're read as blocks of
+    `block_size` bytes, each then copied into place, so that at most one block
+    is held at a time.
+    """
+    into = getattr(body, 'readinto', None)
+    filled = 0
+    while filled < len(view):
+        if into:
+            received = into(view[filled:])
+        else:
+            block = body.read(min(block_size, len(view) - filled))
+            received = len(block)
+            view[filled:filled + received] = block
+        if not received:
+            break
+        filled += received
+    return filled
+
+
 class Publisher(Job):
     """A namespace for publishing messages"""
 
     def publish(self, *args, **kwargs) -> Effort:
+        kwargs = self.encoded(kwargs)
+        send_communique = Call(Closure(self.coordinator.commlink.send, *args, **kwargs))
+        effort = self.coordinator.do(send_communique)
+        return self.deadletter(effort, 'send', *args, **kwargs)
+
+    async def apublish(self, *args, **kwargs) -> Effort:
+        kwargs = self.encoded(kwargs)
         send_communique = Call(Closure(self.coordinator.commlink.send, *args, **kwargs))
-        return self.coordinator.do(send_communique)
+        effort = await self.coordinator.ado(send_communique)
+        return self.deadletter(effort, 'send', *args, **kwargs)
+
+    def publish_batch(self, entries: Iterable[dict], **kwargs) -> Effort:
+        """Publishes entries using as few calls as the Broker's batch limits allow"""
+        return self._publish_batch((self.encoded(entry) for entry in entries), **kwargs)
+
+    def _publish_batch(self, entries: Iterable[dict], **kwargs) -> Effort:
+        batch = Batch(self.coordinator.commlink, entries, **kwargs)
+        send_communiques = Call(Closure(batch.deliver))
+        effort = self.coordinator.do(send_communiques)
+        return self.deadletter(effort, 'send_batch', **{batch.batching.param: batch.pending}, **kwargs)
+
+    def buffered(self, logGroupName: str, logStreamName: str, **kwargs) -> LogBuffer:
+        """Gathers log events, publishing them in as few `put_log_events` calls as its limits allow
+
+        Given kwargs (e.g. `linger`) configure the `LogBuffer`. Groups failing to
+        publish are deadlettered; close the buffer to publish what's left.
+        """
+        broker = self.coordinator.commlink.broker
+        if broker != Broker.logs:
+            raise NotImplementedError(f'{broker.name} does not support buffered publishing.')
+
+        def send_events(events: List[dict]) -> Effort:
+            params = {'logGroupName': logGroupName, 'logStreamName': logStreamName, 'logEvents': events}
+            effort = self.coordinator.do(Call(Closure(self.coordinator.commlink.send, **params)))
+            return self.deadletter(effort, 'send', **params)
+
+        return LogBuffer(send_events, **kwargs)
+
+    def publish_aggregated(self, records: Iterable[dict], max_bytes: int = max_record_bytes, **kwargs) -> Effort:
+        """Publishes Kinesis records packed, KPL-style, into as few records (and calls) as limits allow
+
+        Records sharing a partition key are aggregated into records of up to
+        `max_bytes` and sent via `.publish_batch`. Consumers recover the records
+        given using `deaggregate` (see `recruitment.agency.aggregation`).
+        """
+        broker = self.coordinator.commlink.broker
+        if broker != Broker.kinesis:
+            raise NotImplementedError(f'{broker.name} does not support aggregation.')
+        return self._publish_batch(aggregate((self.encoded(record) for record in records), max_bytes), **kwargs)
+
+    def publish_multipart(
+        self,
+        fileobj: BinaryIO,
+        Bucket: str,
+        Key: str,
+        chunk_size: int = 8 * 1024 * 1024,
+        max_workers: int = 10,
+        max_memory: Optional[int] = None,
+        **kwargs
+    ) -> MultipartEffort:
+        """Uploads a large object to S3 as concurrently sent parts
+
+        Each part is retried on its own per the Contingency and no more than
+        `max_memory` bytes (by default, two parts per worker) are read ahead of
+        being sent. Given kwargs are passed along when beginning the upload.
+        Should any part (or completing the upload) fail, the upload is aborted so
+        its parts aren't left stored; they are not deadlettered.
+        """
+        coordinator = self.coordinator
+        upload = Upload(coordinator.commlink, fileobj, Bucket, Key, chunk_size)
+        begun = coordinator.do(Call(Closure(upload.begin, **kwargs)))
+        if not begun.culmination.successful:
+            return MultipartEffort(begun.culmination, parts={})
+
+        parts, failure = {}, None
+        numbers = deque()
+
+        def send_parts() -> Iterator[Action]:
+            for number, body in upload.chunks():
+                numbers.append(number)
+                yield Call(Closure(upload.send_part, number, body))
+
+        chunk_size = upload.chunk_size
+        max_pending = max(1, (max_memory or 2 * max_workers * chunk_size) // chunk_size)
+        efforts = coordinator.do_many(send_parts(), max_workers=max_workers, ordered=True, max_pending=max_pending)
+        for effort in efforts:
+            parts[numbers.popleft()] = effort
+            if not effort.culmination.successful:
+                failure = effort
+                break
+        efforts.close()  # stops reading parts and waits on those in flight
+
+        if failure:
+            coordinator.do(Call(Closure(upload.abort)))
+            return MultipartEffort(failure.culmination, parts)
+
+        completed = coordinator.do(Call(Closure(upload.complete)))
+        if not completed.culmination.successful:
+            coordinator.do(Call(Closure(upload.abort)))
+        return MultipartEffort(completed.culmination, parts)
+
+    def deadletter(self, effort: Effort, alias: str, *args, **kwargs) -> Effort:
+        """Records failed work in the Contingency's DeadletterStore, if there is one
+
+        Uploads to s3 aren't recorded since the file objects they read from can't be replayed.
+        """
+        store = getattr(self.coordinator.contingency, 'deadletters', None)
+        broker = self.coordinator.commlink.broker
+        if store and not effort.culmination.successful and not (broker == Broker.s3 and alias == 'send'):
+            store.bury(broker, alias, effort, *args, **kwargs)
+        return effort
 
 
 class Consumer(Job):
     """A namespace for consuming messages"""
 
+    def __init__(self, coordinator: Coordinator, codec: Optional[Codec] = None):
+        super().__init__(coordinator, codec)
+        self._acknowledgements: Dict[str, Accumulator] = {}
+        self._heartbeats: Dict[str, Heartbeat] = {}
+        self._entry_ids = count()
+        self._lock = RLock()
+
     def consume(self, *args, **kwargs) -> Effort:
         receive_communique = Call(Closure(self.coordinator.commlink.receive, *args, **kwargs))
-        return self.coordinator.do(receive_communique)
+        return self.decoded(self.coordinator.do(receive_communique))
+
+    async def aconsume(self, *args, **kwargs) -> Effort:
+        receive_communique = Call(Closure(self.coordinator.commlink.receive, *args, **kwargs))
+        return self.decoded(await self.coordinator.ado(receive_communique))
+
+    def decoded(self, effort: Effort) -> Effort:
+        """Deaggregates received Kinesis records and decodes items' payloads using the Codec, if any, in place
+
+        Aggregated records are always deaggregated (whether or not there's a Codec) so
+        each record holds a single payload and is numbered by its SubSequenceNumber.
+        Items whose payload fails to decode are handed over as they are, along with
+        the `Codec.Undecodable` error under `DecodeError`, so the rest aren't lost.
+        """
+        broker = self.coordinator.commlink.broker
+        if not effort.culmination.successful or (self.codec is None and broker != Broker.kinesis):
+            return effort
+        payload, response = broker.payload, effort.culmination.value
+        if payload.items not in response:
+            return effort
+        items = response[payload.items]
+        if broker == Broker.kinesis:
+            items = [record for item in items for record in deaggregate(item)]
+        if self.codec is not None:
+            items = [self.decoded_item(item, payload.field) for item in items]
+        response[payload.items] = items
+        return effort
+
+    def decoded_item(self, item: dict, field: str) -> dict:
+        try:
+            return {**item, field: self.codec.decode(item[field])}
+        except Codec.Undecodable as e:
+            return {**item, 'DecodeError': e}
+
+    def stream(
+        self,
+        *args,
+        limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Iterator[dict]:
+        """Lazily yields individual items (e.g. messages or log events) across pages and polls
+
+        Streaming stops once `limit` items have been yielded, `timeout` seconds have
+        elapsed, or a paginated Broker returns an unchanged token (i.e. no more pages).
+        """
+        paging = self.coordinator.commlink.broker.paging
+        deadline = monotonic() + timeout if timeout is not None else None
+        token, yielded = kwargs.get(paging.param), 0
+        while deadline is None or monotonic() < deadline:
+            effort = self.consume(*args, **kwargs)
+            if not effort.culmination.successful:
+                raise Consumer.StreamInterrupted(effort)
+
+            response = effort.culmination.value
+            for item in response.get(paging.items, []):
+                yield item
+                yielded += 1
+                if limit is not None and yielded >= limit:
+                    return
+
+            if paging.token:
+                next_token = response.get(paging.token)
+                if next_token is None or next_token == token:
+                    return
+                token = kwargs[paging.param] = next_token
+
+    def download(
+        self,
+        path: Path,
+        Bucket: str,
+        Key: str,
+        chunk_size: int = 8 * 1024 * 1024,
+        max_workers: int = 10,
+        **kwargs
+    ) -> MultipartEffort:
+        """Downloads an S3 object to `path` as concurrently fetched byte ranges
+
+        Each range is retried on its own per the Contingency. Should any range
+        fail anyway, the partially written file is removed. Given kwargs are passed
+        along when describing the object. The culmination holds the path on success.
+        """
+        coordinator = self.coordinator
+        download = Download(coordinator.commlink, path, Bucket, Key, chunk_size)
+        begun = coordinator.do(Call(Closure(download.begin, **kwargs)))
+        if not begun.culmination.successful:
+            download.close()
+            return MultipartEffort(begun.culmination, parts={})
+
+        parts, failure = {}, None
+        numbers = deque()
+
+        def receive_ranges() -> Iterator[Action]:
+            for number, start, end in download.ranges():
+                numbers.append(number)
+                yield Call(Closure(download.receive_range, start, end))
+
+        efforts = coordinator.do_many(receive_ranges(), max_workers=max_workers, ordered=True)
+        for effort in efforts:
+            parts[numbers.popleft()] = effort
+            if not effort.culmination.successful:
+                failure = effort
+                break
+        efforts.close()  # stops requesting ranges and waits on those in flight
+
+        if failure:
+            download.abort()
+            return MultipartEffort(failure.culmination, parts)
+
+        completed = coordinator.do(Call(Closure(download.complete)))
+        if not completed.culmination.successful:
+            download.abort()
+        return MultipartEffort(completed.culmination, parts)
+
+    def prefetch(self, *args, depth: int = 2, **kwargs) -> 'Prefetcher':
+        """Keeps consuming on a background thread while the caller processes what's already arrived"""
+        return Prefetcher(self, *args, depth=depth, **kwargs).start()
+
+    def search(
+        self,
+        logGroupName: str,
+        startTime: int,
+        endTime: int,
+        window: int = 5 * 60 * 1000,
+        logStreamNames: Optional[List[str]] = None,
+        max_workers: int = 8,
+        max_pending: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[dict]:
+        """Lazily yields a log group's events from `startTime` through `endTime` (ms since the epoch) in chronological order
+
+        The range is split into windows of `window` milliseconds (and, given
+        `logStreamNames`, into one search per stream) fetched concurrently via
+        `filter_log_events`. Each window is retried as a whole per the Contingency
+        and no more than `max_pending` searches are held at once. Given kwargs
+        (e.g. `filterPattern`) are passed along to every search.
+        """
+        commlink = self.coordinator.commlink
+        windows = [(start, min(start + window, endTime + 1) - 1) for start in range(startTime, endTime + 1, window)]
+        streams = [[name] for name in logStreamNames] if logStreamNames else [None]
+
+        def search_window(start: int, end: int, stream: Optional[List[str]]) -> List[dict]:
+            params = {'logGroupName': logGroupName, 'startTime': start, 'endTime': end, **kwargs}
+            if stream:
+                params['logStreamNames'] = stream
+            events = []
+            while True:
+                response = commlink.search(**params)
+                events.extend(response.get('events', []))
+                if not response.get('nextToken'):
+                    return sorted(events, key=itemgetter('timestamp'))
+                params['nextToken'] = response['nextToken']
+
+        searches = (Call(Closure(search_window, start, end, stream)) for start, end in windows for stream in streams)
+        efforts = self.coordinator.do_many(searches, max_workers=max_workers, ordered=True, max_pending=max_pending)
+        try:
+            for _ in windows:
+                found = []
+                for effort in islice(efforts, len(streams)):
+                    if not effort.culmination.successful:
+                        raise Consumer.StreamInterrupted(effort)
+                    found.append(effort.culmination.value)
+                yield from heapq.merge(*found, key=itemgetter('timestamp'))
+        finally:
+            efforts.close()
+
+    def acknowledgements(self, QueueUrl: str, linger: float = 1.0) -> Accumulator:
+        """The Accumulator gathering acknowledgements for the given queue, created on first use
+
+        Acknowledged messages are deleted in batches of up to 10 once that many
+        are gathered or `linger` seconds after the first. Only entries reported as
+        failed are retried per the Contingency; each batch is reported as an Effort.
+        """
+        with self._lock:
+            if QueueUrl not in self._acknowledgements:
+                def delete_messages(entries: List[dict]) -> Effort:
+                    batch = Batch(self.coordinator.commlink, entries, alias='acknowledge', QueueUrl=QueueUrl)
+                    return self.coordinator.do(Call(Closure(batch.deliver)))
+
+                batching = self.coordinator.commlink.broker.batching
+                self._acknowledgements[QueueUrl] = Accumulator(
+                    delete_messages, max_items=batching.max_entries, max_bytes=batching.max_bytes, linger=linger
+                )
+            return self._acknowledgements[QueueUrl]
+
+    def acknowledge(self, message: Union[dict, str], QueueUrl: str) -> Future:
+        """Marks a message (or its receipt handle) as handled so it's deleted from the queue
+
+        Returns a Future for the Effort made to delete the batch including it.
+        """
+        receipt_handle = message['ReceiptHandle'] if isinstance(message, dict) else message
+        heartbeat = self._heartbeats.get(QueueUrl)
+        if heartbeat:
+            heartbeat.release(receipt_handle)
+        entry = {'Id': str(next(self._entry_ids)), 'ReceiptHandle': receipt_handle}
+        return self.acknowledgements(QueueUrl).add(entry)
+
+    def heartbeat(self, QueueUrl: str, **kwargs) -> 'Heartbeat':
+        """The (running) Heartbeat for the given queue, created on first use (see `Heartbeat`)"""
+        with self._lock:
+            if QueueUrl not in self._heartbeats:
+                self._heartbeats[QueueUrl] = Heartbeat(self, QueueUrl, **kwargs).start()
+            return self._heartbeats[QueueUrl]
+
+    def close(self):
+        """Stops any Heartbeats and delivers any acknowledgements still gathering"""
+        with self._lock:
+            heartbeats, accumulators = list(self._heartbeats.values()), list(self._acknowledgements.values())
+            self._heartbeats.clear()
+        for heartbeat in heartbeats:
+            heartbeat.stop()
+        for accumulator in accumulators:
+            accumulator.close()
+
+    def read_shards(self, StreamName: str, **kwargs) -> 'ShardReader':
+        """Reads every shard of a Kinesis stream on background threads (see `ShardReader`)"""
+        return ShardReader(self, StreamName, **kwargs).start()
+
+    class StreamInterrupted(Exception):
+        def __init__(self, effort: Effort):
+            self.effort = effort
+            super().__init__(f'Failed to consume: {effort.culmination.value}')
+
+
+class Prefetcher:
+    """An iterator of Efforts consumed ahead of time on a background thread
+
+    At most `depth` Efforts are held at once; once full, the background thread
+    waits for the caller to catch up before consuming again.
+    """
+
+    poll_interval = 0.1  # seconds
+
+    def __init__(self, consumer: Consumer, *args, depth: int = 2, **kwargs):
+        if depth < 1:
+            raise ValueError(f'Prefetch depth must be at least 1. Given depth={depth}.')
+        self.consumer = consumer
+        self.depth = depth
+        self.args = args
+        self.kwargs = kwargs
+        self.efforts: Queue = Queue(maxsize=depth)
+        self.error: Optional[Exception] = None
+        self._stopped = Event()
+        self._thread = Thread(target=self._prefetch, name=self.__class__.__name__, daemon=True)
+
+    def start(self) -> 'Prefetcher':
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        self._stopped.set()
+        if wait and self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def _prefetch(self):
+        while not self._stopped.is_set():
+            try:
+                effort = self.consumer.consume(*self.args, **self.kwargs)
+            except Exception as e:
+                self.error = e
+                self._stopped.set()
+                return
+            while not self._stopped.is_set():
+                try:
+                    self.efforts.put(effort, timeout=self.poll_interval)
+                    break
+                except Full:
+                    continue
+
+    def get(self, timeout: Optional[float] = None) -> Effort:
+        """Waits for the next Effort, raising `queue.Empty` if none arrives within `timeout` seconds"""
+        return self.efforts.get(timeout=timeout)
+
+    def __iter__(self) -> 'Prefetcher':
+        return self
+
+    def __next__(self) -> Effort:
+        while True:
+            try:
+                return self.efforts.get(timeout=self.poll_interval)
+            except Empty:
+                if self.error:
+                    raise self.error
+                if not self.running:
+                    raise StopIteration
+
+    def __enter__(self) -> 'Prefetcher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.efforts.qsize()}/{self.depth}>'
+
+
+class Heartbeat:
+    """Keeps SQS messages being handled hidden from other consumers until they're acknowledged
+
+    Every `interval` seconds (a third of `visibility_timeout`, by default), a
+    single thread extends the visibility of every tracked message to
+    `visibility_timeout` seconds via `change_message_visibility_batch`. Messages
+    are released when acknowledged and, since SQS allows no more, once tracked
+    for `max_lifetime` seconds. Extensions that fail are attempted again on the next beat.
+    """
+
+    max_lifetime = 12 * 60 * 60  # seconds
+
+    def __init__(
+        self,
+        consumer: Consumer,
+        QueueUrl: str,
+        visibility_timeout: int = 30,
+        interval: Optional[float] = None,
+        clock: Callable[[], float] = monotonic
+    ):
+        self.consumer = consumer
+        self.queue_url = QueueUrl
+        self.visibility_timeout = visibility_timeout
+        self.interval = interval if interval is not None else visibility_timeout / 3
+        self.clock = clock
+        self.tracked: Dict[str, float] = {}  # receipt handle: when tracking began
+        self._lock = RLock()
+        self._stopped = Event()
+        self._thread = Thread(target=self._beat, name=self.__class__.__name__, daemon=True)
+
+    def track(self, message: Union[dict, str]):
+        receipt_handle = message['ReceiptHandle'] if isinstance(message, dict) else message
+        with self._lock:
+            self.tracked.setdefault(receipt_handle, self.clock())
+
+    def release(self, message: Union[dict, str]):
+        receipt_handle = message['ReceiptHandle'] if isinstance(message, dict) else message
+        with self._lock:
+            self.tracked.pop(receipt_handle, None)
+
+    def beat(self) -> Optional[Effort]:
+        """Extends the visibility of every tracked message, returning the Effort made to do so (if any)"""
+        now = self.clock()
+        with self._lock:
+            for receipt_handle, tracked_at in list(self.tracked.items()):
+                if now - tracked_at + self.visibility_timeout > self.max_lifetime:
+                    del self.tracked[receipt_handle]
+            receipt_handles = list(self.tracked)
+        if not receipt_handles:
+            return None
+
+        entries = [
+            {'Id': str(i), 'ReceiptHandle': receipt_handle, 'VisibilityTimeout': self.visibility_timeout}
+            for i, receipt_handle in enumerate(receipt_handles)
+        ]
+        batch = Batch(self.consumer.coordinator.commlink, entries, alias='extend', QueueUrl=self.queue_url)
+        return self.consumer.coordinator.do(Call(Closure(batch.deliver)))
+
+    def _beat(self):
+        while not self._stopped.wait(self.interval):
+            self.beat()
+
+    def start(self) -> 'Heartbeat':
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        self._stopped.set()
+        if wait and self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def __len__(self) -> int:
+        return len(self.tracked)
+
+    def __enter__(self) -> 'Heartbeat':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{len(self)} in flight>'
+
+
+class ShardReader:
+    """An iterator of records read from every shard of a Kinesis stream in parallel
+
+    Each shard is read on its own thread, though no more than `max_workers` reads
+    are made at once. Parent shards are read to their end before their children
+    so records sharing a partition key stay in order across splits and merges.
+    New shards are discovered every `discovery_interval` seconds.
+
+    Progress is kept per shard as a `Checkpoint` under `directory`, saved every
+    `checkpoint_every` records and whenever reading stops, so a restarted reader
+    resumes where it stopped rather than from `initial_position`. A record counts
+    as processed once the caller asks for the next one (or stops without error).
+    Records aggregated by the KPL are handed out one user record at a time; their
+    SubSequenceNumber is checkpointed too so the rest aren't skipped upon resuming.
+    """
+
+    poll_interval = 0.1  # seconds
+    idle_interval = 1.0  # seconds between reads of a shard with nothing new (shards allow 5 reads/sec)
+
+    def __init__(
+        self,
+        consumer: Consumer,
+        StreamName: str,
+        directory: Optional[Path] = None,
+        max_workers: int = 8,
+        depth: int = 1000,
+        initial_position: str = 'TRIM_HORIZON',
+        checkpoint_every: int = 100,
+        discovery_interval: float = 10.0
+    ):
+        self.consumer = consumer
+        self.stream_name = StreamName
+        self.directory = Path(directory or local_storage_dir / 'checkpoints' / StreamName)
+        self.initial_position = initial_position
+        self.checkpoint_every = checkpoint_every
+        self.discovery_interval = discovery_interval
+        self.records: Queue = Queue(maxsize=depth)
+        self.error: Optional[Exception] = None
+        self.shards: Dict[str, dict] = {}
+        self.readers: Dict[str, Thread] = {}
+        self.exhausted = set()
+        self.positions: Dict[str, dict] = {}
+        self.unsaved: Dict[str, int] = {}
+        self._handed_out: Optional[tuple] = None
+        self._slots = Semaphore(max_workers)
+        self._lock = RLock()
+        self._stopped = Event()
+        self._thread = Thread(target=self._discover, name=self.__class__.__name__, daemon=True)
+
+    @property
+    def commlink(self) -> Commlink:
+        return self.consumer.coordinator.commlink
+
+    def checkpoint(self, shard_id: str) -> Checkpoint:
+        return Checkpoint(self.directory / f'{shard_id}.checkpoint')
+
+    def start(self) -> 'ShardReader':
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True, processed: bool = True):
+        """Stops reading and saves progress, counting the last record handed out as `processed` if so"""
+        self._stopped.set()
+        if wait:
+            with self._lock:
+                threads = [self._thread, *self.readers.values()]
+            for thread in threads:
+                if thread.is_alive() and thread is not current_thread():
+                    thread.join()
+        if processed:
+            self._advance()
+        for shard_id in list(self.unsaved):
+            self._save(shard_id)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def _fail(self, error: Exception):
+        self.error = error
+        self._stopped.set()
+
+    def _do(self, action: Action) -> Effort:
+        effort = self.consumer.coordinator.do(action)
+        if not effort.culmination.successful:
+            raise Consumer.StreamInterrupted(effort)
+        return effort
+
+    def _list_shards(self) -> List[dict]:
+        shards, kwargs = [], {'StreamName': self.stream_name}
+        while True:
+            response = self._do(Call(Closure(self.commlink.list_partitions, **kwargs))).culmination.value
+            shards.extend(response.get('Shards', []))
+            if not response.get('NextToken'):
+                return shards
+            kwargs = {'NextToken': response['NextToken']}
+
+    def _discover(self):
+        while not self._stopped.is_set():
+            try:
+                shards = self._list_shards()
+            except Exception as e:
+                return self._fail(e)
+            with self._lock:
+                self.shards.update((shard['ShardId'], shard) for shard in shards)
+            self._schedule()
+            self._stopped.wait(self.discovery_interval)
+
+    def _schedule(self):
+        """Starts reading every known shard whose (known) parents have been read to their end"""
+        with self._lock:
+            for shard_id, shard in sorted(self.shards.items()):
+                if shard_id in self.readers or self._stopped.is_set():
+                    continue
+                parents = (shard.get('ParentShardId'), shard.get('AdjacentParentShardId'))
+                if all(parent in self.exhausted for parent in parents if parent in self.shards):
+                    reader = Thread(target=self._read, args=(shard_id,), name=f'{self.__class__.__name__}-{shard_id}')
+                    reader.daemon = True
+                    self.readers[shard_id] = reader
+                    reader.start()
+
+    def _seek(self, shard_id: str, sequence_number: Optional[str], at: bool = False) -> str:
+        kwargs = {'StreamName': self.stream_name, 'ShardId': shard_id, 'ShardIteratorType': self.initial_position}
+        if sequence_number:
+            iterator_type = 'AT_SEQUENCE_NUMBER' if at else 'AFTER_SEQUENCE_NUMBER'
+            kwargs.update(ShardIteratorType=iterator_type, StartingSequenceNumber=sequence_number)
+        return self._do(Call(Closure(self.commlink.seek, **kwargs))).culmination.value['ShardIterator']
+
+    def _put(self, item: tuple) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self.records.put(item, timeout=self.poll_interval)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _read(self, shard_id: str):
+        try:
+            position = self.checkpoint(shard_id).load()
+            if not position.get('finished'):
+                sequence_number = position.get('sequence_number')
+                sub_sequence_number = position.get('sub_sequence_number')  # set if stopped within an aggregated record
+                iterator = self._seek(shard_id, sequence_number, at=sub_sequence_number is not None)
+                while iterator and not self._stopped.is_set():
+                    with self._slots:
+                        effort = self.consumer.consume(ShardIterator=iterator)
+                    if not effort.culmination.successful:
+                        if expired(cause(effort)):
+                            iterator = self._seek(shard_id, sequence_number, at=sub_sequence_number is not None)
+                            continue
+                        raise Consumer.StreamInterrupted(effort)
+
+                    response = effort.culmination.value
+                    for record in response.get('Records', []):
+                        if sub_sequence_number is not None:
+                            if (
+                                record['SequenceNumber'] == sequence_number
+                                and record.get('SubSequenceNumber', -1) <= sub_sequence_number
+                            ):
+                                continue  # handed out before the reader last stopped
+                            sub_sequence_number = None
+                        if not self._put((shard_id, record)):
+                            return
+                        sequence_number = record['SequenceNumber']
+                    iterator = response.get('NextShardIterator')
+                    if iterator and not response.get('Records') and not response.get('MillisBehindLatest'):
+                        self._stopped.wait(self.idle_interval)
+
+                if iterator or not self._put((shard_id, None)):  # marks the end of a closed shard
+                    return
+
+            with self._lock:
+                self.exhausted.add(shard_id)
+            self._schedule()
+        except Exception as e:
+            self._fail(e)
+
+    def _advance(self):
+        """Counts the record last handed out as processed"""
+        if self._handed_out is None:
+            return
+        shard_id, sequence_number, sub_sequence_number = self._handed_out
+        self._handed_out = None
+        self.positions[shard_id] = {'sequence_number': sequence_number}
+        if sub_sequence_number is not None:
+            self.positions[shard_id]['sub_sequence_number'] = sub_sequence_number
+        self.unsaved[shard_id] = self.unsaved.get(shard_id, 0) + 1
+        if self.unsaved[shard_id] >= self.checkpoint_every:
+            self._save(shard_id)
+
+    def _save(self, shard_id: str):
+        self.checkpoint(shard_id).save(**self.positions[shard_id])
+        self.unsaved.pop(shard_id, None)
+
+    def get(self, timeout: Optional[float] = None) -> dict:
+        """Waits for the next record, raising `queue.Empty` if none arrives within `timeout` seconds"""
+        deadline = monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - monotonic())
+            shard_id, record = self.records.get(timeout=remaining)
+            self._advance()
+            if record is not None:
+                self._handed_out = (shard_id, record['SequenceNumber'], record.get('SubSequenceNumber'))
+                return record
+            self.positions[shard_id] = {**self.positions.get(shard_id, {}), 'finished': True}
+            self._save(shard_id)
+
+    def __iter__(self) -> 'ShardReader':
+        return self
+
+    def __next__(self) -> dict:
+        while True:
+            try:
+                return self.get(timeout=self.poll_interval)
+            except Empty:
+                if self.error:
+                    raise self.error
+                if not self.running:
+                    raise StopIteration
+
+    def __enter__(self) -> 'ShardReader':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop(processed=exc_type is None)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.stream_name}[{len(self.readers)} shards]>'
+
+
+def expired(error: Exception) -> bool:
+    """Whether the error is Kinesis reporting a shard iterator to have expired"""
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'ExpiredIteratorException'
 
 
 class Agent:
@@ -250,11 +1692,106 @@ class Agent:
             raise TypeError(f'{self.__class__.__name__} publisher must be of type {Publisher.__name__} not {type(publisher).__name__}')
 
         setattr(self, consumer.consume.__name__, consumer.consume)
+        setattr(self, consumer.aconsume.__name__, consumer.aconsume)
         setattr(self, publisher.publish.__name__, publisher.publish)
+        setattr(self, publisher.apublish.__name__, publisher.apublish)
+        self.__publisher = publisher
 
         consumer_repr = repr(consumer).strip('<>')
         publisher_repr = repr(publisher).strip('<>')
         self.__repr = f'<{self.__class__.__name__}|{consumer_repr}|{publisher_repr}>'
 
+    def replay(
+        self,
+        store: Optional[DeadletterStore] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        max_workers: int = 8,
+        checkpoint_every: int = 100
+    ) -> Iterator[Effort]:
+        """Republishes deadletters in concurrent batches, yielding an Effort for each call made
+
+        Records are read from `store` (by default, the publisher's or the one under
+        `local_storage_dir`) starting where `checkpoint` (by default, one per Broker)
+        left off. Consecutive sends to the same target are republished together as a
+        `Batch`, as are batches deadlettered whole, so the Broker's limits hold. The
+        checkpoint advances after every `checkpoint_every` records and whenever
+        replaying stops. Records meant for other Brokers are left for their own.
+        Republishing that fails again (including entries of a batch reported as
+        failed) is deadlettered anew by the Publisher.
+        """
+        publisher = self.__publisher
+        commlink = publisher.coordinator.commlink
+        broker = commlink.broker
+        try:
+            batching: Optional[Batching] = broker.batching
+        except NotImplementedError:
+            batching = None
+        store = store or getattr(publisher.coordinator.contingency, 'deadletters', None) or DeadletterStore()
+        checkpoint = checkpoint or Checkpoint(store.directory / f'replay.{broker.value}.checkpoint')
+        position = checkpoint.load()
+        records = store.read(position.get('segment'), position.get('offset', 0))
+        in_flight = deque()
+        last_read = completed = None
+
+        def batched(group: List[tuple], target: str) -> Action:
+            batch = Batch(commlink, [entry for _, _, entry in group], **{batching.target: target})
+            segment, offset, _ = group[-1]
+            in_flight.append((segment, offset, None, batch, len(group)))
+            return Call(Closure(batch.deliver))
+
+        def republications() -> Iterator[Action]:
+            nonlocal last_read
+            group, target = [], None
+            for segment, offset, record in records:
+                last_read = (segment, offset)
+                if record.get('broker') != broker.value:
+                    continue
+                entry = None
+                if batching and record['alias'] == 'send' and not record['args']:
+                    entry = batching.entry(record['kwargs'], len(group))
+                if group and (
+                    entry is None
+                    or record['kwargs'][batching.target] != target
+                    or len(group) == batching.max_entries
+                ):
+                    yield batched(group, target)
+                    group = []
+                    if entry is not None:
+                        entry = batching.entry(record['kwargs'], 0)
+                if entry is not None:
+                    group.append((segment, offset, entry))
+                    target = record['kwargs'][batching.target]
+                elif record['alias'] == 'send_batch':
+                    kwargs = dict(record['kwargs'])
+                    batch = Batch(commlink, kwargs.pop(batching.param), **kwargs)
+                    in_flight.append((segment, offset, record, batch, 1))
+                    yield Call(Closure(batch.deliver))
+                else:
+                    in_flight.append((segment, offset, record, None, 1))
+                    yield Call(Closure(getattr(commlink, record['alias']), *record['args'], **record['kwargs']))
+            if group:
+                yield batched(group, target)
+
+        try:
+            efforts = publisher.coordinator.do_many(republications(), max_workers=max_workers, ordered=True)
+            unsaved = 0
+            for effort in efforts:
+                segment, offset, record, batch, count = in_flight.popleft()
+                if batch is None:
+                    publisher.deadletter(effort, record['alias'], *record['args'], **record['kwargs'])
+                else:
+                    publisher.deadletter(effort, 'send_batch', **{batch.batching.param: batch.pending}, **batch.kwargs)
+                completed = (segment, offset)
+                unsaved += count
+                if unsaved >= checkpoint_every:
+                    checkpoint.save(segment=segment.name, offset=offset)
+                    unsaved = 0
+                yield effort
+            completed = last_read
+        finally:
+            if completed:
+                segment, offset = completed
+                checkpoint.save(segment=segment.name, offset=offset)
+
     def __repr__(self) -> str:
         return self.__repr
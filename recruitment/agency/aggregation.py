@@ -0,0 +1,187 @@
+from hashlib import md5
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+magic = b'\xf3\x89\x9a\xc2'  # marks Kinesis records aggregated per the KPL's format
+digest_size = 16
+max_record_bytes = 1024 * 1024  # a Kinesis record's data and partition key, together
+
+
+#- Protobuf wire format (https://protobuf.dev/programming-guides/encoding/) -->>>
+
+
+VARINT, LENGTH_DELIMITED = 0, 2
+
+
+def varint(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, value = value & 0x7f, value >> 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
+
+
+def field(number: int, value: bytes) -> bytes:
+    """Encodes a length-delimited field"""
+    return varint(number << 3 | LENGTH_DELIMITED) + varint(len(value)) + value
+
+
+def read_varint(buffer: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+
+def fields(buffer: bytes) -> Iterator[Tuple[int, object]]:
+    """Yields (field number, value) for each varint or length-delimited field"""
+    position = 0
+    while position < len(buffer):
+        key, position = read_varint(buffer, position)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == VARINT:
+            value, position = read_varint(buffer, position)
+        elif wire_type == LENGTH_DELIMITED:
+            length, position = read_varint(buffer, position)
+            value, position = buffer[position:position + length], position + length
+            if len(value) != length:
+                raise ValueError('Truncated field.')
+        else:
+            raise ValueError(f'Unsupported wire type: {wire_type}.')
+        yield number, value
+
+
+#- Aggregation ------------------------------->>>
+
+
+class AggregatedRecord:
+    """User records sharing a partition key packed into a single Kinesis record
+
+    Encoded as the KPL does: the magic bytes, an `AggregatedRecord` protobuf
+    message, then the message's MD5 digest. Since every user record shares the
+    partition key, all of them land on the same shard, in order.
+    """
+
+    # AggregatedRecord: partition_key_table = 1, explicit_hash_key_table = 2, records = 3
+    # Record: partition_key_index = 1, explicit_hash_key_index = 2, data = 3
+
+    def __init__(self, partition_key: str, explicit_hash_key: Optional[str] = None):
+        self.partition_key = partition_key
+        self.explicit_hash_key = explicit_hash_key
+        self.header = field(1, partition_key.encode())
+        if explicit_hash_key:
+            self.header += field(2, explicit_hash_key.encode())
+        self.records: List[bytes] = []
+        self.data: List[bytes] = []
+        self.size = len(magic) + len(self.header) + digest_size + len(partition_key.encode())
+
+    def encoded_record(self, data: bytes) -> bytes:
+        index = varint(1 << 3 | VARINT) + varint(0)
+        if self.explicit_hash_key:
+            index += varint(2 << 3 | VARINT) + varint(0)
+        return field(3, index + field(3, data))
+
+    def fits(self, data: bytes, max_bytes: int = max_record_bytes) -> bool:
+        return self.size + len(self.encoded_record(data)) <= max_bytes
+
+    def add(self, data: bytes):
+        record = self.encoded_record(data)
+        self.records.append(record)
+        self.data.append(data)
+        self.size += len(record)
+
+    def serialize(self) -> bytes:
+        message = self.header + b''.join(self.records)
+        return magic + message + md5(message).digest()
+
+    def asentry(self) -> dict:
+        """Renders a `put_records` entry; a lone user record is left unaggregated"""
+        entry = {'PartitionKey': self.partition_key}
+        if self.explicit_hash_key:
+            entry['ExplicitHashKey'] = self.explicit_hash_key
+        entry['Data'] = self.data[0] if len(self.data) == 1 else self.serialize()
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.partition_key}[{len(self)} records]>'
+
+
+def aggregate(records: Iterable[dict], max_bytes: int = max_record_bytes) -> Iterator[dict]:
+    """Packs `put_records` entries (each having Data and a PartitionKey) into as few entries as fit in `max_bytes`
+
+    Records are grouped by partition key (and explicit hash key, if given) and
+    kept in the order given within each group. An aggregated record is yielded
+    once full; the rest are yielded, in order of first appearance, at the end.
+    """
+    open_records: Dict[Tuple[str, Optional[str]], AggregatedRecord] = {}
+    for record in records:
+        data = record['Data'].encode() if isinstance(record['Data'], str) else bytes(record['Data'])
+        key = (record['PartitionKey'], record.get('ExplicitHashKey'))
+        aggregated = open_records.get(key)
+        if aggregated is not None and not aggregated.fits(data, max_bytes):
+            yield open_records.pop(key).asentry()
+            aggregated = None
+        if aggregated is None:
+            aggregated = open_records[key] = AggregatedRecord(*key)
+            if not aggregated.fits(data, max_bytes):
+                raise ValueError(f'Record for partition key {key[0]} exceeds {max_bytes} bytes.')
+        aggregated.add(data)
+
+    for aggregated in open_records.values():
+        yield aggregated.asentry()
+
+
+def is_aggregated(data: bytes) -> bool:
+    if not isinstance(data, (bytes, bytearray)) or len(data) < len(magic) + digest_size or not data.startswith(magic):
+        return False
+    message = data[len(magic):-digest_size]
+    return md5(message).digest() == data[-digest_size:]
+
+
+def deaggregate(record: dict) -> List[dict]:
+    """Unpacks a record (as given by `get_records`) into its user records
+
+    Each user record keeps the aggregated record's other fields (e.g. its
+    SequenceNumber) and is numbered by a SubSequenceNumber. Records that were
+    not aggregated are returned as they are.
+    """
+    data = record['Data']
+    if not is_aggregated(data):
+        return [record]
+
+    partition_keys, explicit_hash_keys, user_records = [], [], []
+    for number, value in fields(data[len(magic):-digest_size]):
+        if number == 1:
+            partition_keys.append(value.decode())
+        elif number == 2:
+            explicit_hash_keys.append(value.decode())
+        elif number == 3:
+            user_records.append(dict(fields(value)))
+
+    deaggregated = []
+    for sub_sequence_number, user_record in enumerate(user_records):
+        unpacked = {
+            **record,
+            'Data': user_record.get(3, b''),
+            'PartitionKey': partition_keys[user_record.get(1, 0)],
+            'SubSequenceNumber': sub_sequence_number,
+        }
+        if 2 in user_record:
+            unpacked['ExplicitHashKey'] = explicit_hash_keys[user_record[2]]
+        deaggregated.append(unpacked)
+    return deaggregated
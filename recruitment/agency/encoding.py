@@ -0,0 +1,136 @@
+import gzip
+import json
+import lzma
+import zlib
+
+from base64 import b64decode
+from base64 import b64encode
+from enum import auto
+from typing import Any
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from recruitment.agency.resources import NaturalEnum
+
+
+magic = b'\x00rc'  # precedes the tag of binary payloads
+prefix = 'rc:'  # precedes the tag of text payloads
+
+
+class Serialization(NaturalEnum):
+    """How values become bytes (members are tagged by position so only ever append)"""
+
+    json = auto()
+    raw = auto()  # bytes pass through; str is UTF-8 encoded
+
+
+class Compression(NaturalEnum):
+    """How serialized values are compressed (members are tagged by position so only ever append)"""
+
+    none = auto()
+    zlib = auto()
+    gzip = auto()
+    lzma = auto()
+
+
+compressors = {
+    Compression.zlib: (zlib.compress, zlib.decompress),
+    Compression.gzip: (gzip.compress, gzip.decompress),
+    Compression.lzma: (lzma.compress, lzma.decompress),
+}
+
+
+class Codec:
+    """Encodes payloads such that they're decoded transparently on the other end
+
+    Values are serialized then, when at least `threshold` bytes, compressed
+    (so long as doing so makes them smaller). Payloads are tagged with how they
+    were encoded: binary payloads are prefixed with `magic` and two bytes while
+    text payloads (for services carrying only text) are prefixed like
+    "rc:json/gzip:" and hold base64 unless uncompressed JSON. Payloads without
+    a tag are decoded as they are.
+    """
+
+    def __init__(
+        self,
+        serialization: Serialization = Serialization.json,
+        compression: Compression = Compression.zlib,
+        threshold: int = 1024
+    ):
+        self.serialization = Serialization(serialization)
+        self.compression = Compression(compression)
+        self.threshold = threshold
+
+    def serialize(self, value: Any) -> bytes:
+        if self.serialization == Serialization.json:
+            return json.dumps(value, separators=(',', ':')).encode()
+        return value.encode() if isinstance(value, str) else bytes(value)
+
+    @staticmethod
+    def deserialize(serialization: Serialization, body: bytes) -> Any:
+        if serialization == Serialization.json:
+            return json.loads(body)
+        return body
+
+    def compress(self, body: bytes) -> Tuple[Compression, bytes]:
+        if self.compression == Compression.none or len(body) < self.threshold:
+            return Compression.none, body
+        compressed = compressors[self.compression][0](body)
+        if len(compressed) >= len(body):
+            return Compression.none, body
+        return self.compression, compressed
+
+    def encode(self, value: Any, text: bool = False) -> Union[bytes, str]:
+        compression, body = self.compress(self.serialize(value))
+        if not text:
+            return magic + bytes([index(self.serialization), index(compression)]) + body
+        if self.serialization == Serialization.json and compression == Compression.none:
+            return f'{prefix}{self.serialization.name}/{compression.name}:{body.decode()}'
+        return f'{prefix}{self.serialization.name}/{compression.name}:{b64encode(body).decode()}'
+
+    @staticmethod
+    def untag(payload: Union[bytes, str]) -> Optional[Tuple[Serialization, Compression, Union[bytes, str]]]:
+        """Reads how a payload was encoded, if it bears a tag this Codec recognizes"""
+        if isinstance(payload, (bytes, bytearray)) and payload[:len(magic)] == magic:
+            header = payload[len(magic):len(magic) + 2]
+            if len(header) < 2 or header[0] >= len(Serialization) or header[1] >= len(Compression):
+                return None
+            return list(Serialization)[header[0]], list(Compression)[header[1]], bytes(payload[len(magic) + 2:])
+        if isinstance(payload, str) and payload.startswith(prefix):
+            tag, separator, body = payload[len(prefix):].partition(':')
+            serialization, slash, compression = tag.partition('/')
+            if not (separator and slash) or serialization not in Serialization.__members__ or compression not in Compression.__members__:
+                return None
+            return Serialization(serialization), Compression(compression), body
+        return None
+
+    @classmethod
+    def decode(cls, payload: Union[bytes, str]) -> Any:
+        """Decodes a tagged payload, raising `Codec.Undecodable` should that fail; others are returned as they are"""
+        tagged = cls.untag(payload)
+        if tagged is None:
+            return payload
+
+        serialization, compression, body = tagged
+        try:
+            if isinstance(body, str):
+                if serialization == Serialization.json and compression == Compression.none:
+                    body = body.encode()
+                else:
+                    body = b64decode(body, validate=True)
+            if compression != Compression.none:
+                body = compressors[compression][1](body)
+            return cls.deserialize(serialization, body)
+        except Exception as e:
+            raise Codec.Undecodable(f'Payload tagged {serialization.name}/{compression.name} failed to decode: {e}') from e
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.serialization.name}/{self.compression.name}>'
+
+    class Undecodable(Exception):
+        pass
+
+
+def index(member: NaturalEnum) -> int:
+    return list(type(member)).index(member)
@@ -0,0 +1,160 @@
+import json
+
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from recruitment.agency.resources import CompactEffort
+from recruitment.agency.resources import Effort
+
+
+Labels = Tuple[str, str]  # (broker, alias)
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # seconds
+
+
+class Histogram:
+    """Counts observations falling at or below each of a fixed set of bucket bounds"""
+
+    def __init__(self, buckets: Sequence[float] = latency_buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)  # last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """Yields (upper bound, observations at or below it) for each bucket"""
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q: float) -> float:
+        """Estimates the q-quantile as the upper bound of the bucket containing it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')  # pragma: no cover
+
+    def asdict(self) -> dict:
+        return {
+            'buckets': {('+Inf' if bound == float('inf') else bound): total for bound, total in self.cumulative()},
+            'sum': self.sum,
+            'count': self.count,
+        }
+
+
+class Stats:
+    """Tallies for the work done on behalf of a single Broker alias"""
+
+    def __init__(self, buckets: Sequence[float] = latency_buckets):
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuits = 0
+        self.latency = Histogram(buckets)
+
+    def record(self, effort: Union[Effort, CompactEffort], seconds: float):
+        self.calls += 1
+        if effort.culmination.successful:
+            self.successes += 1
+        else:
+            self.failures += 1
+        if effort.short_circuited:
+            self.short_circuits += 1
+        self.retries += effort.retry_count
+        self.latency.observe(seconds)
+
+    def asdict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'successes': self.successes,
+            'failures': self.failures,
+            'retries': self.retries,
+            'short_circuits': self.short_circuits,
+            'latency': self.latency.asdict(),
+        }
+
+
+class Metrics:
+    """An in-process registry of Stats kept per (broker, alias)
+
+    Pass one to any number of Coordinators to have their work recorded.
+    """
+
+    counters = ('calls', 'successes', 'failures', 'retries', 'short_circuits')
+
+    def __init__(self, buckets: Sequence[float] = latency_buckets, namespace: str = 'recruitment'):
+        self.buckets = tuple(buckets)
+        self.namespace = namespace
+        self._stats: Dict[Labels, Stats] = {}
+        self._lock = Lock()
+
+    def record(self, broker: str, alias: str, effort: Union[Effort, CompactEffort], seconds: float):
+        with self._lock:
+            labels = (broker, alias)
+            if labels not in self._stats:
+                self._stats[labels] = Stats(self.buckets)
+            self._stats[labels].record(effort, seconds)
+
+    def get(self, broker: str, alias: str) -> dict:
+        with self._lock:
+            stats = self._stats.get((broker, alias)) or Stats(self.buckets)
+            return stats.asdict()
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def __iter__(self) -> Iterator[Labels]:
+        with self._lock:
+            return iter(sorted(self._stats))
+
+    def asdict(self) -> Dict[str, Dict[str, dict]]:
+        with self._lock:
+            snapshot: Dict[str, Dict[str, dict]] = {}
+            for (broker, alias), stats in sorted(self._stats.items()):
+                snapshot.setdefault(broker, {})[alias] = stats.asdict()
+            return snapshot
+
+    def asjson(self, **kwargs) -> str:
+        return json.dumps(self.asdict(), **kwargs)
+
+    def asprometheus(self) -> str:
+        """Renders the registry in the Prometheus text exposition format"""
+        with self._lock:
+            stats = sorted(self._stats.items())
+            lines = []
+            for counter in self.counters:
+                name = f'{self.namespace}_{counter}_total'
+                lines.append(f'# TYPE {name} counter')
+                for (broker, alias), s in stats:
+                    lines.append(f'{name}{{broker="{broker}",alias="{alias}"}} {getattr(s, counter)}')
+
+            name = f'{self.namespace}_latency_seconds'
+            lines.append(f'# TYPE {name} histogram')
+            for (broker, alias), s in stats:
+                labels = f'broker="{broker}",alias="{alias}"'
+                for bound, total in s.latency.cumulative():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+                lines.append(f'{name}_sum{{{labels}}} {s.latency.sum}')
+                lines.append(f'{name}_count{{{labels}}} {s.latency.count}')
+            return '\n'.join(lines) + '\n'
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{len(self._stats)} series>'
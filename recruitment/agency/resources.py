@@ -1,12 +1,30 @@
+from actionpack import Action
+from actionpack.action import Outcome
 from actionpack.action import Result
 from actionpack.actions import RetryPolicy
 from actionpack.actions import Write
+from actionpack.utils import tally
 from actionpack import partialaction
+from collections import deque
 from enum import auto
 from enum import Enum
+from itertools import count
+from random import uniform
+from threading import Condition
+from threading import Lock
+from time import monotonic
+from time import sleep
+from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import FrozenSet
+from typing import Hashable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Tuple
+from typing import Union
 
 
 class NaturalEnum(Enum):
@@ -26,25 +44,121 @@ class Broker(NaturalEnum):
     @property
     def interface(self) -> Dict[str, Optional[str]]:
         send = 'send'
+        send_batch = 'send_batch'
         create_target = 'create_target'
         receive = 'receive'
+        describe = 'describe'
+        begin_upload = 'begin_upload'
+        send_part = 'send_part'
+        complete_upload = 'complete_upload'
+        abort_upload = 'abort_upload'
+        list_partitions = 'list_partitions'
+        seek = 'seek'
+        search = 'search'
+        acknowledge = 'acknowledge'
+        extend = 'extend'
         methods_for = {
-            Broker.logs: {receive: 'get_log_events'},
+            Broker.logs: {
+                receive: 'get_log_events',
+                send: 'put_log_events',
+                search: 'filter_log_events',
+            },
             Broker.s3: {
                 create_target: 'create_bucket',
+                describe: 'head_object',
                 receive: 'get_object',
                 send: 'upload_fileobj',
+                begin_upload: 'create_multipart_upload',
+                send_part: 'upload_part',
+                complete_upload: 'complete_multipart_upload',
+                abort_upload: 'abort_multipart_upload',
+            },
+            Broker.sns: {
+                send: 'publish',
+                send_batch: 'publish_batch',
+                create_target: 'create_topic',
             },
-            Broker.sns: {send: 'publish', create_target: 'create_topic'},
             Broker.sqs: {
                 create_target: 'create_queue',
                 receive: 'receive_message',
                 send: 'send_message',
+                send_batch: 'send_message_batch',
+                acknowledge: 'delete_message_batch',
+                extend: 'change_message_visibility_batch',
+            },
+            Broker.kinesis: {
+                send: 'put_record',
+                send_batch: 'put_records',
+                create_target: 'create_stream',
+                receive: 'get_records',
+                list_partitions: 'list_shards',
+                seek: 'get_shard_iterator',
             },
-            Broker.kinesis: {send: 'put_record', create_target: 'create_stream'},
         }
         return methods_for[self]  # KeyError should be contextualized as NotImplementedError
 
+    @property
+    def batching(self) -> 'Batching':
+        batching_for = {
+            Broker.sns: Batching(
+                param='PublishBatchRequestEntries',
+                max_entries=10,
+                max_bytes=256 * 1024,
+                target='TopicArn',
+                fields=frozenset({
+                    'Message', 'Subject', 'MessageStructure', 'MessageAttributes',
+                    'MessageDeduplicationId', 'MessageGroupId',
+                }),
+            ),
+            Broker.sqs: Batching(
+                param='Entries',
+                max_entries=10,
+                max_bytes=256 * 1024,
+                target='QueueUrl',
+                fields=frozenset({
+                    'MessageBody', 'DelaySeconds', 'MessageAttributes', 'MessageSystemAttributes',
+                    'MessageDeduplicationId', 'MessageGroupId',
+                }),
+            ),
+            Broker.kinesis: Batching(
+                param='Records',
+                max_entries=500,
+                max_bytes=5 * 1024 * 1024,
+                target='StreamName',
+                fields=frozenset({'Data', 'PartitionKey', 'ExplicitHashKey'}),
+                ids=False,
+            ),
+        }
+        try:
+            return batching_for[self]
+        except KeyError:
+            raise NotImplementedError(f'{self.name} does not support batching.')
+
+    @property
+    def paging(self) -> 'Paging':
+        paging_for = {
+            Broker.logs: Paging(items='events', token='nextForwardToken', param='nextToken'),
+            Broker.sqs: Paging(items='Messages'),
+            Broker.kinesis: Paging(items='Records', token='NextShardIterator', param='ShardIterator'),
+        }
+        try:
+            return paging_for[self]
+        except KeyError:
+            raise NotImplementedError(f'{self.name} does not support streaming.')
+
+
+    @property
+    def payload(self) -> 'Payload':
+        payload_for = {
+            Broker.sns: Payload(param='Message', text=True),
+            Broker.sqs: Payload(param='MessageBody', text=True, items='Messages', field='Body'),
+            Broker.kinesis: Payload(param='Data', text=False, items='Records', field='Data'),
+        }
+        try:
+            return payload_for[self]
+        except KeyError:
+            raise NotImplementedError(f'{self.name} does not support encoded payloads.')
+
 
 class From(NaturalEnum):
     env = auto()
@@ -55,9 +169,465 @@ class CloudProvider(NaturalEnum):
     AWS = auto()
 
 
+class CircuitState(NaturalEnum):
+    closed = auto()
+    open = auto()
+    half_open = auto()
+
+
+class Jitter(NaturalEnum):
+    none = auto()
+    full = auto()
+    equal = auto()
+    decorrelated = auto()
+
+
 #- Helpful Types ----------------------------->>>
 
 
+class Batching(NamedTuple):
+    """Limits imposed by a Broker on a single batch request and how a single send becomes one of its entries"""
+
+    param: str
+    max_entries: int
+    max_bytes: int
+    target: str  # the param shared by every entry of a batch request
+    fields: FrozenSet[str] = frozenset()  # the params of a single send an entry may carry
+    ids: bool = True  # whether entries are told apart by an Id
+
+    def entry(self, params: dict, number: int) -> Optional[dict]:
+        """Renders a single send's params as the numbered entry of a batch request, if they fit in one"""
+        fields = set(params) - {self.target}
+        if self.target not in params or not fields <= self.fields:
+            return None
+        entry = {name: params[name] for name in fields}
+        if self.ids:
+            entry['Id'] = str(number)
+        return entry
+
+
+class Paging(NamedTuple):
+    """Where a Broker's responses keep their items and, if paginated, the token for the next page"""
+
+    items: str
+    token: Optional[str] = None
+    param: Optional[str] = None
+
+
+class Payload(NamedTuple):
+    """Where a Broker carries payloads when sending and, if it can, where received items keep them"""
+
+    param: str
+    text: bool  # whether only text can be carried
+    items: Optional[str] = None
+    field: Optional[str] = None
+
+
+def sizeof(value: Any) -> int:
+    """Approximates the number of bytes a value occupies on the wire"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, dict):
+        return sum(sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(v) for v in value)
+    return len(str(value))
+
+
+class Backoff:
+    """A description of how long to wait between attempts
+
+    Delays grow exponentially from `base` seconds and never exceed `cap` seconds.
+    Jitter spreads retries out so that many clients don't retry in lockstep
+    (see https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/).
+    """
+
+    def __init__(
+        self,
+        base: float = 0.1,
+        cap: Optional[float] = 20.0,
+        jitter: Jitter = Jitter.full,
+        random: Callable[[float, float], float] = uniform
+    ):
+        if base < 0 or (cap is not None and cap < 0):
+            raise ValueError(f'Delays cannot be negative. Given base={base} and cap={cap}.')
+        self.base = base
+        self.cap = cap
+        self.jitter = Jitter(jitter)
+        self.random = random
+
+    def capped(self, delay: float) -> float:
+        return delay if self.cap is None else min(self.cap, delay)
+
+    def delays(self) -> Iterator[float]:
+        previous = self.base
+        for attempt in count():
+            exponential = self.capped(self.base * 2 ** min(attempt, 64))
+            if self.jitter == Jitter.full:
+                delay = self.random(0, exponential)
+            elif self.jitter == Jitter.equal:
+                delay = exponential / 2 + self.random(0, exponential / 2)
+            elif self.jitter == Jitter.decorrelated:
+                delay = self.capped(self.random(self.base, previous * 3))
+            else:
+                delay = exponential
+            previous = delay
+            yield delay
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.jitter.name}[{self.base}s..{self.cap}s]>'
+
+
+class TokenBucket:
+    """A thread-safe store of tokens replenished at `rate` tokens/sec up to `capacity`"""
+
+    def __init__(
+        self,
+        capacity: float,
+        rate: float,
+        clock: Callable[[], float] = monotonic
+    ):
+        self.capacity = capacity
+        self.rate = rate
+        self.clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._lock = Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def take(self, tokens: float = 1) -> bool:
+        """Removes tokens if enough are available; never blocks"""
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def give(self, tokens: float):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Removes tokens, going into debt if need be, returning the seconds until the debt is repaid"""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RetryBudget(TokenBucket):
+    """A shared allowance of retries
+
+    Each retry spends a token. Tokens are replenished at `rate` per second and
+    every successful attempt deposits `ratio` tokens so the retry allowance
+    scales with healthy traffic. Once spent, retries stop for every user of the budget.
+    """
+
+    def __init__(
+        self,
+        capacity: float = 10,
+        rate: float = 1.0,
+        ratio: float = 0.1,
+        clock: Callable[[], float] = monotonic
+    ):
+        super().__init__(capacity, rate, clock)
+        self.ratio = ratio
+
+    def spend(self) -> bool:
+        return self.take(1)
+
+    def earn(self):
+        self.give(self.ratio)
+
+    class Exhausted(RetryPolicy.Expired):
+        pass
+
+
+class Quota(NamedTuple):
+    """A rate of requests and/or bytes per second, with `burst` seconds' worth allowed at once"""
+
+    requests: Optional[float] = None
+    bytes: Optional[float] = None
+    burst: float = 1.0
+
+
+class RateLimiter:
+    """Paces calls made through each Broker alias to stay within a Quota
+
+    Each call reserves a request (and its size in bytes) from the alias' token
+    buckets and, once those run dry, waits until the reservation is covered.
+    Since reservations are taken in order of arrival, callers on any number of
+    threads are spaced evenly rather than retrying into throttling. Share one
+    among Commlinks to pace them together.
+    """
+
+    def __init__(
+        self,
+        quotas: Dict[str, Quota],
+        clock: Callable[[], float] = monotonic,
+        sleep: Callable[[float], Any] = sleep
+    ):
+        self.quotas = dict(quotas)
+        self.sleep = sleep
+        self.buckets: Dict[str, List[Tuple[TokenBucket, bool]]] = {}
+        for alias, quota in self.quotas.items():
+            self.buckets[alias] = [
+                (TokenBucket(max(1.0, rate * quota.burst), rate, clock), by_size)
+                for rate, by_size in ((quota.requests, False), (quota.bytes, True))
+                if rate
+            ]
+
+    def acquire(self, alias: str, size: int = 0) -> float:
+        """Waits for the alias' quota to allow a call of `size` bytes, returning the seconds waited"""
+        wait = 0.0
+        for bucket, by_size in self.buckets.get(alias, []):
+            if by_size and not size:
+                continue
+            wait = max(wait, bucket.reserve(size if by_size else 1))
+        if wait:
+            self.sleep(wait)
+        return wait
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{",".join(sorted(self.quotas))}>'
+
+
+class CircuitBreaker:
+    """Tracks failure rates per endpoint and fails fast while an endpoint is deemed unhealthy
+
+    A circuit opens once at least `failure_threshold` of the last `window` calls
+    (and no fewer than `minimum_calls`) have failed. After `cooldown` seconds, the
+    circuit becomes half-open, letting `probes` calls through; it closes again if
+    they succeed and reopens if any fail.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window: int = 20,
+        minimum_calls: int = 5,
+        cooldown: float = 30.0,
+        probes: int = 1,
+        clock: Callable[[], float] = monotonic
+    ):
+        if not 0 < failure_threshold <= 1:
+            raise ValueError(f'The failure_threshold must be within (0, 1]. Given {failure_threshold}.')
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.minimum_calls = minimum_calls
+        self.cooldown = cooldown
+        self.probes = probes
+        self.clock = clock
+        self._circuits: Dict[Hashable, Circuit] = {}
+        self._lock = Lock()
+
+    def circuit(self, endpoint: Hashable) -> 'Circuit':
+        with self._lock:
+            if endpoint not in self._circuits:
+                self._circuits[endpoint] = Circuit(self, endpoint)
+            return self._circuits[endpoint]
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{len(self._circuits)} circuits>'
+
+    class Open(Exception):
+        pass
+
+
+class Circuit:
+    """The health of a single endpoint as judged by a CircuitBreaker"""
+
+    def __init__(self, breaker: CircuitBreaker, endpoint: Hashable):
+        self.breaker = breaker
+        self.endpoint = endpoint
+        self.outcomes: deque = deque(maxlen=breaker.window)
+        self.opened_at: Optional[float] = None
+        self.probing = 0
+        self._state = CircuitState.closed
+        self._lock = Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._transition()
+
+    def _transition(self) -> CircuitState:
+        if self._state == CircuitState.open and self.breaker.clock() - self.opened_at >= self.breaker.cooldown:
+            self._state, self.probing = CircuitState.half_open, 0
+        return self._state
+
+    def _open(self):
+        self._state, self.opened_at = CircuitState.open, self.breaker.clock()
+        self.outcomes.clear()
+
+    def allows(self) -> bool:
+        """Determines whether a call may proceed; half-open circuits admit a limited number of probes"""
+        with self._lock:
+            state = self._transition()
+            if state == CircuitState.closed:
+                return True
+            if state == CircuitState.half_open and self.probing < self.breaker.probes:
+                self.probing += 1
+                return True
+            return False
+
+    def record(self, successful: bool):
+        with self._lock:
+            state = self._transition()
+            if state == CircuitState.half_open:
+                self.probing = max(0, self.probing - 1)
+                if successful:
+                    self._state = CircuitState.closed
+                    self.outcomes.clear()
+                else:
+                    self._open()
+                return
+
+            self.outcomes.append(successful)
+            failures = self.outcomes.count(False)
+            if (
+                state == CircuitState.closed
+                and len(self.outcomes) >= self.breaker.minimum_calls
+                and failures / len(self.outcomes) >= self.breaker.failure_threshold
+            ):
+                self._open()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.state.name}>'
+
+
+throttling_codes = frozenset({
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'TransactionInProgressException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException',
+})
+
+
+server_error_codes = frozenset({'InternalError', 'InternalFailure', 'InternalServerError', 'ServiceUnavailable'})
+
+
+def throttled(error: Any) -> bool:
+    """Whether an error means the service wants less traffic: throttling or a 5xx
+
+    Besides botocore's ClientError, errors gathering others (e.g. a `Batch.Incomplete`)
+    count if any they gathered do or if any `codes` reported for failed entries are
+    those of throttling or a server error.
+    """
+    if any(throttled(gathered) for gathered in getattr(error, 'errors', None) or []):
+        return True
+    if any(code in throttling_codes or code in server_error_codes for code in getattr(error, 'codes', None) or []):
+        return True
+    response = getattr(error, 'response', None)
+    if not isinstance(response, dict):
+        return False
+    if response.get('Error', {}).get('Code') in throttling_codes:
+        return True
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+    return status == 429 or status >= 500
+
+
+class AdaptiveConcurrency:
+    """Limits work in flight, raising the limit as calls succeed and cutting it when throttled (AIMD)
+
+    Each success raises the limit by `increase / limit` (so roughly `increase`
+    per round of work in flight) while an Effort with any throttled attempt
+    multiplies it by `decrease`. Cuts happen at most once per `cooldown` seconds
+    so that a wave of throttled calls already in flight counts only once. The
+    limit stays within [`minimum`, `maximum`].
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = monotonic
+    ):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError(f'Expected 1 <= minimum <= initial <= maximum. Given {minimum}, {initial}, {maximum}.')
+        if not 0 < decrease < 1:
+            raise ValueError(f'The decrease must be within (0, 1). Given {decrease}.')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.clock = clock
+        self.in_flight = 0
+        self._limit = float(initial)
+        self._decreased_at: Optional[float] = None
+        self._condition = Condition()
+
+    @property
+    def limit(self) -> int:
+        """How much work may currently be in flight"""
+        return max(self.minimum, int(self._limit))
+
+    def acquire(self):
+        """Waits until there's room under the limit for more work"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    def release(self, effort: Optional['Effort'] = None):
+        """Makes room for more work, adjusting the limit per how the effort went"""
+        with self._condition:
+            self.in_flight -= 1
+            if effort is not None:
+                self.record(effort)
+            self._condition.notify_all()
+
+    def record(self, effort: Union['Effort', 'CompactEffort']):
+        with self._condition:
+            if effort.throttled:
+                now = self.clock()
+                if self._decreased_at is None or now - self._decreased_at >= self.cooldown:
+                    self._limit = max(float(self.minimum), self._limit * self.decrease)
+                    self._decreased_at = now
+            elif effort.culmination.successful:
+                self._limit = min(float(self.maximum), self._limit + self.increase / self._limit)
+            self._condition.notify_all()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.in_flight}/{self.limit}>'
+
+
+def cause(effort: Union['Effort', 'CompactEffort']) -> Any:
+    """The error an unsuccessful Effort ended with: that of its final attempt, should retries have run out"""
+    error = effort.culmination.value
+    if isinstance(error, (RetryPolicy.Expired, RetryBudget.Exhausted)):
+        return error.__cause__ or getattr(effort, 'final_attempt', effort.culmination).value
+    return error
+
+
 class Effort:
 
     def __init__(self, culmination: Result, *attempts: List[Result]):
@@ -72,17 +642,141 @@ class Effort:
             self.attempts.append(self.initial_attempt)
         self.final_attempt = self.retries[-1] if any(self.retries) else self.initial_attempt
 
+    @property
+    def attempt_count(self) -> int:
+        return len(self.attempts)
+
+    @property
+    def retry_count(self) -> int:
+        return len(self.retries)
+
+    @property
+    def throttled(self) -> bool:
+        """Whether any attempt was throttled (or met with a server error)"""
+        return any(throttled(attempt.value) for attempt in self.attempts if not attempt.successful)
+
+    @property
+    def short_circuited(self) -> bool:
+        """Whether the work was abandoned because its endpoint's circuit was open"""
+        return isinstance(self.culmination.value, CircuitBreaker.Open)
+
     def __repr__(self) -> str:
         name = self.__class__.__name__
-        retries = ':retries' if self.retries else ''
-        status = 'succeeded' if self.culmination.successful else 'failed'
+        retries = ':retries' if self.retry_count else ''
+        if self.short_circuited:
+            status = 'short-circuited'
+        else:
+            status = 'succeeded' if self.culmination.successful else 'failed'
 
         return f'<{name}:{status}{retries}>'
 
 
+class CompactEffort:
+    """An Effort that keeps only its culmination and a tally of attempts
+
+    Intended for hot paths where holding every attempt's Result (and exception)
+    would otherwise keep them alive for as long as the Effort.
+    """
+
+    __slots__ = ('culmination', 'attempt_count', 'retry_count', 'throttled')
+
+    def __init__(self, culmination: Result, attempt_count: int = 1, throttled: bool = False):
+        self.culmination: Result = culmination
+        self.attempt_count = attempt_count
+        self.retry_count = max(0, attempt_count - 1)
+        self.throttled = throttled
+
+    short_circuited = Effort.short_circuited
+    __repr__ = Effort.__repr__
+
+
+class MultipartEffort(Effort):
+    """An Effort made of the Efforts spent on each part of a multipart transfer
+
+    The `parts` map each part number to its Effort so retries can be attributed
+    to the parts that needed them; attempts and retries are tallied across parts.
+    """
+
+    def __init__(self, culmination: Result, parts: Dict[int, Union[Effort, CompactEffort]]):
+        super().__init__(culmination)
+        self.parts = parts
+
+    @property
+    def attempt_count(self) -> int:
+        return sum(part.attempt_count for part in self.parts.values())
+
+    @property
+    def retry_count(self) -> int:
+        return sum(part.retry_count for part in self.parts.values())
+
+    @property
+    def throttled(self) -> bool:
+        return any(part.throttled for part in self.parts.values())
+
+    @property
+    def retried_parts(self) -> List[int]:
+        return sorted(number for number, part in self.parts.items() if part.retry_count)
+
+
 #- Custom Actions ---------------------------->>>
 
 
+def perform(action: Action) -> Result:
+    """Performs the given Action without holding actionpack's process-wide `Action.lock`
+
+    The lock serializes every `Action.perform` call across threads which would
+    otherwise prevent concurrent work from overlapping.
+    """
+    return action._perform()
+
+
 Append = partialaction('Append', Write, append=True)
-RecordedRetryPolicy = partialaction('RecordedRetryPolicy', RetryPolicy, should_record=True)
+
+
+class RecordedRetryPolicy(RetryPolicy):
+
+    def __init__(
+        self,
+        action: Action,
+        max_retries: int,
+        delay_between_attempts: int = 0,
+        should_record: bool = True,
+        backoff: Optional[Backoff] = None,
+        budget: Optional[RetryBudget] = None,
+        circuit: Optional[Circuit] = None
+    ):
+        super().__init__(action, max_retries, delay_between_attempts, should_record)
+        self.backoff = backoff
+        self.budget = budget
+        self.circuit = circuit
+        self.throttled = False  # kept whether or not attempts are recorded
+
+    def enact(self, with_delay: int = 0, counter: int = -1) -> Outcome:
+        if not isinstance(counter, int) or counter < -1:
+            raise self.Invalid(f'Cannot proceed with given `counter` param value: {counter}.')
+
+        delays = self.backoff.delays() if self.backoff else None
+        for _tally in tally(1 + self.max_retries):
+            if self.circuit and not self.circuit.allows():
+                raise CircuitBreaker.Open(f'Circuit for {self.circuit.endpoint} is open. Will not perform.')
+            attempt = perform(self.action)
+            if self.circuit:
+                self.circuit.record(attempt.successful)
+            counter += _tally
+            self._retries = counter
+            if self.should_record:
+                self.attempts.append(attempt)
+            if not attempt.successful and throttled(attempt.value):
+                self.throttled = True
+            if attempt.successful:
+                if self.budget:
+                    self.budget.earn()
+                return attempt.value
+            if self.expired:
+                break
+            if self.budget and not self.budget.spend():
+                raise RetryBudget.Exhausted(f'Retry budget exhausted after {counter + 1} attempts.') from attempt.value
+            sleep(next(delays) if delays else with_delay)
+
+        raise RetryPolicy.Expired(f'Max retries exceeded: {self.max_retries}.') from attempt.value
     
\ No newline at end of file
@@ -0,0 +1,231 @@
+import json
+import os
+
+from base64 import b64decode
+from base64 import b64encode
+from datetime import datetime
+from pathlib import Path
+from threading import RLock
+from threading import Timer
+from time import monotonic
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from recruitment.agency.resources import Broker
+from recruitment.agency.resources import Effort
+
+
+local_storage_dir = Path.home() / '.recruitment/agency/'
+deadletters = local_storage_dir / 'deadletters'  # failures
+
+
+def encode(record: Dict[str, Any]) -> bytes:
+    """Serializes a record as a single line of JSON; bytes survive the round trip
+
+    Values that can't be (e.g. file objects) raise a TypeError rather than being
+    recorded as something they're not.
+    """
+    def default(value: Any):
+        if isinstance(value, (bytes, bytearray)):
+            return {'__bytes__': b64encode(value).decode()}
+        raise TypeError(f'{type(value).__name__} values cannot be recorded.')
+
+    return json.dumps(record, default=default, separators=(',', ':')).encode() + b'\n'
+
+
+def decode(line: bytes) -> Dict[str, Any]:
+    def object_hook(obj: dict):
+        if len(obj) == 1 and '__bytes__' in obj:
+            return b64decode(obj['__bytes__'])
+        return obj
+
+    return json.loads(line, object_hook=object_hook)
+
+
+class Checkpoint:
+    """A small JSON document, durably replaced on every save, for remembering progress"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+
+    def save(self, **position):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        staged = self.path.with_name(f'{self.path.name}.tmp')
+        with staged.open('w') as f:
+            json.dump(position, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staged, self.path)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.path}>'
+
+
+class DeadletterStore:
+    """An append-only, segmented log of work that failed
+
+    Records are appended to the newest segment file in `directory` until it
+    would exceed `max_segment_bytes`, at which point a new segment is started.
+    Writes are made durable in groups: an fsync is issued once `commit_every`
+    records are pending or `commit_interval` seconds after the first of them.
+    """
+
+    suffix = '.deadletters'
+
+    def __init__(
+        self,
+        directory: Path = deadletters,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        commit_every: int = 128,
+        commit_interval: float = 1.0
+    ):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.pending = 0
+        self._file: Optional[BinaryIO] = None
+        self._segment: Optional[Path] = None
+        self._segment_size = 0
+        self._committed_at = monotonic()
+        self._timer: Optional[Timer] = None
+        self._lock = RLock()
+
+    @property
+    def segments(self) -> List[Path]:
+        """All segment files, oldest first"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f'*{self.suffix}'))
+
+    def segment_name(self, number: int) -> str:
+        return f'{number:010d}{self.suffix}'
+
+    def _open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self.segments
+        segment = segments[-1] if segments else self.directory / self.segment_name(0)
+        if segment.exists() and segment.stat().st_size >= self.max_segment_bytes:
+            segment = self.directory / self.segment_name(int(segment.stem) + 1)
+        self._segment, self._file = segment, segment.open('ab')
+        self._segment_size = self._file.tell()
+
+    def _rotate(self):
+        self.commit()
+        self._file.close()
+        self._segment = self.directory / self.segment_name(int(self._segment.stem) + 1)
+        self._file = self._segment.open('ab')
+        self._segment_size = 0
+
+    def append(self, record: Dict[str, Any]) -> Path:
+        """Appends a record, returning the segment it was written to"""
+        line = encode(record)
+        with self._lock:
+            if self._file is None:
+                self._open()
+            elif self._segment_size and self._segment_size + len(line) > self.max_segment_bytes:
+                self._rotate()
+
+            self._file.write(line)
+            self._segment_size += len(line)
+            self.pending += 1
+            if self.pending >= self.commit_every or monotonic() - self._committed_at >= self.commit_interval:
+                self.commit()
+            elif self._timer is None:
+                self._timer = Timer(self.commit_interval, self.commit)
+                self._timer.daemon = True
+                self._timer.start()
+            return self._segment
+
+    def bury(self, broker: Broker, alias: str, effort: Effort, *args, **kwargs) -> Path:
+        """Records the failed call described by the given params, refusing any that couldn't be replayed"""
+        try:
+            return self.append({
+                'at': datetime.utcnow().isoformat(),
+                'broker': Broker(broker).value,
+                'alias': alias,
+                'args': list(args),
+                'kwargs': kwargs,
+                'error': repr(effort.culmination.value),
+            })
+        except TypeError as e:
+            raise DeadletterStore.Unrecordable(f'Cannot record {alias} for {Broker(broker).name}: {e}') from e
+
+    def read(
+        self,
+        segment: Optional[str] = None,
+        offset: int = 0,
+        block_size: int = 1024 * 1024
+    ) -> Iterator[Tuple[Path, int, Dict[str, Any]]]:
+        """Yields (segment, offset just past the record, record) for each record from the given position on
+
+        Segments are read in large blocks and only up to their size when reading
+        began, so records appended meanwhile are left for a later read. Lines that
+        cannot be decoded (e.g. torn by a crash) are skipped.
+        """
+        self.commit()
+        snapshot = [(path, path.stat().st_size) for path in self.segments if segment is None or path.name >= segment]
+        for path, size in snapshot:
+            position = offset if path.name == segment else 0
+            with path.open('rb') as f:
+                f.seek(position)
+                remaining, remainder = size - position, b''
+                while remaining > 0:
+                    block = f.read(min(block_size, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    *lines, remainder = (remainder + block).split(b'\n')
+                    for line in lines:
+                        position += len(line) + 1
+                        try:
+                            record = decode(line)
+                        except ValueError:
+                            continue
+                        yield path, position, record
+
+    def commit(self):
+        """Makes every appended record durable"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None and self.pending:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self.pending = 0
+            self._committed_at = monotonic()
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> 'DeadletterStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}:{self.directory}>'
+
+    class Unrecordable(Exception):
+        pass
@@ -1,5 +1,8 @@
 from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from actionpack import Action
@@ -14,10 +17,14 @@ from typing import Optional
 from recruitment.agency import Agent
 from recruitment.agency import Broker
 from recruitment.agency import Commlink
+from recruitment.agency import Checkpoint
 from recruitment.agency import Config
+from recruitment.agency import clients
 from recruitment.agency import Consumer
 from recruitment.agency import Contingency
 from recruitment.agency import Coordinator
+from recruitment.agency import DeadletterStore
+from recruitment.agency import Effort
 from recruitment.agency import Publisher
 from recruitment.agency import Reaction
 from tests.recruitment.agency import client
@@ -46,6 +53,9 @@ class AgentTest(TestCase):
         'nextBackwardToken': 'string'
     }
 
+    def setUp(self):
+        clients.invalidate()
+
     def publisher_provider(self, commlink: Commlink, contingency: Optional[Contingency] = None) -> Publisher:
         return Publisher(Coordinator(commlink=commlink, contingency=contingency))
 
@@ -249,3 +259,168 @@ class AgentTest(TestCase):
         self.assertEqual(len(effort.retries), max_retries)
         for retry in effort.retries:
             self.assertIsInstance(retry.value, ClientError)
+
+
+class AgentReplayTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name)
+        self.sent = []
+        self.batches = []
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def send(self, **kwargs):
+        if kwargs.get('Message') == 'poison':
+            raise ConnectionError('still down')
+        self.sent.append(kwargs['Message'])
+        return {'MessageId': kwargs['Message']}
+
+    def send_batch(self, PublishBatchRequestEntries, TopicArn):
+        self.batches.append([entry['Message'] for entry in PublishBatchRequestEntries])
+        response = {'Successful': [], 'Failed': []}
+        for entry in PublishBatchRequestEntries:
+            if entry['Message'] == 'poison':
+                response['Failed'].append({'Id': entry['Id'], 'Code': 'InternalError', 'SenderFault': False})
+            else:
+                self.sent.append(entry['Message'])
+                response['Successful'].append({'Id': entry['Id'], 'MessageId': entry['Message']})
+        return response
+
+    def agent_provider(self, contingency=None, broker=Broker.sns) -> Agent:
+        commlink = MagicMock(broker=broker, budget=None)
+        commlink.send.__name__ = 'send'
+        commlink.send.side_effect = self.send
+        commlink.send_batch.__name__ = 'send_batch'
+        commlink.send_batch.side_effect = self.send_batch
+        return Agent(
+            consumer=Consumer(Coordinator(MagicMock(broker=Broker.logs))),
+            publisher=Publisher(Coordinator(commlink, contingency))
+        )
+
+    def bury(self, store: DeadletterStore, *messages, broker=Broker.sns, **kwargs):
+        effort = Effort(Call(Closure(str, 'failed')).perform())
+        kwargs = kwargs or {'TopicArn': 'some-topic'}
+        for message in messages:
+            store.bury(broker, 'send', effort, Message=message, **kwargs)
+        store.commit()
+
+    def test_republishes_deadletters_and_checkpoints_progress(self):
+        store = DeadletterStore(self.directory, max_segment_bytes=200)
+        self.bury(store, *[str(n) for n in range(5)])
+        self.assertGreater(len(store.segments), 1)
+
+        efforts = list(self.agent_provider().replay(store))
+
+        self.assertEqual(len(efforts), 1)  # consecutive sends to the same topic, republished as one batch
+        self.assertTrue(efforts[0].culmination.successful)
+        self.assertEqual(self.batches, [['0', '1', '2', '3', '4']])
+        self.assertEqual(list(self.agent_provider().replay(store)), [])  # nothing left to replay
+
+        self.bury(store, '5')
+        effort, = self.agent_provider().replay(store)
+        self.assertEqual(effort.culmination.value, [{'Successful': [{'Id': '0', 'MessageId': '5'}], 'Failed': []}])
+        store.close()
+
+    def test_batches_only_consecutive_sends_to_the_same_target(self):
+        store = DeadletterStore(self.directory)
+        self.bury(store, '0', '1')
+        self.bury(store, 'text', PhoneNumber='+15555550100')  # not a batchable send
+        self.bury(store, '2')
+        self.bury(store, '3', TopicArn='another-topic')
+        self.bury(store, *[str(n) for n in range(4, 16)])
+
+        efforts = list(self.agent_provider().replay(store, max_workers=1))
+
+        self.assertEqual(len(efforts), 6)
+        self.assertTrue(all(effort.culmination.successful for effort in efforts))
+        self.assertEqual(
+            self.batches,
+            [['0', '1'], ['2'], ['3'], [str(n) for n in range(4, 14)], ['14', '15']]  # at most 10 entries each
+        )
+        self.assertIn('text', self.sent)
+        store.close()
+
+    def test_resumes_from_checkpoint(self):
+        store = DeadletterStore(self.directory)
+        self.bury(store, *[str(n) for n in range(30)])
+
+        replay = self.agent_provider().replay(store, max_workers=1, checkpoint_every=1)
+        self.assertEqual(next(replay).culmination.value[0]['Successful'][-1]['MessageId'], '9')
+        replay.close()  # e.g. interrupted
+
+        self.sent.clear()
+        list(self.agent_provider().replay(store))
+        self.assertCountEqual(self.sent, [str(n) for n in range(10, 30)])
+        store.close()
+
+    def test_keeps_a_checkpoint_per_broker(self):
+        store = DeadletterStore(self.directory)
+        self.bury(store, 'sqs message', broker=Broker.sqs)
+        self.bury(store, 'sns message')
+
+        efforts = list(self.agent_provider().replay(store))
+        self.assertEqual(len(efforts), 1)
+        self.assertEqual(self.sent, ['sns message'])
+
+        efforts = list(self.agent_provider(broker=Broker.sqs).replay(store))
+        self.assertEqual(len(efforts), 1)  # not passed over by the replay for SNS
+        self.assertEqual(self.sent, ['sns message', 'sqs message'])
+
+        for broker in (Broker.sns, Broker.sqs):
+            checkpoint = Checkpoint(self.directory / f'replay.{broker.value}.checkpoint')
+            self.assertEqual(checkpoint.load()['offset'], store.segments[0].stat().st_size)
+        store.close()
+
+    def test_republishes_batches_within_limits_and_deadletters_failed_entries(self):
+        store = DeadletterStore(self.directory)
+        entries = [{'Id': str(n), 'MessageBody': str(n)} for n in range(25)]
+        store.bury(Broker.sqs, 'send_batch', Effort(Call(Closure(str, 'failed')).perform()), Entries=entries, QueueUrl='some-queue')
+        store.commit()
+
+        chunks = []
+
+        def send_batch(Entries, QueueUrl):
+            chunks.append(len(Entries))
+            return {'Successful': [], 'Failed': [{'Id': '7', 'Code': 'InternalError', 'SenderFault': False}]}
+
+        commlink = MagicMock(broker=Broker.sqs, budget=None)
+        commlink.send_batch.__name__ = 'send_message_batch'
+        commlink.send_batch.side_effect = send_batch
+        agent = Agent(
+            consumer=Consumer(Coordinator(MagicMock(broker=Broker.logs))),
+            publisher=Publisher(Coordinator(commlink, Contingency(max_retries=0, deadletters=store)))
+        )
+
+        effort, = agent.replay()
+        self.assertFalse(effort.culmination.successful)
+        self.assertEqual(chunks, [10, 10, 5])
+
+        store.commit()
+        *_, (_, _, redeadlettered) = store.read()
+        self.assertEqual(redeadlettered['alias'], 'send_batch')
+        self.assertEqual(redeadlettered['kwargs'], {'Entries': [entries[7]], 'QueueUrl': 'some-queue'})
+        store.close()
+
+    def test_failures_are_deadlettered_anew(self):
+        store = DeadletterStore(self.directory)
+        self.bury(store, 'poison', 'fine')
+        self.bury(store, 'poison', PhoneNumber='+15555550100')
+
+        agent = self.agent_provider(Contingency(max_retries=0, deadletters=store))
+        efforts = list(agent.replay())
+        self.assertEqual([effort.culmination.successful for effort in efforts], [False, False])
+        self.assertEqual(self.sent, ['fine'])
+
+        store.commit()
+        *_, (_, _, batch), (_, _, send) = store.read()
+        self.assertEqual(batch['alias'], 'send_batch')  # only the entry reported as failed
+        self.assertEqual(batch['kwargs'], {
+            'PublishBatchRequestEntries': [{'Id': '0', 'Message': 'poison'}], 'TopicArn': 'some-topic'
+        })
+        self.assertEqual(send['alias'], 'send')
+        self.assertEqual(send['kwargs'], {'Message': 'poison', 'PhoneNumber': '+15555550100'})
+        self.assertEqual(len(list(agent.replay())), 2)  # only the fresh deadletters remain
+        store.close()
@@ -0,0 +1,117 @@
+from hashlib import md5
+from unittest import TestCase
+from unittest.mock import ANY
+from unittest.mock import patch
+
+from botocore.stub import Stubber
+
+from recruitment.agency import Commlink
+from recruitment.agency import Config
+from recruitment.agency import Coordinator
+from recruitment.agency import Publisher
+from recruitment.agency import clients
+from recruitment.agency.aggregation import aggregate
+from recruitment.agency.aggregation import deaggregate
+from recruitment.agency.aggregation import field
+from recruitment.agency.aggregation import is_aggregated
+from recruitment.agency.aggregation import magic
+from recruitment.agency.aggregation import varint
+from recruitment.agency.resources import Broker
+from tests.recruitment.agency import client
+from tests.recruitment.agency import fake_credentials
+
+
+def records(count: int, partition_keys=('a',)):
+    return [
+        {'Data': f'event {i}'.encode(), 'PartitionKey': partition_keys[i % len(partition_keys)]}
+        for i in range(count)
+    ]
+
+
+class AggregationTest(TestCase):
+
+    def test_encodes_varints(self):
+        self.assertEqual(varint(0), b'\x00')
+        self.assertEqual(varint(127), b'\x7f')
+        self.assertEqual(varint(300), b'\xac\x02')
+
+    def test_encodes_as_KPL_does(self):
+        entry, = aggregate(records(2))
+        message = field(1, b'a') + field(3, b'\x08\x00' + field(3, b'event 0')) + field(3, b'\x08\x00' + field(3, b'event 1'))
+        self.assertEqual(entry, {'PartitionKey': 'a', 'Data': magic + message + md5(message).digest()})
+
+    def test_aggregates_records_by_partition_key(self):
+        given = records(10, partition_keys=('a', 'b'))
+        aggregated = list(aggregate(given))
+
+        self.assertEqual([entry['PartitionKey'] for entry in aggregated], ['a', 'b'])
+        self.assertTrue(all(is_aggregated(entry['Data']) for entry in aggregated))
+        for entry in aggregated:
+            unpacked = deaggregate({**entry, 'SequenceNumber': '1'})
+            expected = [record['Data'] for record in given if record['PartitionKey'] == entry['PartitionKey']]
+            self.assertEqual([record['Data'] for record in unpacked], expected)
+            self.assertEqual([record['SubSequenceNumber'] for record in unpacked], list(range(5)))
+            self.assertEqual({record['SequenceNumber'] for record in unpacked}, {'1'})
+
+    def test_never_exceeds_max_bytes(self):
+        max_bytes = 200
+        given = records(50)
+        aggregated = list(aggregate(given, max_bytes=max_bytes))
+
+        self.assertGreater(len(aggregated), 1)
+        for entry in aggregated:
+            self.assertLessEqual(len(entry['Data']) + len(entry['PartitionKey']), max_bytes)
+        unpacked = [record['Data'] for entry in aggregated for record in deaggregate(entry)]
+        self.assertEqual(unpacked, [record['Data'] for record in given])
+
+    def test_leaves_lone_records_unaggregated(self):
+        given = records(1)
+        self.assertEqual(list(aggregate(given)), given)
+        self.assertEqual(deaggregate(given[0]), given)
+
+    def test_keeps_explicit_hash_keys(self):
+        given = [{'Data': b'x', 'PartitionKey': 'a', 'ExplicitHashKey': '42'}] * 2
+        entry, = aggregate(given)
+        self.assertEqual(entry['ExplicitHashKey'], '42')
+        self.assertEqual({record['ExplicitHashKey'] for record in deaggregate(entry)}, {'42'})
+
+    def test_rejects_records_too_large_to_send(self):
+        with self.assertRaises(ValueError):
+            list(aggregate([{'Data': b'x' * 100, 'PartitionKey': 'a'}], max_bytes=50))
+
+    def test_passes_over_records_with_mismatched_digest(self):
+        entry, = aggregate(records(2))
+        corrupted = {**entry, 'Data': entry['Data'][:-1] + b'\x00'}
+        self.assertEqual(deaggregate(corrupted), [corrupted])
+
+
+class PublisherAggregationTest(TestCase):
+
+    region = 'some-region-1'
+    kinesis = client(Broker.kinesis.name, region)
+
+    def setUp(self):
+        clients.invalidate()
+
+    def publisher_provider(self, broker: Broker) -> Publisher:
+        return Publisher(Coordinator(Commlink(Config(broker, **fake_credentials))))
+
+    @patch('boto3.client')
+    def test_publishes_aggregated_records(self, mock_boto_client):
+        mock_boto_client.return_value = self.kinesis
+        given = records(100, partition_keys=('a', 'b', 'c'))
+        with Stubber(self.kinesis) as stubber:
+            stubber.add_response(
+                'put_records',
+                {'Records': [{'SequenceNumber': '1', 'ShardId': 'shardId-000000000000'}] * 3},
+                {'StreamName': 'some-stream', 'Records': ANY}
+            )
+            effort = self.publisher_provider(Broker.kinesis).publish_aggregated(given, StreamName='some-stream')
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+
+    @patch('boto3.client')
+    def test_only_kinesis_supports_aggregation(self, mock_boto_client):
+        with self.assertRaises(NotImplementedError):
+            self.publisher_provider(Broker.sqs).publish_aggregated(records(2))
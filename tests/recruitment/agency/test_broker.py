@@ -6,7 +6,11 @@ from tests.recruitment.agency import acceptable_broker_names
 
 class BrokerTest(TestCase):
 
-    broker_interface_method_names = {'receive', 'create_target', 'send'}
+    broker_interface_method_names = {
+        'receive', 'create_target', 'send', 'send_batch', 'describe', 'search',
+        'begin_upload', 'send_part', 'complete_upload', 'abort_upload',
+        'list_partitions', 'seek', 'acknowledge', 'extend',
+    }
 
     def test_cannot_instantiate_invalid_Broker(self):
         with self.assertRaises(ValueError):
@@ -23,3 +27,24 @@ class BrokerTest(TestCase):
             self.assertTrue(
                 set(broker.interface.keys()).issubset(self.broker_interface_method_names)
             )
+
+    def test_batching_brokers_declare_limits(self):
+        for broker in [Broker(name) for name in acceptable_broker_names]:
+            if 'send_batch' in broker.interface:
+                self.assertGreater(broker.batching.max_entries, 0)
+                self.assertGreater(broker.batching.max_bytes, 0)
+            else:
+                with self.assertRaises(NotImplementedError):
+                    broker.batching
+
+    def test_batching_renders_sends_as_entries(self):
+        self.assertEqual(
+            Broker.sqs.batching.entry({'QueueUrl': 'some-queue', 'MessageBody': 'hi'}, 3),
+            {'MessageBody': 'hi', 'Id': '3'}
+        )
+        self.assertEqual(
+            Broker.kinesis.batching.entry({'StreamName': 'some-stream', 'Data': b'hi', 'PartitionKey': 'k'}, 3),
+            {'Data': b'hi', 'PartitionKey': 'k'}
+        )
+        self.assertIsNone(Broker.sns.batching.entry({'PhoneNumber': '+15555550100', 'Message': 'hi'}, 0))
+        self.assertIsNone(Broker.sns.batching.entry({'TopicArn': 'some-topic', 'TargetArn': 'arn', 'Message': 'hi'}, 0))
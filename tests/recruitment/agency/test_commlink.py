@@ -1,6 +1,9 @@
+from subprocess import check_output
+from sys import executable
 from textwrap import dedent
 from unittest import TestCase
 from unittest.mock import ANY
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from botocore.exceptions import NoRegionError
@@ -10,13 +13,20 @@ from tests.recruitment.agency import fake_credentials
 from tests.recruitment.agency import client
 from tests.recruitment.agency import raise_this
 from recruitment.agency import Broker
+from recruitment.agency import ClientCache
 from recruitment.agency import Config
+from recruitment.agency import clients
 from recruitment.agency import Commlink
+from recruitment.agency import Quota
+from recruitment.agency import RateLimiter
 from recruitment.agency.temp import Commlink as FakeCommunicator
 
 
 class CommunicatorTest(TestCase):
 
+    def setUp(self):
+        clients.invalidate()
+
     @patch('boto3.client')
     def test_cannot_instantiate_with_invalid_Config(self, mock_boto_client):
         mock_boto_client.side_effect = raise_this(exception=ValueError)
@@ -119,6 +129,128 @@ class CommunicatorTest(TestCase):
         self.assertEqual(message_receipt, expected_response)
 
 
+    @patch('boto3.client')
+    def test_aliases_share_a_single_client(self, mock_boto_client):
+        mock_boto_client.return_value = client(Broker.sqs.name, 'some-region-1')
+        commlink = Commlink(Config(Broker.sqs, **fake_credentials))
+
+        mock_boto_client.assert_called_once()
+        self.assertIs(commlink.send.__self__, commlink.receive.__self__)
+        self.assertIs(commlink.send.__self__, commlink.create_target.__self__)
+
+    @patch('boto3.client')
+    def test_commlinks_share_cached_clients(self, mock_boto_client):
+        config = Config(Broker.sqs, **fake_credentials)
+        Commlink(config)
+        Commlink(Config(Broker.sqs, **fake_credentials))
+
+        mock_boto_client.assert_called_once()
+        self.assertIn(config, clients)
+
+    @patch('boto3.client')
+    def test_can_bypass_client_cache(self, mock_boto_client):
+        config = Config(Broker.sqs, **fake_credentials)
+        Commlink(config, cache=None)
+        Commlink(config, cache=None)
+
+        self.assertEqual(mock_boto_client.call_count, 2)
+        self.assertNotIn(config, clients)
+
+    @patch('boto3.client')
+    def test_calls_are_paced_by_a_rate_limiter(self, mock_boto_client):
+        sqs = client(Broker.sqs.name, 'some-region-1')
+        mock_boto_client.return_value = sqs
+        limiter = RateLimiter({'send': Quota(requests=1)})
+        limiter.acquire = MagicMock(wraps=limiter.acquire)
+        with Stubber(sqs) as stubber:
+            stubber.add_response('send_message', {'MessageId': 'some-id'})
+            commlink = Commlink(Config(Broker.sqs, **fake_credentials), limiter=limiter)
+            receipt = commlink.send(QueueUrl='some-queue', MessageBody='some message!')
+
+        self.assertEqual(receipt, {'MessageId': 'some-id'})
+        self.assertEqual(commlink.send.__name__, 'send_message')
+        limiter.acquire.assert_called_once_with('send', len('some-queue') + len('some message!'))
+
+
+class ClientCacheTest(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = ClientCache(maxsize=2, ttl=10, clock=lambda: self.now)
+
+    @patch('boto3.client')
+    def test_evicts_least_recently_used_client(self, mock_boto_client):
+        sns, sqs, logs = (Config(broker, **fake_credentials) for broker in (Broker.sns, Broker.sqs, Broker.logs))
+        self.cache.get(sns)
+        self.cache.get(sqs)
+        self.cache.get(sns)  # sqs becomes least recently used
+        self.cache.get(logs)
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIn(sns, self.cache)
+        self.assertIn(logs, self.cache)
+        self.assertNotIn(sqs, self.cache)
+
+    @patch('boto3.client')
+    def test_expires_clients_after_ttl(self, mock_boto_client):
+        mock_boto_client.side_effect = lambda **kwargs: object()
+        config = Config(Broker.sns, **fake_credentials)
+        client = self.cache.get(config)
+        self.now = 9
+        self.assertIs(self.cache.get(config), client)
+        self.now = 10
+        self.assertIsNot(self.cache.get(config), client)
+        self.assertEqual(mock_boto_client.call_count, 2)
+
+    @patch('boto3.client')
+    def test_can_invalidate_clients(self, mock_boto_client):
+        sns, sqs = Config(Broker.sns, **fake_credentials), Config(Broker.sqs, **fake_credentials)
+        self.cache.get(sns)
+        self.cache.get(sqs)
+
+        self.cache.invalidate(sns)
+        self.assertNotIn(sns, self.cache)
+        self.assertIn(sqs, self.cache)
+
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+    @patch('boto3.client')
+    def test_distinguishes_rotated_credentials(self, mock_boto_client):
+        rotated_credentials = {**fake_credentials, 'secret_access_key': 'n3wp@ssw0rd!'}
+        self.cache.get(Config(Broker.sns, **fake_credentials))
+        self.cache.get(Config(Broker.sns, **rotated_credentials))
+
+        self.assertEqual(mock_boto_client.call_count, 2)
+
+
+class LazySDKTest(TestCase):
+
+    def test_sdk_is_not_imported_until_a_Commlink_is_instantiated(self):
+        script = dedent(
+            """\
+            import sys
+            from recruitment.agency import Broker, Commlink, Config
+            print('boto3' in sys.modules, 'botocore' in sys.modules)
+            Commlink(Config(Broker.sns, region_name='us-east-1', access_key_id='a', secret_access_key='b'))
+            print('boto3' in sys.modules, 'botocore' in sys.modules)
+            """
+        )
+        before, after = check_output([executable, '-c', script]).decode().splitlines()
+        self.assertEqual(before, 'False False')
+        self.assertEqual(after, 'True True')
+
+    def test_heavy_modules_are_not_imported_with_the_package(self):
+        script = dedent(
+            """\
+            import sys
+            import recruitment.agency
+            print(*[module for module in ('asyncio', 'boto3', 'botocore') if module in sys.modules])
+            """
+        )
+        self.assertEqual(check_output([executable, '-c', script]).decode().strip(), '')
+
+
 class TempCommunicatorTest(TestCase):
 
     def test_context(self):
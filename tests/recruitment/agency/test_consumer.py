@@ -1,18 +1,36 @@
+import boto3
+
+from io import BytesIO
 from io import StringIO
+from pathlib import Path
+from queue import Empty
+from tempfile import TemporaryDirectory
+from time import monotonic
+from time import sleep
 from unittest import TestCase
+from unittest.mock import ANY
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from actionpack.actions import Call
 from actionpack.actions import RetryPolicy
 from actionpack.utils import Closure
 from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
 from botocore.stub import Stubber
 
 from recruitment.agency import Commlink
 from recruitment.agency import Config
+from recruitment.agency import clients
 from recruitment.agency import Consumer
 from recruitment.agency import Contingency
 from recruitment.agency import Coordinator
+from recruitment.agency import Download
+from recruitment.agency import Heartbeat
+from recruitment.agency import Metrics
+from recruitment.agency import ShardReader
+from recruitment.agency import readinto
+from recruitment.agency.aggregation import aggregate
 from recruitment.agency.resources import Broker
 from tests.recruitment.agency import client
 from tests.recruitment.agency import fake_credentials
@@ -38,6 +56,9 @@ class ConsumerTest(TestCase):
         'nextBackwardToken': 'string'
     }
 
+    def setUp(self):
+        clients.invalidate()
+
     @patch('boto3.client')
     @patch('actionpack.actions.Write.perform')
     def test_can_retry_message_send(self, mock_write, mock_boto_client):
@@ -165,3 +186,653 @@ class ConsumerTest(TestCase):
         )
         with self.assertRaises(TypeError):  # reaction cannot be a str
             consumer.consume(logGroupName='the construct', logStreamName='the-training-program')
+
+
+class ConsumerStreamTest(TestCase):
+
+    region = 'some-region-1'
+    logs = client(Broker.logs.name, region)
+    sqs = client(Broker.sqs.name, region)
+    queue_url = 'https://sqs.some-region-1.amazonaws.com/12345/some-queue'
+
+    def setUp(self):
+        clients.invalidate()
+
+    def consumer_provider(self, broker: Broker, contingency=None) -> Consumer:
+        return Consumer(Coordinator(Commlink(Config(broker, **fake_credentials)), contingency))
+
+    def page(self, messages, token):
+        return {
+            'events': [{'timestamp': i, 'message': m, 'ingestionTime': i} for i, m in enumerate(messages)],
+            'nextForwardToken': token,
+            'nextBackwardToken': 'b',
+        }
+
+    def received(self, *bodies):
+        return {'Messages': [{'MessageId': body, 'ReceiptHandle': body, 'Body': body} for body in bodies]}
+
+    @patch('boto3.client')
+    def test_streams_log_events_until_forward_token_is_unchanged(self, mock_boto_client):
+        mock_boto_client.return_value = self.logs
+        params = {'logGroupName': 'group', 'logStreamName': 'stream'}
+        with Stubber(self.logs) as stubber:
+            stubber.add_response('get_log_events', self.page(['a', 'b'], 'f/1'), params)
+            stubber.add_response('get_log_events', self.page(['c'], 'f/2'), {**params, 'nextToken': 'f/1'})
+            stubber.add_response('get_log_events', self.page([], 'f/2'), {**params, 'nextToken': 'f/2'})
+            events = list(self.consumer_provider(Broker.logs).stream(**params))
+            stubber.assert_no_pending_responses()
+
+        self.assertEqual([event['message'] for event in events], ['a', 'b', 'c'])
+
+    @patch('boto3.client')
+    def test_stream_is_lazy(self, mock_boto_client):
+        mock_boto_client.return_value = self.logs
+        params = {'logGroupName': 'group', 'logStreamName': 'stream'}
+        with Stubber(self.logs) as stubber:
+            stubber.add_response('get_log_events', self.page(['a'], 'f/1'), params)
+            stream = self.consumer_provider(Broker.logs).stream(**params)
+            self.assertEqual(next(stream)['message'], 'a')
+            stubber.assert_no_pending_responses()
+
+    @patch('boto3.client')
+    def test_streams_sqs_messages_across_polls_up_to_limit(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        params = {'QueueUrl': self.queue_url, 'WaitTimeSeconds': 20}
+        with Stubber(self.sqs) as stubber:
+            stubber.add_response('receive_message', self.received('1', '2'), params)
+            stubber.add_response('receive_message', {}, params)
+            stubber.add_response('receive_message', self.received('3', '4'), params)
+            messages = list(self.consumer_provider(Broker.sqs).stream(limit=3, **params))
+            stubber.assert_no_pending_responses()
+
+        self.assertEqual([message['Body'] for message in messages], ['1', '2', '3'])
+
+    @patch('boto3.client')
+    def test_stream_stops_after_timeout(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        with Stubber(self.sqs):
+            messages = list(self.consumer_provider(Broker.sqs).stream(timeout=0, QueueUrl=self.queue_url))
+
+        self.assertEqual(messages, [])
+
+    @patch('boto3.client')
+    def test_stream_raises_upon_failure(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        with Stubber(self.sqs) as stubber:
+            stubber.add_client_error('receive_message', '500')
+            stubber.add_client_error('receive_message', '500')
+            stubber.add_client_error('receive_message', '500')
+            with self.assertRaises(Consumer.StreamInterrupted) as error_ctx:
+                list(self.consumer_provider(Broker.sqs, Contingency).stream(QueueUrl=self.queue_url))
+
+        self.assertEqual(len(error_ctx.exception.effort.retries), 2)
+
+    @patch('boto3.client')
+    def test_stream_requires_a_streamable_broker(self, mock_boto_client):
+        with self.assertRaises(NotImplementedError):
+            next(self.consumer_provider(Broker.sns).stream())
+
+
+class PrefetcherTest(TestCase):
+
+    def consumer_provider(self, receive, contingency=None) -> Consumer:
+        commlink = MagicMock(broker=Broker.sqs, budget=None)
+        commlink.receive.__name__ = 'receive'
+        commlink.receive.side_effect = receive
+        return Consumer(Coordinator(commlink, contingency))
+
+    def test_prefetches_up_to_depth(self):
+        polls = []
+
+        def receive(**kwargs):
+            polls.append(kwargs)
+            return {'Messages': [{'Body': str(len(polls))}]}
+
+        with self.consumer_provider(receive).prefetch(depth=2, QueueUrl='some-queue') as prefetcher:
+            deadline = monotonic() + 1
+            while prefetcher.efforts.qsize() < 2 and monotonic() < deadline:
+                sleep(0.01)
+            sleep(0.05)
+            self.assertEqual(prefetcher.efforts.qsize(), 2)
+            self.assertLessEqual(len(polls), 3)  # two buffered, at most one awaiting space
+
+            effort = next(prefetcher)
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(effort.culmination.value, {'Messages': [{'Body': '1'}]})
+        self.assertEqual(polls[0], {'QueueUrl': 'some-queue'})
+        self.assertFalse(prefetcher.running)
+
+    def test_prefetched_efforts_honor_contingency(self):
+        attempts = []
+
+        def receive(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) % 2:
+                raise ConnectionError('hiccup')
+            return {'Messages': []}
+
+        with self.consumer_provider(receive, Contingency).prefetch(QueueUrl='some-queue') as prefetcher:
+            effort = prefetcher.get(timeout=1)
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(len(effort.retries), 1)
+
+    def test_iteration_ends_once_stopped(self):
+        consumer = self.consumer_provider(lambda **kwargs: {'Messages': []})
+        prefetcher = consumer.prefetch(depth=1, QueueUrl='some-queue')
+        prefetcher.stop()
+        self.assertLessEqual(len(list(prefetcher)), 1)
+
+    def test_depth_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.consumer_provider(dict).prefetch(depth=0)
+
+
+class ConsumerDownloadTest(TestCase):
+
+    region = 'some-region-1'
+    s3 = boto3.session.Session().client(Broker.s3.name, region_name=region)  # for boto3's injected upload_fileobj
+    bucket, key, etag = 'some-bucket', 'some/key', '"some-etag"'
+    data = b'0123456789abcdefghij'
+
+    def setUp(self):
+        clients.invalidate()
+        self.directory = TemporaryDirectory()
+        self.path = Path(self.directory.name) / 'object'
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def consumer_provider(self, contingency=None) -> Consumer:
+        return Consumer(Coordinator(Commlink(Config(Broker.s3, **fake_credentials)), contingency))
+
+    def expect_description(self, stubber: Stubber, size: int):
+        stubber.add_response(
+            'head_object', {'ContentLength': size, 'ETag': self.etag}, {'Bucket': self.bucket, 'Key': self.key}
+        )
+
+    def expect_range(self, stubber: Stubber, start: int, end: int, body: bytes = None):
+        body = self.data[start:end + 1] if body is None else body
+        stubber.add_response(
+            'get_object',
+            {'Body': StreamingBody(BytesIO(body), len(body)), 'ContentLength': len(body)},
+            {'Bucket': self.bucket, 'Key': self.key, 'Range': f'bytes={start}-{end}', 'IfMatch': self.etag}
+        )
+
+    @patch('boto3.client')
+    def test_downloads_ranges_into_file(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        with Stubber(self.s3) as stubber:
+            self.expect_description(stubber, len(self.data))
+            for start, end in ((0, 7), (8, 15), (16, 19)):
+                self.expect_range(stubber, start, end)
+            effort = self.consumer_provider().download(self.path, self.bucket, self.key, chunk_size=8, max_workers=1)
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(effort.culmination.value, self.path)
+        self.assertEqual(sorted(effort.parts), [1, 2, 3])
+        self.assertEqual(self.path.read_bytes(), self.data)
+
+    @patch('boto3.client')
+    def test_reports_retries_per_range(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        with Stubber(self.s3) as stubber:
+            self.expect_description(stubber, len(self.data))
+            self.expect_range(stubber, 0, 9)
+            stubber.add_client_error('get_object', 'InternalError', http_status_code=500)
+            self.expect_range(stubber, 10, 19)
+            effort = self.consumer_provider(Contingency(max_retries=1)).download(
+                self.path, self.bucket, self.key, chunk_size=10, max_workers=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(effort.retried_parts, [2])
+        self.assertEqual(self.path.read_bytes(), self.data)
+
+    @patch('boto3.client')
+    def test_removes_file_when_a_range_comes_up_short(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        with Stubber(self.s3) as stubber:
+            self.expect_description(stubber, len(self.data))
+            self.expect_range(stubber, 0, 19, body=self.data[:5])
+            effort = self.consumer_provider().download(self.path, self.bucket, self.key, chunk_size=20)
+            stubber.assert_no_pending_responses()
+
+        self.assertFalse(effort.culmination.successful)
+        self.assertIsInstance(effort.culmination.value, Download.IncompleteRange)
+        self.assertFalse(self.path.exists())
+
+    @patch('boto3.client')
+    def test_downloads_empty_object(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        with Stubber(self.s3) as stubber:
+            self.expect_description(stubber, 0)
+            effort = self.consumer_provider().download(self.path, self.bucket, self.key)
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(self.path.read_bytes(), b'')
+
+    @patch('boto3.client')
+    def test_completes_through_the_coordinator(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        metrics = Metrics()
+        consumer = Consumer(Coordinator(Commlink(Config(Broker.s3, **fake_credentials)), metrics=metrics))
+        with Stubber(self.s3) as stubber:
+            self.expect_description(stubber, len(self.data))
+            self.expect_range(stubber, 0, 19)
+            effort = consumer.download(self.path, self.bucket, self.key, chunk_size=20)
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(metrics.get('s3', 'complete')['successes'], 1)
+
+    def test_retried_beginnings_leave_no_file_open(self):
+        commlink = MagicMock(broker=Broker.s3)
+        commlink.describe.return_value = {'ContentLength': len(self.data), 'ETag': self.etag}
+        download = Download(commlink, self.path, self.bucket, self.key, chunk_size=8)
+        download.begin()
+        first = download._file
+        download.begin()
+
+        self.assertTrue(first.closed)
+        download.close()
+
+    def test_readinto_fills_view_with_or_without_readinto(self):
+        class Unreadintoable:
+            def __init__(self, data: bytes):
+                self.buffer = BytesIO(data)
+
+            def read(self, size: int) -> bytes:
+                return self.buffer.read(size)
+
+        for body in (BytesIO(self.data), Unreadintoable(self.data), StreamingBody(BytesIO(self.data), len(self.data))):
+            destination = bytearray(len(self.data))
+            self.assertEqual(readinto(body, memoryview(destination), block_size=3), len(self.data))
+            self.assertEqual(bytes(destination), self.data)
+
+
+class FakeKinesisStream:
+    """Serves shards' records two at a time; closed shards end, open ones stay caught up"""
+
+    def __init__(self, records: dict, parents: dict = None, open_shards=()):
+        self.records = records
+        self.parents = parents or {}
+        self.open_shards = set(open_shards)
+        self.reads = []
+        self.seeks = []
+
+    def list_shards(self, **kwargs):
+        return {'Shards': [
+            {'ShardId': shard_id, **({'ParentShardId': self.parents[shard_id]} if shard_id in self.parents else {})}
+            for shard_id in self.records
+        ]}
+
+    def get_shard_iterator(self, StreamName, ShardId, ShardIteratorType, StartingSequenceNumber=None):
+        self.seeks.append((ShardId, ShardIteratorType, StartingSequenceNumber))
+        index = 0
+        if ShardIteratorType == 'AT_SEQUENCE_NUMBER':
+            index = int(StartingSequenceNumber.rsplit('-', 1)[1])
+        if ShardIteratorType == 'AFTER_SEQUENCE_NUMBER':
+            index = int(StartingSequenceNumber.rsplit('-', 1)[1]) + 1
+        return {'ShardIterator': f'{ShardId}|{index}'}
+
+    def get_records(self, ShardIterator):
+        shard_id, index = ShardIterator.split('|')
+        index = int(index)
+        self.reads.append(shard_id)
+        batch = self.records[shard_id][index:index + 2]
+        following = index + len(batch)
+        ended = following >= len(self.records[shard_id]) and shard_id not in self.open_shards
+        return {
+            'Records': [
+                {'SequenceNumber': f'{shard_id}-{i}', 'Data': data, 'PartitionKey': 'k'}
+                for i, data in enumerate(batch, index)
+            ],
+            'NextShardIterator': None if ended else f'{shard_id}|{following}',
+            'MillisBehindLatest': 0,
+        }
+
+
+@patch.object(ShardReader, 'idle_interval', 0.01)
+class ShardReaderTest(TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def consumer_provider(self, stream: FakeKinesisStream, contingency=None) -> Consumer:
+        commlink = MagicMock(broker=Broker.kinesis, budget=None)
+        for alias, method in Broker.kinesis.interface.items():
+            getattr(commlink, alias).__name__ = alias
+            if hasattr(stream, method):
+                getattr(commlink, alias).side_effect = getattr(stream, method)
+        return Consumer(Coordinator(commlink, contingency))
+
+    def read(self, reader: ShardReader, count: int, timeout: float = 2) -> list:
+        records, deadline = [], monotonic() + timeout
+        while len(records) < count and monotonic() < deadline:
+            try:
+                records.append(reader.get(timeout=0.05)['Data'])
+            except Empty:
+                if reader.error:
+                    raise reader.error
+        return records
+
+    def test_reads_parents_before_children(self):
+        stream = FakeKinesisStream(
+            records={'shard-0': list('abcde'), 'shard-1': list('fgh'), 'shard-2': list('ijk')},
+            parents={'shard-1': 'shard-0', 'shard-2': 'shard-0'},
+            open_shards={'shard-1', 'shard-2'},
+        )
+        consumer = self.consumer_provider(stream)
+        with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+            records = self.read(reader, 11)
+
+        self.assertEqual(records[:5], list('abcde'))
+        self.assertCountEqual(records[5:], list('fghijk'))
+        self.assertEqual(sorted(reader.readers), ['shard-0', 'shard-1', 'shard-2'])
+        self.assertEqual(reader.checkpoint('shard-0').load(), {'sequence_number': 'shard-0-4', 'finished': True})
+        self.assertEqual(reader.checkpoint('shard-1').load(), {'sequence_number': 'shard-1-2'})
+
+    def test_resumes_from_checkpoints(self):
+        stream = FakeKinesisStream(records={'shard-0': list('abcdef')}, open_shards={'shard-0'})
+        consumer = self.consumer_provider(stream)
+        with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 3), list('abc'))
+
+        stream.records['shard-0'].append('g')
+        with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 4), list('defg'))
+
+    def test_records_handed_out_when_failing_are_read_again(self):
+        stream = FakeKinesisStream(records={'shard-0': list('abc')}, open_shards={'shard-0'})
+        consumer = self.consumer_provider(stream)
+        with self.assertRaises(RuntimeError):
+            with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+                self.read(reader, 2)
+                raise RuntimeError('failed to process b')
+
+        with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 2), list('bc'))
+
+    def test_finished_shards_are_not_read_again(self):
+        stream = FakeKinesisStream(
+            records={'shard-0': list('ab'), 'shard-1': list('cd')},
+            parents={'shard-1': 'shard-0'},
+            open_shards={'shard-1'},
+        )
+        consumer = self.consumer_provider(stream)
+        with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+            self.read(reader, 3)
+
+        stream.reads.clear()
+        with consumer.read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 1), ['d'])
+        self.assertNotIn('shard-0', stream.reads)
+
+    def test_reseeks_expired_iterators(self):
+        stream = FakeKinesisStream(records={'shard-0': list('abcd')})
+        get_records, calls = stream.get_records, []
+
+        def expiring(ShardIterator):
+            calls.append(ShardIterator)
+            if len(calls) == 2:
+                raise ClientError({'Error': {'Code': 'ExpiredIteratorException'}}, 'GetRecords')
+            return get_records(ShardIterator)
+
+        stream.get_records = expiring
+        with self.consumer_provider(stream).read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 4), list('abcd'))
+        self.assertEqual(calls, ['shard-0|0', 'shard-0|2', 'shard-0|2'])
+
+    def test_reseeks_expired_iterators_despite_contingency(self):
+        stream = FakeKinesisStream(records={'shard-0': list('abcd')})
+        get_records, get_shard_iterator, calls, dead = stream.get_records, stream.get_shard_iterator, [], set()
+
+        def expiring(ShardIterator):
+            calls.append(ShardIterator)
+            if ShardIterator in dead:
+                raise ClientError({'Error': {'Code': 'ExpiredIteratorException'}}, 'GetRecords')
+            response = get_records(ShardIterator)
+            dead.add(response['NextShardIterator'])  # expires before it's used
+            return response
+
+        def reseeking(**kwargs):
+            dead.clear()
+            return get_shard_iterator(**kwargs)
+
+        stream.get_records, stream.get_shard_iterator = expiring, reseeking
+        for compact in (False, True):
+            calls.clear()
+            with self.subTest(compact=compact), TemporaryDirectory() as directory:
+                consumer = self.consumer_provider(stream, Contingency(max_retries=1))
+                consumer.coordinator.compact = compact
+                with consumer.read_shards('some-stream', directory=directory) as reader:
+                    self.assertEqual(self.read(reader, 4), list('abcd'))
+                self.assertEqual(calls, ['shard-0|0', 'shard-0|2', 'shard-0|2', 'shard-0|2'])
+
+    def test_resumes_part_way_through_aggregated_records(self):
+        aggregated, = aggregate({'Data': f'a{i}'.encode(), 'PartitionKey': 'k'} for i in range(5))
+        stream = FakeKinesisStream(records={'shard-0': [aggregated['Data'], b'b']})
+
+        with self.consumer_provider(stream).read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 2), [b'a0', b'a1'])
+        with self.consumer_provider(stream).read_shards('some-stream', directory=self.directory.name) as reader:
+            self.assertEqual(self.read(reader, 4), [b'a2', b'a3', b'a4', b'b'])
+
+        self.assertEqual(stream.seeks[-1], ('shard-0', 'AT_SEQUENCE_NUMBER', 'shard-0-0'))
+
+    def test_surfaces_failures(self):
+        stream = FakeKinesisStream(records={'shard-0': list('ab')})
+        stream.get_records = MagicMock(side_effect=ConnectionError('unreachable'))
+        reader = self.consumer_provider(stream).read_shards('some-stream', directory=self.directory.name)
+        with self.assertRaises(Consumer.StreamInterrupted):
+            list(reader)
+        reader.stop()
+
+
+class ConsumerSearchTest(TestCase):
+
+    def consumer_provider(self, search, contingency=None) -> Consumer:
+        commlink = MagicMock(broker=Broker.logs, budget=None)
+        commlink.search.__name__ = 'search'
+        commlink.search.side_effect = search
+        return Consumer(Coordinator(commlink, contingency))
+
+    def fake_log_group(self, events_by_stream: dict, page_size: int = 2):
+        searches = []
+
+        def filter_log_events(logGroupName, startTime, endTime, logStreamNames=None, nextToken=None, **kwargs):
+            searches.append((startTime, endTime, logStreamNames, nextToken))
+            matching = [
+                {'timestamp': timestamp, 'message': f'{stream}@{timestamp}', 'logStreamName': stream}
+                for stream, timestamps in events_by_stream.items()
+                if logStreamNames is None or stream in logStreamNames
+                for timestamp in timestamps
+                if startTime <= timestamp <= endTime
+            ]
+            offset = int(nextToken or 0)
+            page = matching[offset:offset + page_size]
+            response = {'events': page}
+            if offset + page_size < len(matching):
+                response['nextToken'] = str(offset + page_size)
+            return response
+
+        return filter_log_events, searches
+
+    def test_splits_range_into_windows(self):
+        search, searches = self.fake_log_group({'a': [0, 5, 9, 10, 19, 25]})
+        events = list(self.consumer_provider(search).search('group', startTime=0, endTime=25, window=10))
+
+        self.assertEqual([event['timestamp'] for event in events], [0, 5, 9, 10, 19, 25])
+        self.assertEqual({(start, end) for start, end, _, _ in searches}, {(0, 9), (10, 19), (20, 25)})
+        self.assertIn((0, 9, None, '2'), searches)  # pages through each window
+
+    def test_merges_streams_chronologically(self):
+        search, searches = self.fake_log_group({'a': [1, 4, 12], 'b': [2, 3, 11], 'c': [0, 15]})
+        events = list(
+            self.consumer_provider(search).search('group', 0, 19, window=10, logStreamNames=['a', 'b', 'c'])
+        )
+
+        self.assertEqual([event['timestamp'] for event in events], [0, 1, 2, 3, 4, 11, 12, 15])
+        self.assertEqual({streams[0] for _, _, streams, _ in searches}, {'a', 'b', 'c'})
+
+    def test_retries_windows_per_contingency(self):
+        search, _ = self.fake_log_group({'a': [1, 2]})
+        failures = []
+
+        def flaky(**kwargs):
+            if not failures:
+                failures.append(kwargs)
+                raise ConnectionError('hiccup')
+            return search(**kwargs)
+
+        events = list(self.consumer_provider(flaky, Contingency).search('group', 0, 9, window=10))
+        self.assertEqual([event['timestamp'] for event in events], [1, 2])
+
+    def test_interrupted_by_failed_window(self):
+        search = MagicMock(side_effect=ConnectionError('unreachable'))
+        with self.assertRaises(Consumer.StreamInterrupted):
+            list(self.consumer_provider(search).search('group', 0, 9, window=10))
+
+
+class ConsumerAcknowledgeTest(TestCase):
+
+    region = 'some-region-1'
+    sqs = client(Broker.sqs.name, region)
+    queue_url = 'https://sqs.some-region-1.amazonaws.com/12345/some-queue'
+
+    def setUp(self):
+        clients.invalidate()
+
+    def consumer_provider(self, contingency=None) -> Consumer:
+        return Consumer(Coordinator(Commlink(Config(Broker.sqs, **fake_credentials)), contingency))
+
+    def entries(self, start: int, stop: int) -> list:
+        return [{'Id': str(i), 'ReceiptHandle': f'handle-{i}'} for i in range(start, stop)]
+
+    def deleted(self, entries) -> dict:
+        return {'Successful': [{'Id': entry['Id']} for entry in entries], 'Failed': []}
+
+    @patch('boto3.client')
+    def test_deletes_messages_in_batches(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        consumer = self.consumer_provider()
+        consumer.acknowledgements(self.queue_url, linger=60)
+        with Stubber(self.sqs) as stubber:
+            for entries in (self.entries(0, 10), self.entries(10, 12)):
+                stubber.add_response(
+                    'delete_message_batch', self.deleted(entries), {'QueueUrl': self.queue_url, 'Entries': entries}
+                )
+            futures = [consumer.acknowledge({'ReceiptHandle': f'handle-{i}'}, QueueUrl=self.queue_url) for i in range(11)]
+            futures.append(consumer.acknowledge('handle-11', QueueUrl=self.queue_url))
+            self.assertTrue(futures[9].done())
+            self.assertFalse(futures[10].done())
+            consumer.close()
+            stubber.assert_no_pending_responses()
+
+        efforts = [future.result() for future in futures]
+        self.assertTrue(all(effort.culmination.successful for effort in efforts))
+        self.assertIs(efforts[0], efforts[9])
+
+    @patch('boto3.client')
+    def test_retries_only_failed_acknowledgements(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        consumer = self.consumer_provider(Contingency(max_retries=1))
+        entries = self.entries(0, 3)
+        partial_failure = {
+            'Successful': self.deleted(entries[:2])['Successful'],
+            'Failed': [{'Id': '2', 'SenderFault': False, 'Code': 'InternalError'}],
+        }
+        with Stubber(self.sqs) as stubber:
+            stubber.add_response('delete_message_batch', partial_failure, {'QueueUrl': self.queue_url, 'Entries': entries})
+            stubber.add_response(
+                'delete_message_batch', self.deleted(entries[2:]), {'QueueUrl': self.queue_url, 'Entries': entries[2:]}
+            )
+            futures = [consumer.acknowledge(entry['ReceiptHandle'], QueueUrl=self.queue_url) for entry in entries]
+            consumer.close()
+            stubber.assert_no_pending_responses()
+
+        effort = futures[0].result()
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(effort.retry_count, 1)
+
+    @patch('boto3.client')
+    def test_acknowledgements_linger_briefly(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        consumer = self.consumer_provider()
+        consumer.acknowledgements(self.queue_url, linger=0.05)
+        with Stubber(self.sqs) as stubber:
+            stubber.add_response('delete_message_batch', self.deleted(self.entries(0, 1)))
+            future = consumer.acknowledge('handle-0', QueueUrl=self.queue_url)
+            effort = future.result(timeout=1)
+
+        self.assertTrue(effort.culmination.successful)
+
+
+class HeartbeatTest(TestCase):
+
+    queue_url = 'some-queue'
+
+    def consumer_provider(self) -> Consumer:
+        commlink = MagicMock(broker=Broker.sqs, budget=None)
+        for alias in ('extend', 'acknowledge'):
+            method = getattr(commlink, alias)
+            method.__name__ = alias
+            method.side_effect = lambda Entries, **kwargs: {'Successful': [{'Id': e['Id']} for e in Entries], 'Failed': []}
+        return Consumer(Coordinator(commlink))
+
+    def extended(self, consumer: Consumer) -> list:
+        return [
+            [entry['ReceiptHandle'] for entry in call.kwargs['Entries']]
+            for call in consumer.coordinator.commlink.extend.call_args_list
+        ]
+
+    def test_extends_tracked_messages_in_batches(self):
+        consumer = self.consumer_provider()
+        heartbeat = Heartbeat(consumer, self.queue_url, visibility_timeout=60)
+        for i in range(12):
+            heartbeat.track({'ReceiptHandle': f'handle-{i}'})
+
+        effort = heartbeat.beat()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual([len(handles) for handles in self.extended(consumer)], [10, 2])
+        consumer.coordinator.commlink.extend.assert_called_with(QueueUrl=self.queue_url, Entries=ANY)
+        self.assertEqual(consumer.coordinator.commlink.extend.call_args.kwargs['Entries'][0]['VisibilityTimeout'], 60)
+
+    def test_acknowledged_messages_are_released(self):
+        consumer = self.consumer_provider()
+        heartbeat = consumer.heartbeat(self.queue_url, interval=60)
+        heartbeat.track('handle-0')
+        heartbeat.track('handle-1')
+        consumer.acknowledge('handle-0', QueueUrl=self.queue_url)
+        heartbeat.beat()
+        consumer.close()
+
+        self.assertEqual(self.extended(consumer), [['handle-1']])
+        self.assertFalse(heartbeat.running)
+
+    def test_beats_on_a_timer(self):
+        consumer = self.consumer_provider()
+        with Heartbeat(consumer, self.queue_url, interval=0.01).start() as heartbeat:
+            heartbeat.track('handle-0')
+            deadline = monotonic() + 1
+            while len(self.extended(consumer)) < 2 and monotonic() < deadline:
+                sleep(0.01)
+
+        self.assertGreaterEqual(len(self.extended(consumer)), 2)
+
+    def test_stops_extending_past_max_lifetime(self):
+        consumer, now = self.consumer_provider(), [0]
+        heartbeat = Heartbeat(consumer, self.queue_url, visibility_timeout=30, clock=lambda: now[0])
+        heartbeat.track('handle-0')
+        now[0] = Heartbeat.max_lifetime - 29
+
+        self.assertIsNone(heartbeat.beat())
+        self.assertEqual(len(heartbeat), 0)
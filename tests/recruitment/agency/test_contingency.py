@@ -1,7 +1,34 @@
+from actionpack import Action
+from actionpack.actions import Call
+from actionpack.actions import RetryPolicy
+from actionpack.utils import Closure
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
 from unittest import TestCase
 from unittest.mock import MagicMock
+from unittest.mock import patch
 
+from botocore.exceptions import ClientError
+
+from recruitment.agency import Batch
 from recruitment.agency import Contingency
+from recruitment.agency import Coordinator
+from recruitment.agency.resources import AdaptiveConcurrency
+from recruitment.agency.resources import Backoff
+from recruitment.agency.resources import CircuitBreaker
+from recruitment.agency.resources import CircuitState
+from recruitment.agency.resources import Effort
+from recruitment.agency.resources import Jitter
+from recruitment.agency.resources import Quota
+from recruitment.agency.resources import RateLimiter
+from recruitment.agency.resources import RetryBudget
+from recruitment.agency.resources import TokenBucket
+from recruitment.agency.resources import perform
+from recruitment.agency.resources import throttled
+
+
+def fail():
+    raise ConnectionError('unreachable')
 
 
 class ContingencyTest(TestCase):
@@ -10,3 +37,304 @@ class ContingencyTest(TestCase):
         self.assertIsInstance(Contingency, type)
         self.assertIsInstance(Contingency(max_retries=0), Contingency)
         self.assertIsInstance(Contingency(max_retries=0, reaction=MagicMock()), Contingency)
+
+    def test_can_have_backoff(self):
+        self.assertIsInstance(Contingency(backoff=Backoff()), Contingency)
+
+    def test_backoff_must_be_a_Backoff(self):
+        with self.assertRaises(TypeError):
+            Contingency(backoff=0.5)(action=Call(Closure(fail)))
+
+    @patch('recruitment.agency.resources.sleep')
+    def test_waits_between_attempts_only(self, mock_sleep):
+        backoff = Backoff(base=1, cap=None, jitter=Jitter.none)
+        retry_policy = Contingency(max_retries=3, backoff=backoff)(action=Call(Closure(fail)))
+        result = retry_policy.perform()
+
+        self.assertIsInstance(result.value, RetryPolicy.Expired)
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [1, 2, 4])
+
+    @patch('recruitment.agency.resources.sleep')
+    def test_retry_budget_stops_retries_once_spent(self, mock_sleep):
+        budget = RetryBudget(capacity=3, rate=0, ratio=0)
+        commlink = MagicMock(budget=budget)
+        coordinator = Coordinator(commlink, Contingency(max_retries=2))
+
+        first = coordinator.do(Call(Closure(fail)))
+        second = coordinator.do(Call(Closure(fail)))
+
+        self.assertEqual(len(first.retries), 2)
+        self.assertIsInstance(first.culmination.value, RetryPolicy.Expired)
+        self.assertEqual(len(second.retries), 1)
+        self.assertIsInstance(second.culmination.value, RetryBudget.Exhausted)
+        self.assertEqual(budget.tokens, 0)
+
+    def test_breaker_must_be_a_CircuitBreaker(self):
+        with self.assertRaises(TypeError):
+            Contingency(breaker='open')(action=Call(Closure(fail)))
+
+    def test_fails_fast_while_circuit_is_open(self):
+        now = [0]
+        calls = []
+
+        def unreachable():
+            calls.append(now[0])
+            raise ConnectionError('unreachable')
+
+        breaker = CircuitBreaker(failure_threshold=1, minimum_calls=3, cooldown=10, clock=lambda: now[0])
+        commlink = MagicMock(budget=None, endpoint='some-computer.com')
+        coordinator = Coordinator(commlink, Contingency(max_retries=2, breaker=breaker))
+
+        tripped = coordinator.do(Call(Closure(unreachable)))
+        self.assertFalse(tripped.short_circuited)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(coordinator.circuit.state, CircuitState.open)
+
+        rejected = coordinator.do(Call(Closure(unreachable)))
+        self.assertTrue(rejected.short_circuited)
+        self.assertIsInstance(rejected.culmination.value, CircuitBreaker.Open)
+        self.assertEqual(repr(rejected), '<Effort:short-circuited>')
+        self.assertEqual(len(calls), 3)  # no further calls made
+
+    def test_circuits_are_tracked_per_endpoint(self):
+        breaker = CircuitBreaker(failure_threshold=1, minimum_calls=1)
+        dead = Coordinator(MagicMock(budget=None, endpoint='dead.com'), Contingency(max_retries=0, breaker=breaker))
+        alive = Coordinator(MagicMock(budget=None, endpoint='alive.com'), Contingency(max_retries=0, breaker=breaker))
+
+        dead.do(Call(Closure(fail)))
+
+        self.assertEqual(dead.circuit.state, CircuitState.open)
+        self.assertEqual(alive.circuit.state, CircuitState.closed)
+        self.assertTrue(alive.do(Call(Closure(str, 'ok'))).culmination.successful)
+
+
+class CircuitBreakerTest(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.breaker = CircuitBreaker(
+            failure_threshold=0.5, window=4, minimum_calls=4, cooldown=10, probes=1, clock=lambda: self.now
+        )
+        self.circuit = self.breaker.circuit('some-endpoint')
+
+    def test_opens_once_failure_rate_reaches_threshold(self):
+        for successful in (True, True, False):
+            self.circuit.record(successful)
+        self.assertEqual(self.circuit.state, CircuitState.closed)
+        self.circuit.record(False)
+        self.assertEqual(self.circuit.state, CircuitState.open)
+        self.assertFalse(self.circuit.allows())
+
+    def test_half_open_circuit_admits_limited_probes(self):
+        for _ in range(4):
+            self.circuit.record(False)
+        self.now = 10
+        self.assertEqual(self.circuit.state, CircuitState.half_open)
+        self.assertTrue(self.circuit.allows())
+        self.assertFalse(self.circuit.allows())
+
+    def test_successful_probe_closes_circuit(self):
+        for _ in range(4):
+            self.circuit.record(False)
+        self.now = 10
+        self.assertTrue(self.circuit.allows())
+        self.circuit.record(True)
+        self.assertEqual(self.circuit.state, CircuitState.closed)
+
+    def test_failed_probe_reopens_circuit(self):
+        for _ in range(4):
+            self.circuit.record(False)
+        self.now = 10
+        self.assertTrue(self.circuit.allows())
+        self.circuit.record(False)
+        self.assertEqual(self.circuit.state, CircuitState.open)
+        self.now = 19
+        self.assertFalse(self.circuit.allows())
+
+    def test_same_endpoint_shares_circuit(self):
+        self.assertIs(self.breaker.circuit('some-endpoint'), self.circuit)
+        self.assertIsNot(self.breaker.circuit('another-endpoint'), self.circuit)
+
+
+class BackoffTest(TestCase):
+
+    def take(self, backoff: Backoff, n: int):
+        delays = backoff.delays()
+        return [next(delays) for _ in range(n)]
+
+    def test_exponential_delays_are_capped(self):
+        backoff = Backoff(base=1, cap=5, jitter=Jitter.none)
+        self.assertEqual(self.take(backoff, 5), [1, 2, 4, 5, 5])
+
+    def test_full_jitter_is_bounded_by_exponential_delay(self):
+        backoff = Backoff(base=1, cap=5, jitter=Jitter.full, random=lambda low, high: high)
+        self.assertEqual(self.take(backoff, 4), [1, 2, 4, 5])
+        backoff = Backoff(base=1, cap=5, jitter=Jitter.full, random=lambda low, high: low)
+        self.assertEqual(self.take(backoff, 4), [0, 0, 0, 0])
+
+    def test_equal_jitter_keeps_half_of_exponential_delay(self):
+        backoff = Backoff(base=2, cap=None, jitter=Jitter.equal, random=lambda low, high: low)
+        self.assertEqual(self.take(backoff, 3), [1, 2, 4])
+
+    def test_decorrelated_jitter_grows_from_previous_delay(self):
+        backoff = Backoff(base=1, cap=20, jitter=Jitter.decorrelated, random=lambda low, high: high)
+        self.assertEqual(self.take(backoff, 4), [3, 9, 20, 20])
+
+    def test_delays_cannot_be_negative(self):
+        with self.assertRaises(ValueError):
+            Backoff(base=-1)
+
+
+class TokenBucketTest(TestCase):
+
+    def test_tokens_replenish_up_to_capacity(self):
+        now = [0]
+        bucket = TokenBucket(capacity=2, rate=1, clock=lambda: now[0])
+        self.assertTrue(bucket.take())
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())
+
+        now[0] = 1
+        self.assertTrue(bucket.take())
+        now[0] = 10
+        self.assertEqual(bucket.tokens, 2)
+
+    def test_retry_budget_earns_tokens_upon_success(self):
+        budget = RetryBudget(capacity=1, rate=0, ratio=0.5)
+        self.assertTrue(budget.spend())
+        self.assertFalse(budget.spend())
+        budget.earn()
+        budget.earn()
+        self.assertTrue(budget.spend())
+
+
+class RateLimiterTest(TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+        self.slept = []
+
+    def limiter_provider(self, **quotas) -> RateLimiter:
+        return RateLimiter(quotas, clock=lambda: self.now[0], sleep=self.slept.append)
+
+    def test_paces_requests_once_burst_is_spent(self):
+        limiter = self.limiter_provider(send=Quota(requests=2))
+        waits = [limiter.acquire('send') for _ in range(4)]
+        self.assertEqual(waits, [0, 0, 0.5, 1.0])
+        self.assertEqual(self.slept, [0.5, 1.0])
+
+        self.now[0] = 10
+        self.assertEqual(limiter.acquire('send'), 0)
+
+    def test_paces_bytes(self):
+        limiter = self.limiter_provider(send=Quota(bytes=100))
+        self.assertEqual(limiter.acquire('send', size=100), 0)
+        self.assertEqual(limiter.acquire('send', size=50), 0.5)
+        self.assertEqual(limiter.acquire('send'), 0)  # sizeless calls aren't paced by bytes
+
+    def test_waits_for_the_slowest_quota(self):
+        limiter = self.limiter_provider(send=Quota(requests=10, bytes=100))
+        limiter.acquire('send', size=100)
+        self.assertEqual(limiter.acquire('send', size=100), 1.0)
+
+    def test_leaves_other_aliases_alone(self):
+        limiter = self.limiter_provider(send=Quota(requests=1, burst=0))
+        limiter.acquire('send')
+        self.assertEqual(limiter.acquire('receive'), 0)
+
+    def test_spaces_threads_evenly(self):
+        limiter = self.limiter_provider(send=Quota(requests=1, burst=0))
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            waits = list(executor.map(lambda _: limiter.acquire('send'), range(5)))
+        self.assertEqual(sorted(waits), [0, 1, 2, 3, 4])
+
+
+def client_error(code: str = 'ThrottlingException', status: int = 400) -> ClientError:
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'Send')
+
+
+def attempt(error: Exception = None):
+    def outcome():
+        if error:
+            raise error
+        return 'success'
+
+    return perform(Call(Closure(outcome)))
+
+
+class AdaptiveConcurrencyTest(TestCase):
+
+    def setUp(self):
+        self.now = [0.0]
+
+    def concurrency_provider(self, **kwargs) -> AdaptiveConcurrency:
+        return AdaptiveConcurrency(clock=lambda: self.now[0], **kwargs)
+
+    def test_recognizes_throttling_and_server_errors(self):
+        self.assertTrue(throttled(client_error('ProvisionedThroughputExceededException')))
+        self.assertTrue(throttled(client_error('SlowDown', status=503)))
+        self.assertTrue(throttled(client_error('InternalError', status=500)))
+        self.assertTrue(throttled(client_error('Whatever', status=429)))
+        self.assertFalse(throttled(client_error('AccessDenied', status=403)))
+        self.assertFalse(throttled(ConnectionError('unreachable')))
+
+    def test_recognizes_throttling_gathered_by_incomplete_batches(self):
+        self.assertTrue(throttled(Batch.Incomplete([{}], [client_error()])))
+        self.assertTrue(throttled(Batch.Incomplete([{}], [], ['ProvisionedThroughputExceededException'])))
+        self.assertTrue(throttled(Batch.Incomplete([{}], [], ['InternalFailure'])))
+        self.assertFalse(throttled(Batch.Incomplete([{}], [ConnectionError('unreachable')], ['InvalidArgument'])))
+
+    def test_limit_rises_additively_while_calls_succeed(self):
+        concurrency = self.concurrency_provider(initial=4)
+        for _ in range(4):
+            concurrency.record(Effort(attempt()))
+        self.assertEqual(concurrency.limit, 4)  # ~1/4 per success, diminishing
+
+        concurrency.record(Effort(attempt()))
+        self.assertEqual(concurrency.limit, 5)
+
+    def test_limit_is_cut_multiplicatively_when_throttled(self):
+        concurrency = self.concurrency_provider(initial=16, minimum=2)
+        concurrency.record(Effort(attempt(), attempt(client_error()), attempt()))
+        self.assertEqual(concurrency.limit, 8)
+
+        concurrency.record(Effort(attempt(client_error())))
+        self.assertEqual(concurrency.limit, 8)  # within the cooldown
+
+        for _ in range(3):
+            self.now[0] += 1
+            concurrency.record(Effort(attempt(client_error())))
+        self.assertEqual(concurrency.limit, 2)
+
+    def test_other_failures_leave_the_limit_be(self):
+        concurrency = self.concurrency_provider(initial=4)
+        concurrency.record(Effort(attempt(ConnectionError('unreachable'))))
+        self.assertEqual(concurrency.limit, 4)
+
+    def test_limit_never_exceeds_maximum(self):
+        concurrency = self.concurrency_provider(initial=2, maximum=3)
+        for _ in range(100):
+            concurrency.record(Effort(attempt()))
+        self.assertEqual(concurrency.limit, 3)
+
+    def test_rejects_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrency(initial=1, minimum=2)
+        with self.assertRaises(ValueError):
+            AdaptiveConcurrency(decrease=1)
+
+
+class PerformTest(TestCase):
+
+    def test_actionpack_still_provides_unsynchronized_perform(self):
+        # `perform` calls this private method; update it alongside the pinned actionpack version
+        self.assertTrue(callable(getattr(Action, '_perform', None)), 'actionpack no longer provides Action._perform')
+
+    def test_does_not_wait_on_actionpacks_lock(self):
+        results = []
+        with Action.lock:
+            worker = Thread(target=lambda: results.append(perform(Call(Closure(str, 'done')))))
+            worker.start()
+            worker.join(timeout=1)
+
+        self.assertEqual([result.value for result in results], ['done'])
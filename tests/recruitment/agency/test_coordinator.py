@@ -0,0 +1,257 @@
+import asyncio
+
+from actionpack.actions import Call
+from actionpack.actions import RetryPolicy
+from actionpack.utils import Closure
+from time import monotonic
+from time import sleep
+from unittest import IsolatedAsyncioTestCase
+from unittest import TestCase
+from threading import Lock
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from recruitment.agency import Consumer
+from recruitment.agency import Contingency
+from recruitment.agency import Coordinator
+from recruitment.agency import Job
+from recruitment.agency import Publisher
+from recruitment.agency.resources import AdaptiveConcurrency
+from recruitment.agency.resources import Broker
+from recruitment.agency.resources import CircuitBreaker
+from recruitment.agency.resources import CompactEffort
+from recruitment.agency.resources import Effort
+
+
+def commlink_provider(broker: Broker = Broker.sqs, **responses):
+    commlink = MagicMock()
+    commlink.broker = broker
+    commlink.budget = None
+    for alias in broker.interface:
+        method = getattr(commlink, alias)
+        method.__name__ = alias
+        method.return_value = responses.get(alias)
+    return commlink
+
+
+def flaky(failures: int, outcome='success'):
+    calls = []
+
+    def attempt():
+        calls.append(outcome)
+        if len(calls) <= failures:
+            raise ConnectionError(f'failure #{len(calls)}')
+        return outcome
+
+    return attempt
+
+
+class CoordinatorTest(TestCase):
+
+    def test_can_do_without_contingency(self):
+        coordinator = Coordinator(commlink_provider())
+        effort = coordinator.do(Call(Closure(flaky(failures=1))))
+
+        self.assertFalse(effort.culmination.successful)
+        self.assertIsInstance(effort.culmination.value, ConnectionError)
+
+    def test_can_do_with_contingency(self):
+        coordinator = Coordinator(commlink_provider(), Contingency)
+        effort = coordinator.do(Call(Closure(flaky(failures=2))))
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(len(effort.retries), 2)
+
+    def test_can_do_many_concurrently(self):
+        def nap(seconds: float):
+            sleep(seconds)
+            return seconds
+
+        coordinator = Coordinator(commlink_provider(), Contingency)
+        start = monotonic()
+        efforts = list(coordinator.do_many((Call(Closure(nap, 0.1)) for _ in range(10)), max_workers=10))
+        elapsed = monotonic() - start
+
+        self.assertEqual(len(efforts), 10)
+        self.assertTrue(all(effort.culmination.successful for effort in efforts))
+        self.assertLess(elapsed, 0.5)
+
+    def test_do_many_yields_in_order_of_completion_or_submission(self):
+        def nap(seconds: float):
+            sleep(seconds)
+            return seconds
+
+        coordinator = Coordinator(commlink_provider())
+        naps = [0.2, 0.1, 0.0]
+
+        completed = coordinator.do_many([Call(Closure(nap, s)) for s in naps], max_workers=3)
+        submitted = coordinator.do_many([Call(Closure(nap, s)) for s in naps], max_workers=3, ordered=True)
+
+        self.assertEqual([effort.culmination.value for effort in completed], sorted(naps))
+        self.assertEqual([effort.culmination.value for effort in submitted], naps)
+
+    def test_do_many_applies_contingency_to_each_action(self):
+        coordinator = Coordinator(commlink_provider(), Contingency(max_retries=1))
+        actions = [Call(Closure(flaky(failures=f))) for f in (0, 1, 2)]
+        efforts = list(coordinator.do_many(actions, ordered=True))
+
+        self.assertEqual([len(effort.retries) for effort in efforts], [0, 1, 1])
+        self.assertEqual([effort.culmination.successful for effort in efforts], [True, True, False])
+
+    def test_do_many_draws_actions_lazily(self):
+        drawn = []
+
+        def actions():
+            for i in range(100):
+                drawn.append(i)
+                yield Call(Closure(str, i))
+
+        coordinator = Coordinator(commlink_provider())
+        efforts = coordinator.do_many(actions(), max_workers=2, max_pending=4)
+        next(efforts)
+        self.assertLessEqual(len(drawn), 5)
+        self.assertEqual(len(list(efforts)), 99)
+
+    def test_adaptive_concurrency_bounds_and_adjusts_work_in_flight(self):
+        in_flight, peak, lock = [0], [0], Lock()
+
+        def call(throttle: bool):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            if throttle:
+                raise ClientError({'Error': {'Code': 'ThrottlingException'}}, 'SendMessage')
+            return 'sent'
+
+        concurrency = AdaptiveConcurrency(initial=2, maximum=4, cooldown=0)
+        coordinator = Coordinator(commlink_provider(), concurrency=concurrency)
+        efforts = list(coordinator.do_many((Call(Closure(call, False)) for _ in range(40)), max_workers=8))
+
+        self.assertTrue(all(effort.culmination.successful for effort in efforts))
+        self.assertLessEqual(peak[0], 4)
+        self.assertEqual(concurrency.limit, 4)
+        self.assertEqual(concurrency.in_flight, 0)
+
+        coordinator.do(Call(Closure(call, True)))
+        self.assertEqual(concurrency.limit, 2)
+
+    def test_adaptive_concurrency_sees_throttling_despite_retries_and_compaction(self):
+        throttling = ClientError({'Error': {'Code': 'ThrottlingException'}}, 'SendMessage')
+        for compact in (False, True):
+            with self.subTest(compact=compact):
+                concurrency = AdaptiveConcurrency(initial=8, cooldown=0)
+                coordinator = Coordinator(commlink_provider(), Contingency(max_retries=1), compact=compact, concurrency=concurrency)
+
+                coordinator.do(Call(Closure(MagicMock(side_effect=throttling, __name__='send'))))
+                self.assertEqual(concurrency.limit, 4)
+
+                coordinator.do(Call(Closure(MagicMock(side_effect=[throttling, 'sent'], __name__='send'))))
+                self.assertEqual(concurrency.limit, 2)
+
+    def test_adaptive_concurrency_sees_throttled_batch_entries(self):
+        commlink = commlink_provider(Broker.kinesis)
+        commlink.send_batch.return_value = {
+            'FailedRecordCount': 1,
+            'Records': [{'SequenceNumber': '1'}, {'ErrorCode': 'ProvisionedThroughputExceededException'}],
+        }
+        concurrency = AdaptiveConcurrency(initial=8)
+        publisher = Publisher(Coordinator(commlink, Contingency(max_retries=0), concurrency=concurrency))
+
+        effort = publisher.publish_batch([{'Data': b'a', 'PartitionKey': 'k'}, {'Data': b'b', 'PartitionKey': 'k'}], StreamName='s')
+
+        self.assertEqual(effort.culmination.value.__cause__.codes, ['ProvisionedThroughputExceededException'])
+        self.assertEqual(concurrency.limit, 4)
+
+    def test_compact_coordinator_only_tallies_attempts(self):
+        coordinator = Coordinator(commlink_provider(), Contingency, compact=True)
+        succeeded = coordinator.do(Call(Closure(flaky(failures=1))))
+        failed = coordinator.do(Call(Closure(flaky(failures=3))))
+
+        self.assertIsInstance(succeeded, CompactEffort)
+        self.assertTrue(succeeded.culmination.successful)
+        self.assertEqual((succeeded.attempt_count, succeeded.retry_count), (2, 1))
+        self.assertEqual(repr(succeeded), '<CompactEffort:succeeded:retries>')
+        self.assertFalse(failed.culmination.successful)
+        self.assertIsInstance(failed.culmination.value, RetryPolicy.Expired)
+        self.assertEqual((failed.attempt_count, failed.retry_count), (3, 2))
+        with self.assertRaises(AttributeError):
+            failed.attempts
+        with self.assertRaises(AttributeError):
+            failed.annotation = 'compact Efforts have no __dict__'
+
+    def test_compact_coordinator_without_contingency(self):
+        effort = Coordinator(commlink_provider(), compact=True).do(Call(Closure(flaky(failures=0))))
+
+        self.assertEqual((effort.attempt_count, effort.retry_count), (1, 0))
+        self.assertEqual(repr(effort), '<CompactEffort:succeeded>')
+
+    def test_compact_efforts_can_be_short_circuited(self):
+        breaker = CircuitBreaker(failure_threshold=1, minimum_calls=1)
+        coordinator = Coordinator(commlink_provider(), Contingency(max_retries=1, breaker=breaker), compact=True)
+        coordinator.do(Call(Closure(flaky(failures=1))))
+        effort = coordinator.do(Call(Closure(flaky(failures=0))))
+
+        self.assertTrue(effort.short_circuited)
+        self.assertEqual(effort.attempt_count, 0)
+
+    def test_efforts_tally_attempts(self):
+        effort = Coordinator(commlink_provider(), Contingency).do(Call(Closure(flaky(failures=1))))
+        self.assertEqual((effort.attempt_count, effort.retry_count), (2, 1))
+
+    def test_executor_is_created_lazily_and_can_be_shutdown(self):
+        coordinator = Coordinator(commlink_provider(), max_workers=2)
+        self.assertIsNone(coordinator._executor)
+        executor = coordinator.executor
+        self.assertIs(coordinator.executor, executor)
+        self.assertEqual(executor._max_workers, 2)
+
+        coordinator.shutdown()
+        self.assertIsNone(coordinator._executor)
+
+
+class AsyncCoordinatorTest(IsolatedAsyncioTestCase):
+
+    async def test_can_await_efforts(self):
+        coordinator = Coordinator(commlink_provider(), Contingency)
+        effort = await coordinator.ado(Call(Closure(flaky(failures=3))))
+
+        self.assertIsInstance(effort, Effort)
+        self.assertFalse(effort.culmination.successful)
+        self.assertIsInstance(effort.culmination.value, RetryPolicy.Expired)
+        coordinator.shutdown()
+
+    async def test_awaited_efforts_overlap(self):
+        def nap():
+            sleep(0.1)
+            return 'rested'
+
+        coordinator = Coordinator(commlink_provider(), Contingency, max_workers=10)
+        start = monotonic()
+        efforts = await asyncio.gather(*[coordinator.ado(Call(Closure(nap))) for _ in range(10)])
+        elapsed = monotonic() - start
+
+        self.assertTrue(all(effort.culmination.successful for effort in efforts))
+        self.assertLess(elapsed, 0.5)
+        coordinator.shutdown()
+
+    async def test_jobs_have_awaitable_methods(self):
+        commlink = commlink_provider(
+            send={'MessageId': '1'},
+            receive={'Messages': []},
+            create_target={'QueueUrl': 'some-queue'}
+        )
+        coordinator = Coordinator(commlink)
+
+        published = await Publisher(coordinator).apublish(QueueUrl='some-queue', MessageBody='hello')
+        consumed = await Consumer(coordinator).aconsume(QueueUrl='some-queue')
+        created = await Job(coordinator).acreate_target(QueueName='some-queue')
+
+        self.assertEqual(published.culmination.value, {'MessageId': '1'})
+        self.assertEqual(consumed.culmination.value, {'Messages': []})
+        self.assertEqual(created.culmination.value, {'QueueUrl': 'some-queue'})
+        commlink.send.assert_called_once_with(QueueUrl='some-queue', MessageBody='hello')
+        coordinator.shutdown()
@@ -0,0 +1,110 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from recruitment.agency import Codec
+from recruitment.agency import Compression
+from recruitment.agency import Consumer
+from recruitment.agency import Coordinator
+from recruitment.agency import Publisher
+from recruitment.agency import Serialization
+from recruitment.agency.aggregation import aggregate
+from recruitment.agency.encoding import magic
+from recruitment.agency.resources import Broker
+
+
+class CodecTest(TestCase):
+
+    value = {'event': 'something happened', 'details': ['x' * 10] * 200}
+
+    def test_round_trips_every_encoding(self):
+        for compression in Compression:
+            for text in (True, False):
+                codec = Codec(Serialization.json, compression, threshold=0)
+                self.assertEqual(codec.decode(codec.encode(self.value, text=text)), self.value)
+                codec = Codec(Serialization.raw, compression, threshold=0)
+                self.assertEqual(codec.decode(codec.encode(b'\x00\xffbytes' * 100, text=text)), b'\x00\xffbytes' * 100)
+
+    def test_compresses_only_above_threshold(self):
+        codec = Codec(compression=Compression.gzip, threshold=1024)
+        self.assertEqual(codec.encode({'small': True}, text=True), 'rc:json/none:{"small":true}')
+        self.assertTrue(codec.encode(self.value, text=True).startswith('rc:json/gzip:'))
+        self.assertLess(len(codec.encode(self.value)), len(Codec(compression=Compression.none).encode(self.value)))
+
+    def test_leaves_incompressible_payloads_uncompressed(self):
+        codec = Codec(Serialization.raw, Compression.zlib, threshold=0)
+        self.assertEqual(codec.encode(b'x'), magic + b'\x01\x00x')
+
+    def test_untagged_payloads_pass_through(self):
+        for payload in ('plain text', b'plain bytes', '{"json": "from elsewhere"}'):
+            self.assertEqual(Codec.decode(payload), payload)
+
+    def test_unrecognized_tags_pass_through(self):
+        for payload in ('rc:legacy body', 'rc:xml/none:<a/>', 'rc:json/zip:{}', magic + b'\x09\x00body', magic):
+            self.assertEqual(Codec.decode(payload), payload)
+
+    def test_malformed_payloads_are_undecodable(self):
+        for payload in ('rc:json/none:{bad', 'rc:json/zlib:not base64!', magic + b'\x00\x01not zlib'):
+            with self.assertRaises(Codec.Undecodable):
+                Codec.decode(payload)
+
+
+class JobEncodingTest(TestCase):
+
+    def coordinator_provider(self, broker: Broker, **responses) -> Coordinator:
+        commlink = MagicMock(broker=broker, budget=None)
+        for alias in broker.interface:
+            getattr(commlink, alias).__name__ = alias
+            getattr(commlink, alias).return_value = responses.get(alias)
+        return Coordinator(commlink)
+
+    def test_publisher_encodes_payloads(self):
+        codec = Codec(compression=Compression.none)
+        coordinator = self.coordinator_provider(Broker.sqs)
+        publisher = Publisher(coordinator, codec=codec)
+        publisher.publish(QueueUrl='q', MessageBody={'a': 1})
+        publisher.publish_batch([{'Id': '0', 'MessageBody': [1, 2]}], QueueUrl='q')
+
+        coordinator.commlink.send.assert_called_once_with(QueueUrl='q', MessageBody='rc:json/none:{"a":1}')
+        coordinator.commlink.send_batch.assert_called_once_with(
+            Entries=[{'Id': '0', 'MessageBody': 'rc:json/none:[1,2]'}], QueueUrl='q'
+        )
+
+    def test_consumer_decodes_payloads(self):
+        codec = Codec(compression=Compression.zlib, threshold=0)
+        received = {'Messages': [
+            {'MessageId': '1', 'Body': codec.encode({'a': 1}, text=True)},
+            {'MessageId': '2', 'Body': 'untagged'},
+        ]}
+        consumer = Consumer(self.coordinator_provider(Broker.sqs, receive=received), codec=codec)
+        effort = consumer.consume(QueueUrl='q')
+
+        self.assertEqual([message['Body'] for message in effort.culmination.value['Messages']], [{'a': 1}, 'untagged'])
+
+    def test_consumer_hands_over_undecodable_payloads_with_their_error(self):
+        received = {'Messages': [
+            {'MessageId': '1', 'Body': 'rc:json/none:{bad'},
+            {'MessageId': '2', 'Body': 'rc:legacy body'},
+            {'MessageId': '3', 'Body': 'rc:json/none:{"a":1}'},
+        ]}
+        consumer = Consumer(self.coordinator_provider(Broker.sqs, receive=received), codec=Codec())
+        effort = consumer.consume(QueueUrl='q')
+
+        malformed, legacy, fine = effort.culmination.value['Messages']
+        self.assertEqual(malformed['Body'], 'rc:json/none:{bad')
+        self.assertIsInstance(malformed['DecodeError'], Codec.Undecodable)
+        self.assertEqual(legacy, {'MessageId': '2', 'Body': 'rc:legacy body'})
+        self.assertEqual(fine, {'MessageId': '3', 'Body': {'a': 1}})
+
+    def test_consumer_decodes_aggregated_kinesis_records(self):
+        codec = Codec(Serialization.raw)
+        records = [{'Data': f'event {i}', 'PartitionKey': 'a'} for i in range(3)]
+        encoded = [{**record, 'Data': codec.encode(record['Data'])} for record in records]
+        aggregated = [{**record, 'SequenceNumber': '1'} for record in aggregate(encoded)]
+        consumer = Consumer(self.coordinator_provider(Broker.kinesis, receive={'Records': aggregated}), codec=codec)
+        effort = consumer.consume(ShardIterator='some-iterator')
+
+        self.assertEqual([r['Data'] for r in effort.culmination.value['Records']], [b'event 0', b'event 1', b'event 2'])
+
+    def test_only_brokers_carrying_payloads_accept_codecs(self):
+        with self.assertRaises(NotImplementedError):
+            Consumer(self.coordinator_provider(Broker.logs), codec=Codec())
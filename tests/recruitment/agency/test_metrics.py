@@ -0,0 +1,111 @@
+import json
+
+from actionpack.actions import Call
+from actionpack.utils import Closure
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from recruitment.agency import Batch
+from recruitment.agency import Contingency
+from recruitment.agency import Coordinator
+from recruitment.agency import Metrics
+from recruitment.agency import Publisher
+from recruitment.agency.metrics import Histogram
+from recruitment.agency.resources import Broker
+
+
+class HistogramTest(TestCase):
+
+    def test_counts_observations_cumulatively(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.cumulative()), [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+    def test_estimates_quantiles_by_bucket(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in [0.01] * 98 + [0.5, 5.0]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+        self.assertEqual(histogram.quantile(1.0), float('inf'))
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+
+class MetricsTest(TestCase):
+
+    def commlink_provider(self, broker: Broker = Broker.sqs):
+        commlink = MagicMock(broker=broker, budget=None)
+        commlink.send.__name__ = broker.interface['send']
+        return commlink
+
+    def test_coordinator_records_work_per_broker_and_alias(self):
+        metrics = Metrics(buckets=(1.0,))
+        commlink = self.commlink_provider()
+        commlink.send.side_effect = [ConnectionError('hiccup'), {'MessageId': '1'}, ConnectionError('down')]
+        publisher = Publisher(Coordinator(commlink, Contingency(max_retries=1), metrics=metrics))
+
+        publisher.publish(MessageBody='first')
+        publisher.publish(MessageBody='second')
+
+        stats = metrics.get('sqs', 'send')
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['successes'], 1)
+        self.assertEqual(stats['failures'], 1)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['latency']['count'], 2)
+        self.assertEqual(list(metrics), [('sqs', 'send')])
+        self.assertEqual(metrics.get('sqs', 'receive')['calls'], 0)
+
+    def test_labels_batches_by_the_alias_delivered_through(self):
+        metrics = Metrics()
+        commlink = self.commlink_provider()
+        commlink.send_batch.return_value = commlink.acknowledge.return_value = {'Successful': []}
+        coordinator = Coordinator(commlink, metrics=metrics)
+        entries = [{'Id': '0', 'ReceiptHandle': 'handle'}]
+
+        Publisher(coordinator).publish_batch([{'Id': '0', 'MessageBody': 'hello'}])
+        coordinator.do(Call(Closure(Batch(commlink, entries, alias='acknowledge').deliver)))
+
+        self.assertEqual(sorted(metrics), [('sqs', 'acknowledge'), ('sqs', 'send_batch')])
+
+    def test_labels_unknown_functions_by_name(self):
+        metrics = Metrics()
+        coordinator = Coordinator(self.commlink_provider(), metrics=metrics)
+        coordinator.do(Call(Closure(str, 'anything')))
+
+        self.assertEqual(list(metrics), [('sqs', 'str')])
+
+    def test_exports_json(self):
+        metrics = Metrics(buckets=(1.0,))
+        commlink = self.commlink_provider(Broker.sns)
+        Publisher(Coordinator(commlink, metrics=metrics)).publish(Message='hello')
+
+        exported = json.loads(metrics.asjson())
+        self.assertEqual(exported['sns']['send']['calls'], 1)
+        self.assertEqual(exported['sns']['send']['latency']['buckets'], {'1.0': 1, '+Inf': 1})
+
+    def test_exports_prometheus_text(self):
+        metrics = Metrics(buckets=(0.5,))
+        commlink = self.commlink_provider(Broker.sns)
+        Publisher(Coordinator(commlink, metrics=metrics)).publish(Message='hello')
+
+        exported = metrics.asprometheus().splitlines()
+        self.assertIn('# TYPE recruitment_calls_total counter', exported)
+        self.assertIn('recruitment_calls_total{broker="sns",alias="send"} 1', exported)
+        self.assertIn('recruitment_retries_total{broker="sns",alias="send"} 0', exported)
+        self.assertIn('# TYPE recruitment_latency_seconds histogram', exported)
+        self.assertIn('recruitment_latency_seconds_bucket{broker="sns",alias="send",le="0.5"} 1', exported)
+        self.assertIn('recruitment_latency_seconds_bucket{broker="sns",alias="send",le="+Inf"} 1', exported)
+        self.assertIn('recruitment_latency_seconds_count{broker="sns",alias="send"} 1', exported)
+
+    def test_can_reset(self):
+        metrics = Metrics()
+        Coordinator(self.commlink_provider(), metrics=metrics).do(Call(Closure(str, 'anything')))
+        metrics.reset()
+
+        self.assertEqual(metrics.asdict(), {})
@@ -1,5 +1,10 @@
+import boto3
+
+from io import BytesIO
 from io import StringIO
 from unittest import TestCase
+from unittest.mock import ANY
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
 from actionpack.actions import Call
@@ -8,12 +13,17 @@ from actionpack.utils import Closure
 from botocore.exceptions import ClientError
 from botocore.stub import Stubber
 
+from recruitment.agency import Accumulator
 from recruitment.agency import Contingency
+from recruitment.agency import Batch
 from recruitment.agency import Broker
 from recruitment.agency import Commlink
 from recruitment.agency import Coordinator
 from recruitment.agency import Config
+from recruitment.agency import LogBuffer
+from recruitment.agency import clients
 from recruitment.agency import Publisher
+from recruitment.agency import Upload
 from tests.recruitment.agency import client
 from tests.recruitment.agency import fake_credentials
 from tests.recruitment.agency import uncloseable
@@ -28,6 +38,9 @@ class PublisherTest(TestCase):
 
     expected_publish_response = {'MessageId': '00000000-0000-0000-0000-000000000000'}
 
+    def setUp(self):
+        clients.invalidate()
+
     @patch('boto3.client')
     @patch('actionpack.actions.Write.perform')
     def test_can_retry_message_send(self, mock_write, mock_boto_client):
@@ -140,3 +153,382 @@ class PublisherTest(TestCase):
         self.assertEqual(len(effort.retries), max_retries)
         for retry in effort.retries:
             self.assertIsInstance(retry.value, ClientError)
+
+
+class PublisherBatchTest(TestCase):
+
+    region = 'some-region-1'
+    sqs = client(Broker.sqs.name, region)
+    kinesis = client(Broker.kinesis.name, region)
+    queue_url = 'https://sqs.some-region-1.amazonaws.com/12345/some-queue'
+
+    def setUp(self):
+        clients.invalidate()
+
+    def publisher_provider(self, broker: Broker, contingency=None) -> Publisher:
+        return Publisher(Coordinator(Commlink(Config(broker, **fake_credentials)), contingency))
+
+    def entries(self, count: int):
+        return [{'Id': str(i), 'MessageBody': f'message {i}'} for i in range(count)]
+
+    def sent(self, entries):
+        return {'Successful': [{'Id': e['Id'], 'MessageId': e['Id'], 'MD5OfMessageBody': ''} for e in entries], 'Failed': []}
+
+    @patch('boto3.client')
+    def test_chunks_entries_by_count(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        entries = self.entries(25)
+        with Stubber(self.sqs) as stubber:
+            for chunk in (entries[:10], entries[10:20], entries[20:]):
+                stubber.add_response(
+                    'send_message_batch', self.sent(chunk), {'QueueUrl': self.queue_url, 'Entries': chunk}
+                )
+            effort = self.publisher_provider(Broker.sqs).publish_batch(entries, QueueUrl=self.queue_url)
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(len(effort.culmination.value), 3)
+
+    @patch('boto3.client')
+    def test_chunks_entries_by_bytes(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        entries = [{'Id': str(i), 'MessageBody': 'x' * (100 * 1024)} for i in range(3)]
+        with Stubber(self.sqs) as stubber:
+            for chunk in (entries[:2], entries[2:]):
+                stubber.add_response(
+                    'send_message_batch', self.sent(chunk), {'QueueUrl': self.queue_url, 'Entries': chunk}
+                )
+            effort = self.publisher_provider(Broker.sqs).publish_batch(entries, QueueUrl=self.queue_url)
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+
+    @patch('boto3.client')
+    def test_retries_only_failed_entries(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        entries = self.entries(3)
+        partial_failure = {
+            'Successful': self.sent(entries[:2])['Successful'],
+            'Failed': [{'Id': '2', 'SenderFault': False, 'Code': 'InternalError'}],
+        }
+        with Stubber(self.sqs) as stubber:
+            stubber.add_response('send_message_batch', partial_failure, {'QueueUrl': self.queue_url, 'Entries': entries})
+            stubber.add_response(
+                'send_message_batch', self.sent(entries[2:]), {'QueueUrl': self.queue_url, 'Entries': entries[2:]}
+            )
+            effort = self.publisher_provider(Broker.sqs, Contingency).publish_batch(entries, QueueUrl=self.queue_url)
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(len(effort.retries), 1)
+        self.assertIsInstance(effort.initial_attempt.value, Batch.Incomplete)
+        self.assertEqual(effort.initial_attempt.value.entries, entries[2:])
+
+    @patch('boto3.client')
+    def test_reports_undelivered_entries(self, mock_boto_client):
+        mock_boto_client.return_value = self.sqs
+        entries = self.entries(2)
+        with Stubber(self.sqs) as stubber:
+            stubber.add_client_error('send_message_batch', '500')
+            effort = self.publisher_provider(Broker.sqs).publish_batch(entries, QueueUrl=self.queue_url)
+
+        self.assertFalse(effort.culmination.successful)
+        self.assertIsInstance(effort.culmination.value, Batch.Incomplete)
+        self.assertEqual(effort.culmination.value.entries, entries)
+        self.assertIsInstance(effort.culmination.value.errors[0], ClientError)
+
+    @patch('boto3.client')
+    def test_retries_only_failed_kinesis_records(self, mock_boto_client):
+        mock_boto_client.return_value = self.kinesis
+        records = [{'Data': b'data', 'PartitionKey': str(i)} for i in range(3)]
+        partial_failure = {
+            'FailedRecordCount': 1,
+            'Records': [
+                {'SequenceNumber': '1', 'ShardId': 'shardId-0'},
+                {'ErrorCode': 'ProvisionedThroughputExceededException', 'ErrorMessage': 'slow down'},
+                {'SequenceNumber': '3', 'ShardId': 'shardId-0'},
+            ]
+        }
+        sent = {'Records': [{'SequenceNumber': '2', 'ShardId': 'shardId-0'}]}
+        with Stubber(self.kinesis) as stubber:
+            stubber.add_response('put_records', partial_failure, {'StreamName': 'some-stream', 'Records': records})
+            stubber.add_response('put_records', sent, {'StreamName': 'some-stream', 'Records': records[1:2]})
+            effort = self.publisher_provider(Broker.kinesis, Contingency).publish_batch(records, StreamName='some-stream')
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(len(effort.retries), 1)
+
+
+class PublisherMultipartTest(TestCase):
+
+    region = 'some-region-1'
+    s3 = boto3.session.Session().client(Broker.s3.name, region_name=region)  # for boto3's injected upload_fileobj
+    bucket, key, upload_id = 'some-bucket', 'some/key', 'some-upload-id'
+    chunk_size = Upload.min_chunk_size
+
+    def setUp(self):
+        clients.invalidate()
+
+    def publisher_provider(self, contingency=None) -> Publisher:
+        return Publisher(Coordinator(Commlink(Config(Broker.s3, **fake_credentials)), contingency))
+
+    def location(self, **kwargs) -> dict:
+        return {'Bucket': self.bucket, 'Key': self.key, **kwargs}
+
+    def expect_begin(self, stubber: Stubber):
+        stubber.add_response('create_multipart_upload', self.location(UploadId=self.upload_id), self.location())
+
+    def expect_part(self, stubber: Stubber, number: int, body: bytes):
+        stubber.add_response(
+            'upload_part',
+            {'ETag': f'"etag-{number}"'},
+            self.location(UploadId=self.upload_id, PartNumber=number, Body=body)
+        )
+
+    @patch('boto3.client')
+    def test_uploads_object_in_parts(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        data = b'a' * self.chunk_size + b'b' * self.chunk_size + b'c'
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            for number, body in enumerate((data[:self.chunk_size], data[self.chunk_size:-1], b'c'), 1):
+                self.expect_part(stubber, number, body)
+            parts = [{'ETag': f'"etag-{n}"', 'PartNumber': n} for n in (1, 2, 3)]
+            stubber.add_response(
+                'complete_multipart_upload',
+                self.location(ETag='"etag"'),
+                self.location(UploadId=self.upload_id, MultipartUpload={'Parts': parts})
+            )
+            effort = self.publisher_provider().publish_multipart(
+                BytesIO(data), self.bucket, self.key, chunk_size=self.chunk_size, max_workers=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(sorted(effort.parts), [1, 2, 3])
+        self.assertEqual(effort.retry_count, 0)
+
+    @patch('boto3.client')
+    def test_reports_retries_per_part(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        data = b'a' * self.chunk_size + b'b'
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            self.expect_part(stubber, 1, data[:-1])
+            stubber.add_client_error('upload_part', 'InternalError', http_status_code=500)
+            self.expect_part(stubber, 2, b'b')
+            stubber.add_response('complete_multipart_upload', self.location(ETag='"etag"'))
+            effort = self.publisher_provider(Contingency(max_retries=1)).publish_multipart(
+                BytesIO(data), self.bucket, self.key, chunk_size=self.chunk_size, max_workers=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(effort.parts[1].retry_count, 0)
+        self.assertEqual(effort.parts[2].retry_count, 1)
+        self.assertEqual(effort.retried_parts, [2])
+        self.assertEqual(effort.retry_count, 1)
+        self.assertEqual(effort.attempt_count, 3)
+
+    @patch('boto3.client')
+    def test_aborts_upload_when_a_part_fails(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        data = b'a' * self.chunk_size + b'b'
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            stubber.add_client_error('upload_part', 'InternalError', http_status_code=500)
+            stubber.add_response('abort_multipart_upload', {}, self.location(UploadId=self.upload_id))
+            effort = self.publisher_provider().publish_multipart(
+                BytesIO(data), self.bucket, self.key, chunk_size=self.chunk_size, max_workers=1, max_memory=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertFalse(effort.culmination.successful)
+        self.assertIsInstance(effort.culmination.value, ClientError)
+        self.assertEqual(list(effort.parts), [1])
+
+    @patch('boto3.client')
+    def test_aborts_upload_when_completing_fails(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            self.expect_part(stubber, 1, b'a')
+            stubber.add_client_error('complete_multipart_upload', 'InternalError', http_status_code=500)
+            stubber.add_response('abort_multipart_upload', {}, self.location(UploadId=self.upload_id))
+            effort = self.publisher_provider().publish_multipart(
+                BytesIO(b'a'), self.bucket, self.key, chunk_size=self.chunk_size, max_workers=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertFalse(effort.culmination.successful)
+        self.assertEqual(list(effort.parts), [1])
+
+    @patch('boto3.client')
+    @patch.object(Upload, 'max_parts', 2)
+    def test_raises_chunk_size_to_stay_within_part_limit(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        data = b'x' * (3 * self.chunk_size)
+        half = len(data) // 2
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            self.expect_part(stubber, 1, data[:half])
+            self.expect_part(stubber, 2, data[half:])
+            stubber.add_response('complete_multipart_upload', self.location(ETag='"etag"'))
+            effort = self.publisher_provider().publish_multipart(
+                BytesIO(data), self.bucket, self.key, chunk_size=self.chunk_size, max_workers=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(sorted(effort.parts), [1, 2])
+
+    @patch('boto3.client')
+    @patch.object(Upload, 'max_parts', 1)
+    def test_aborts_unsized_uploads_needing_too_many_parts(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+
+        class Unseekable(BytesIO):
+            def seekable(self):
+                return False
+
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            self.expect_part(stubber, 1, b'a' * self.chunk_size)
+            stubber.add_response('abort_multipart_upload', {}, self.location(UploadId=self.upload_id))
+            effort = self.publisher_provider().publish_multipart(
+                Unseekable(b'a' * self.chunk_size + b'b'), self.bucket, self.key, chunk_size=self.chunk_size, max_workers=1
+            )
+            stubber.assert_no_pending_responses()
+
+        self.assertIsInstance(effort.culmination.value, Upload.TooManyParts)
+
+    @patch('boto3.client')
+    def test_reads_no_further_ahead_than_memory_allows(self, mock_boto_client):
+        mock_boto_client.return_value = self.s3
+        chunk_size, parts, max_memory = self.chunk_size, 6, 2 * self.chunk_size
+        reads = sends = most_in_memory = 0
+
+        class CountingReader(BytesIO):
+            def read(self, size=-1):
+                nonlocal reads, most_in_memory
+                reads += 1
+                most_in_memory = max(most_in_memory, reads - sends)
+                return super().read(size)
+
+        def upload_part(**kwargs):
+            nonlocal sends
+            sends += 1
+            return {'ETag': f'"etag-{kwargs["PartNumber"]}"'}
+
+        with Stubber(self.s3) as stubber:
+            self.expect_begin(stubber)
+            stubber.add_response('complete_multipart_upload', self.location(ETag='"etag"'))
+            publisher = self.publisher_provider()
+            with patch.object(publisher.coordinator.commlink, 'send_part', side_effect=upload_part):
+                effort = publisher.publish_multipart(
+                    CountingReader(b'x' * chunk_size * parts), self.bucket, self.key,
+                    chunk_size=chunk_size, max_workers=4, max_memory=max_memory
+                )
+
+        self.assertTrue(effort.culmination.successful)
+        self.assertEqual(sends, parts)
+        self.assertLessEqual(most_in_memory, max_memory // chunk_size + 1)  # +1 for the read that finds no more
+
+    def test_rejects_parts_smaller_than_S3_allows(self):
+        with self.assertRaises(ValueError):
+            Upload(None, BytesIO(), self.bucket, self.key, chunk_size=Upload.min_chunk_size - 1)
+
+
+class AccumulatorTest(TestCase):
+
+    def test_sends_full_groups(self):
+        sent = []
+        accumulator = Accumulator(sent.append, max_items=3, linger=60)
+        futures = [accumulator.add(i) for i in range(7)]
+
+        self.assertEqual(sent, [[0, 1, 2], [3, 4, 5]])
+        self.assertFalse(futures[6].done())
+        accumulator.close()
+        self.assertEqual(sent[-1], [6])
+        self.assertTrue(all(future.done() for future in futures))
+
+    def test_sends_groups_before_exceeding_max_bytes(self):
+        sent = []
+        with Accumulator(sent.append, max_items=10, max_bytes=5, linger=60, sizeof=len) as accumulator:
+            for item in ('ab', 'cd', 'ef', 'g'):
+                accumulator.add(item)
+
+        self.assertEqual(sent, [['ab', 'cd'], ['ef', 'g']])
+
+    def test_sends_lingering_groups(self):
+        accumulator = Accumulator(lambda items: len(items), max_items=10, linger=0.05)
+        future = accumulator.add('item')
+        self.assertEqual(future.result(timeout=1), 1)
+        self.assertEqual(len(accumulator), 0)
+
+    def test_failures_are_set_on_futures(self):
+        def send(items):
+            raise ConnectionError('unreachable')
+
+        with Accumulator(send, max_items=1) as accumulator:
+            future = accumulator.add('item')
+
+        self.assertIsInstance(future.exception(), ConnectionError)
+
+    def test_rejects_items_that_can_never_fit(self):
+        with self.assertRaises(ValueError):
+            Accumulator(list, max_items=10, max_bytes=1, sizeof=len).add('ab')
+
+
+class PublisherLogBufferTest(TestCase):
+
+    def publisher_provider(self, broker: Broker = Broker.logs, contingency=None) -> Publisher:
+        commlink = MagicMock(broker=broker, budget=None)
+        commlink.send.__name__ = 'send'
+        commlink.send.return_value = {'nextSequenceToken': '1'}
+        return Publisher(Coordinator(commlink, contingency))
+
+    def sent(self, publisher: Publisher) -> list:
+        return [call.kwargs['logEvents'] for call in publisher.coordinator.commlink.send.call_args_list]
+
+    def test_publishes_events_in_chronological_order(self):
+        publisher = self.publisher_provider()
+        with publisher.buffered('group', 'stream', linger=60) as buffer:
+            futures = [buffer.log(message, timestamp) for message, timestamp in (('b', 2), ('c', 3), ('a', 1))]
+
+        self.assertEqual(self.sent(publisher), [[
+            {'timestamp': 1, 'message': 'a'}, {'timestamp': 2, 'message': 'b'}, {'timestamp': 3, 'message': 'c'}
+        ]])
+        publisher.coordinator.commlink.send.assert_called_with(logGroupName='group', logStreamName='stream', logEvents=ANY)
+        effort = futures[0].result()
+        self.assertTrue(effort.culmination.successful)
+
+    def test_respects_put_log_events_limits(self):
+        publisher = self.publisher_provider()
+        with publisher.buffered('group', 'stream', max_items=2, max_bytes=3 * (LogBuffer.event_overhead + 1)) as buffer:
+            for timestamp in range(5):
+                buffer.log('x', timestamp)
+        self.assertEqual([len(events) for events in self.sent(publisher)], [2, 2, 1])
+
+        publisher = self.publisher_provider()
+        with publisher.buffered('group', 'stream', max_bytes=2 * (LogBuffer.event_overhead + 1)) as buffer:
+            for timestamp in range(3):
+                buffer.log('x', timestamp)
+        self.assertEqual([len(events) for events in self.sent(publisher)], [2, 1])
+
+    def test_groups_never_span_more_than_a_day(self):
+        publisher = self.publisher_provider()
+        day = LogBuffer.max_span
+        with publisher.buffered('group', 'stream') as buffer:
+            for timestamp in (0, day, day + 1, 2 * day):
+                buffer.log('x', timestamp)
+
+        self.assertEqual(
+            [[event['timestamp'] for event in events] for events in self.sent(publisher)],
+            [[0, day], [day + 1, 2 * day]]
+        )
+
+    def test_only_logs_support_buffering(self):
+        with self.assertRaises(NotImplementedError):
+            self.publisher_provider(Broker.sqs).buffered('group', 'stream')
@@ -0,0 +1,166 @@
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from actionpack.actions import Call
+from actionpack.utils import Closure
+from botocore.stub import Stubber
+
+from recruitment.agency import Broker
+from recruitment.agency import Commlink
+from recruitment.agency import Config
+from recruitment.agency import Contingency
+from recruitment.agency import Coordinator
+from recruitment.agency import DeadletterStore
+from recruitment.agency import Effort
+from recruitment.agency import Publisher
+from recruitment.agency import clients
+from recruitment.agency import deadletters
+from recruitment.agency import local_storage_dir
+from recruitment.agency.storage import decode
+from recruitment.agency.storage import encode
+from tests.recruitment.agency import client
+from tests.recruitment.agency import fake_credentials
+
+
+class DeadletterStoreTest(TestCase):
+
+    def setUp(self):
+        self.tmpdir = TemporaryDirectory()
+        self.directory = Path(self.tmpdir.name) / 'deadletters'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def lines(self, segment: Path):
+        return [decode(line) for line in segment.read_bytes().splitlines()]
+
+    def test_default_directory_is_local_storage(self):
+        self.assertEqual(DeadletterStore().directory, deadletters)
+        self.assertEqual(deadletters.parent, local_storage_dir)
+
+    def test_records_round_trip(self):
+        record = {'kwargs': {'Data': b'\x00\xff', 'PartitionKey': 'key'}, 'args': [1, 'two']}
+        self.assertEqual(decode(encode(record)), record)
+        self.assertEqual(encode(record).count(b'\n'), 1)
+
+    def test_refuses_records_that_cannot_be_replayed(self):
+        with self.assertRaises(TypeError):
+            encode({'kwargs': {'Fileobj': BytesIO(b'data')}})
+
+        with DeadletterStore(self.directory) as store:
+            effort = Effort(Call(Closure(str, 'failed')).perform())
+            with self.assertRaises(DeadletterStore.Unrecordable):
+                store.bury(Broker.s3, 'send', effort, Fileobj=BytesIO(b'data'))
+            self.assertEqual(list(store.read()), [])
+
+    def test_appends_records_to_segment(self):
+        with DeadletterStore(self.directory) as store:
+            store.append({'n': 1})
+            segment = store.append({'n': 2})
+
+        self.assertEqual(store.segments, [segment])
+        self.assertEqual(self.lines(segment), [{'n': 1}, {'n': 2}])
+
+    def test_rotates_segments_by_size(self):
+        record = {'payload': 'x' * 50}
+        with DeadletterStore(self.directory, max_segment_bytes=150) as store:
+            for _ in range(5):
+                store.append(record)
+
+        self.assertEqual(len(store.segments), 3)
+        self.assertEqual([len(self.lines(segment)) for segment in store.segments], [2, 2, 1])
+        for segment in store.segments:
+            self.assertLessEqual(segment.stat().st_size, 150)
+
+    def test_resumes_latest_segment(self):
+        with DeadletterStore(self.directory) as store:
+            store.append({'n': 1})
+        with DeadletterStore(self.directory) as store:
+            store.append({'n': 2})
+
+        self.assertEqual(len(store.segments), 1)
+        self.assertEqual(self.lines(store.segments[0]), [{'n': 1}, {'n': 2}])
+
+    @patch('os.fsync')
+    def test_groups_commits(self, mock_fsync):
+        store = DeadletterStore(self.directory, commit_every=3, commit_interval=60)
+        for n in range(7):
+            store.append({'n': n})
+
+        self.assertEqual(mock_fsync.call_count, 2)
+        self.assertEqual(store.pending, 1)
+        store.close()
+        self.assertEqual(mock_fsync.call_count, 3)
+
+    @patch('os.fsync')
+    def test_commits_pending_records_after_interval(self, mock_fsync):
+        store = DeadletterStore(self.directory, commit_every=100, commit_interval=0.05)
+        store.append({'n': 1})
+        self.assertEqual(mock_fsync.call_count, 0)
+        store._timer.join()
+
+        self.assertEqual(mock_fsync.call_count, 1)
+        self.assertEqual(store.pending, 0)
+        store.close()
+
+
+class PublisherDeadletterTest(TestCase):
+
+    broker = Broker.sns
+    sns = client(broker.name, 'some-region-1')
+
+    def setUp(self):
+        clients.invalidate()
+        self.tmpdir = TemporaryDirectory()
+        self.store = DeadletterStore(Path(self.tmpdir.name))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_deadletters_must_be_a_DeadletterStore(self):
+        with self.assertRaises(TypeError):
+            Contingency(deadletters='some/path')(action=MagicMock())
+
+    @patch('boto3.client')
+    def test_failed_publish_is_buried(self, mock_boto_client):
+        mock_boto_client.return_value = self.sns
+        with Stubber(self.sns) as stubber:
+            stubber.add_client_error('publish', '500')
+            stubber.add_client_error('publish', '500')
+            stubber.add_response('publish', {'MessageId': '1'})
+            publisher = Publisher(
+                Coordinator(
+                    Commlink(Config(self.broker, **fake_credentials)),
+                    Contingency(max_retries=0, deadletters=self.store)
+                )
+            )
+            failed = publisher.publish(TopicArn='some-topic', Message='first')
+            failed_again = publisher.publish(TopicArn='some-topic', Message='second')
+            succeeded = publisher.publish(TopicArn='some-topic', Message='third')
+
+        self.store.commit()
+        records = [decode(line) for line in self.store.segments[0].read_bytes().splitlines()]
+
+        self.assertFalse(failed.culmination.successful)
+        self.assertFalse(failed_again.culmination.successful)
+        self.assertTrue(succeeded.culmination.successful)
+        self.assertEqual([record['kwargs']['Message'] for record in records], ['first', 'second'])
+        self.assertEqual({record['broker'] for record in records}, {'sns'})
+        self.assertEqual({record['alias'] for record in records}, {'send'})
+        self.assertIn('Max retries exceeded', records[0]['error'])
+
+    def test_failed_uploads_are_not_buried(self):
+        commlink = MagicMock(broker=Broker.s3, budget=None)
+        commlink.send.__name__ = 'upload_fileobj'
+        commlink.send.side_effect = ConnectionError('unreachable')
+        publisher = Publisher(Coordinator(commlink, Contingency(max_retries=0, deadletters=self.store)))
+
+        failed = publisher.publish(Fileobj=BytesIO(b'data'), Bucket='some-bucket', Key='some/key')
+
+        self.assertFalse(failed.culmination.successful)
+        self.assertEqual(list(self.store.read()), [])